@@ -0,0 +1,251 @@
+"""
+Время выполнения заказов: перцентили p50/p90/p99 по этапам.
+
+Этапы считаются по временным меткам заказа (их ставит transitions):
+создан → подтверждён, подтверждён → в пути, в пути → доставлен. Заказ
+попадает в день окончания этапа — после полуночи в прошедший день новые
+значения уже не добавятся, поэтому завершённые дни считаются один раз и
+хранятся в daily_latency_stats. Текущий день в отчёт не входит.
+
+На PostgreSQL перцентили считает база (percentile_cont). На остальных
+СУБД длительности читаются потоком двух столбцов, и перцентили считаются
+в Python — векторно через NumPy, если он установлен. Интерполяция в обоих
+случаях линейная, как у percentile_cont.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Aggregate, Count, F, FloatField, Func
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import versions
+from .dates import day_start
+from .models import DailyLatencyStat, Order, User
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# (код, начало, конец, название)
+STAGES = (
+    ('confirm', 'created_at', 'confirmed_at', 'Создан → подтверждён'),
+    ('dispatch', 'confirmed_at', 'dispatched_at', 'Подтверждён → в пути'),
+    ('deliver', 'dispatched_at', 'delivered_at', 'В пути → доставлен'),
+)
+PERCENTILES = (0.5, 0.9, 0.99)
+
+STREAM_CHUNK_SIZE = 5000
+WINDOW_CACHE_TIMEOUT = 24 * 60 * 60
+
+
+class EpochSeconds(Func):
+    """Длительность end - start в секундах (PostgreSQL)"""
+    template = 'EXTRACT(EPOCH FROM (%(expressions)s))'
+    arg_joiner = ' - '
+    output_field = FloatField()
+
+
+class PercentileCont(Aggregate):
+    """percentile_cont(p) WITHIN GROUP (ORDER BY ...) (PostgreSQL)"""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def percentiles(values):
+    """(p50, p90, p99) списка длительностей с линейной интерполяцией"""
+    if not len(values):
+        return (None,) * len(PERCENTILES)
+    if np is not None:
+        return tuple(float(value) for value in np.percentile(np.asarray(values, dtype=float),
+                                                              [p * 100 for p in PERCENTILES]))
+    ordered = sorted(values)
+    result = []
+    for p in PERCENTILES:
+        position = (len(ordered) - 1) * p
+        lower, upper = math.floor(position), math.ceil(position)
+        result.append(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower))
+    return tuple(result)
+
+
+def _stage_orders(start_field, end_field, since, until):
+    """Заказы, закончившие этап в [since, until); отрицательные длительности отбрасываются"""
+    return Order.objects.filter(**{
+        f'{end_field}__gte': since,
+        f'{end_field}__lt': until,
+        f'{start_field}__isnull': False,
+    }).filter(**{f'{end_field}__gte': F(start_field)}).order_by()
+
+
+def compute(start_field, end_field, since, until, by_day=True):
+    """{(день или None, courier_id или None): (samples, p50, p90, p99)}.
+
+    Для каждого дня (при by_day) — строки по курьерам и общая строка с
+    courier_id = None.
+    """
+    orders = _stage_orders(start_field, end_field, since, until)
+    if connection.vendor == 'postgresql':
+        return _compute_in_database(orders, start_field, end_field, by_day)
+    return _compute_streamed(orders, start_field, end_field, by_day)
+
+
+def _compute_in_database(orders, start_field, end_field, by_day):
+    duration = EpochSeconds(F(end_field), F(start_field))
+    aggregates = {'samples': Count('id')}
+    for p in PERCENTILES:
+        aggregates[f'p{round(p * 100)}'] = PercentileCont(duration, p)
+    if by_day:
+        orders = orders.annotate(day=TruncDate(end_field))
+
+    result = {}
+    for group in (['courier_id'], []):
+        fields = (['day'] if by_day else []) + group
+        rows = orders.values(*fields).annotate(**aggregates) if fields else [orders.aggregate(**aggregates)]
+        for row in rows:
+            if not row['samples'] or (group and row['courier_id'] is None):
+                continue
+            key = (row.get('day'), row.get('courier_id'))
+            result[key] = (row['samples'],) + tuple(row[f'p{round(p * 100)}'] for p in PERCENTILES)
+    return result
+
+
+def _compute_streamed(orders, start_field, end_field, by_day):
+    groups = defaultdict(list)
+    rows = orders.values_list(start_field, end_field, 'courier_id').iterator(chunk_size=STREAM_CHUNK_SIZE)
+    for started, finished, courier_id in rows:
+        day = timezone.localdate(finished) if by_day else None
+        seconds = (finished - started).total_seconds()
+        groups[(day, None)].append(seconds)
+        if courier_id is not None:
+            groups[(day, courier_id)].append(seconds)
+    return {key: (len(values),) + percentiles(values) for key, values in groups.items()}
+
+
+def last_finished_day():
+    return timezone.localdate() - timedelta(days=1)
+
+
+def data_version():
+    """Версия посчитанных дней: меняется при каждом пересчёте"""
+    return versions.get(DailyLatencyStat._meta.db_table)
+
+
+def _window(days):
+    last_day = last_finished_day()
+    return last_day - timedelta(days=days - 1), last_day
+
+
+@transaction.atomic
+def refresh(days=30, rebuild=False):
+    """Расчёт завершённых дней из последних days, которых ещё нет в таблице; возвращает их число"""
+    first_day, last_day = _window(days)
+    wanted = {first_day + timedelta(days=offset) for offset in range(days)}
+    if rebuild:
+        DailyLatencyStat.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+
+    computed = set()
+    for stage, start_field, end_field, _ in STAGES:
+        # Общая строка есть у каждого посчитанного дня, даже без заказов
+        done = set(DailyLatencyStat.objects.filter(
+            stage=stage, courier__isnull=True, day__gte=first_day, day__lte=last_day,
+        ).values_list('day', flat=True))
+        missing = wanted - done
+        if not missing:
+            continue
+        stats = compute(
+            start_field, end_field, day_start(min(missing)), day_start(max(missing) + timedelta(days=1)),
+        )
+        DailyLatencyStat.objects.filter(stage=stage, day__in=missing).delete()
+        # Параллельный вызов (отчёт и PDF сразу после полуночи) мог посчитать те же дни:
+        # значения у него те же, поэтому уже записанные строки пропускаются
+        DailyLatencyStat.objects.bulk_create([
+            DailyLatencyStat(day=day, stage=stage, courier_id=courier_id, samples=values[0],
+                             p50=values[1], p90=values[2], p99=values[3])
+            for (day, courier_id), values in stats.items() if day in missing
+        ] + [
+            DailyLatencyStat(day=day, stage=stage) for day in missing if (day, None) not in stats
+        ], ignore_conflicts=True)
+        computed |= missing
+    if computed or rebuild:
+        versions.bump_on_commit(DailyLatencyStat._meta.db_table)
+    return len(computed)
+
+
+# ==================== ЧТЕНИЕ ====================
+
+EMPTY = (0, None, None, None)
+
+
+def _summary(values):
+    """(samples, p50, p90, p99 в секундах) → словарь для шаблона, перцентили в минутах"""
+    samples, *quantiles = values
+    summary = {'samples': samples}
+    for p, seconds in zip(PERCENTILES, quantiles):
+        summary[f'p{round(p * 100)}'] = seconds / 60 if seconds is not None else None
+    return summary
+
+
+def daily_stats(days=30):
+    """Общие перцентили по дням окна, новые дни сверху; дни без заказов пропускаются"""
+    first_day, last_day = _window(days)
+    rows = {
+        (row.day, row.stage): (row.samples, row.p50, row.p90, row.p99)
+        for row in DailyLatencyStat.objects.filter(
+            courier__isnull=True, day__gte=first_day, day__lte=last_day,
+        )
+    }
+    result = []
+    for offset in range(days):
+        day = last_day - timedelta(days=offset)
+        stages = [_summary(rows.get((day, stage), EMPTY)) for stage, _, _, _ in STAGES]
+        if any(stage['samples'] for stage in stages):
+            result.append({'day': day, 'stages': stages})
+    return result
+
+
+def window_stats(days=30):
+    """Перцентили за все завершённые дни окна: общие и по курьерам.
+
+    Перцентили не складываются из дневных, поэтому окно считается по
+    заказам. Окно заканчивается вчерашним днём и до полуночи не меняется —
+    результат кэшируется до пересчёта дней (refresh) или смены даты.
+    """
+    first_day, last_day = _window(days)
+    key = f'analytics:window:{first_day.isoformat()}:{last_day.isoformat()}:{data_version()}'
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    since, until = day_start(first_day), day_start(last_day + timedelta(days=1))
+    totals, by_courier = [], defaultdict(dict)
+    for stage, start_field, end_field, title in STAGES:
+        stats = compute(start_field, end_field, since, until, by_day=False)
+        totals.append({'title': title, **_summary(stats.get((None, None), EMPTY))})
+        for (_, courier_id), values in stats.items():
+            if courier_id is not None:
+                by_courier[courier_id][stage] = values
+
+    names = dict(User.objects.filter(pk__in=list(by_courier)).values_list('pk', 'full_name'))
+    couriers = sorted((
+        {
+            'full_name': names.get(courier_id, courier_id),
+            'stages': [_summary(stages.get(stage, EMPTY)) for stage, _, _, _ in STAGES],
+        }
+        for courier_id, stages in by_courier.items()
+    ), key=lambda row: str(row['full_name']))
+
+    result = {'first_day': first_day, 'last_day': last_day, 'totals': totals, 'couriers': couriers}
+    cache.set(key, result, WINDOW_CACHE_TIMEOUT)
+    return result
+
+
+def stage_titles():
+    return [title for _, _, _, title in STAGES]
@@ -0,0 +1,437 @@
+"""
+JSON API для заказов, позиций заказов, клиентов и адресов.
+
+    GET    /api/<ресурс>/              список с курсорной пагинацией
+    GET    /api/<ресурс>/?ids=1,2,3    пакетное чтение по id
+    GET    /api/<ресурс>/<id>/         одна запись
+    POST   /api/<ресурс>/              создание
+    PATCH  /api/<ресурс>/<id>/         частичное изменение
+    DELETE /api/<ресурс>/<id>/         удаление
+
+Ресурсы: orders, order-items, clients, addresses. Параметры чтения:
+
+    fields=id,status,order_total       только эти поля — и только их столбцы в SELECT
+    include=items,client               связанные записи: один запрос на связь для всей страницы
+    fields[items]=product_id,quantity  поля связанных записей
+    limit=50, cursor=...               размер страницы и курсор из next_cursor/previous_cursor
+
+Журнал событий заказов (events.py) читается отдельно:
+
+    GET    /api/events/?after=<смещение>&limit=100[&order_id=...]
+
+Ответ — события с большим смещением и next_offset для следующего запроса.
+
+Записи проверяются теми же формами, что и HTML-страницы. Аутентификация —
+сессия Django; изменяющие запросы, как и формы, требуют CSRF-токен
+(заголовок X-CSRFToken).
+"""
+import json
+from functools import wraps
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.http import require_http_methods
+
+from . import events, refdata, totals, transitions
+from .forms import AddressForm, ClientForm, OrderForm, OrderSearchForm
+from .models import Address, Client, Order, OrderItem, Product
+from .pagination import KeysetPaginator
+from .search import search_queryset
+
+API_PAGE_SIZE = 50
+MAX_API_PAGE_SIZE = 200
+MAX_BATCH_IDS = 200
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors
+
+
+def error_response(message, status, errors=None):
+    payload = {'error': message}
+    if errors:
+        payload['errors'] = errors
+    return JsonResponse(payload, status=status)
+
+
+def api_login_required(view):
+    """Как login_required, но вместо перенаправления на страницу входа — 401"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error_response('Требуется аутентификация', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+# ==================== ОПИСАНИЕ РЕСУРСОВ ====================
+
+class Field:
+    """Поле ответа: столбец модели для only() и функция получения значения"""
+
+    def __init__(self, column, getter=None):
+        self.column = column
+        self.getter = getter or (lambda obj: getattr(obj, column))
+
+
+def ref_code(table, column):
+    """Код записи справочника вместо её id (статус, способ оплаты)"""
+    def getter(obj):
+        row = table.get(getattr(obj, column))
+        return row.code if row else None
+    return Field(column, getter)
+
+
+class Include:
+    """
+    Связь для include=: relation — имя связи для prefetch_related,
+    parent_column/child_column — столбцы, которые должны попасть в only()
+    родителя и связанной выборки, чтобы Django мог сопоставить записи.
+    """
+
+    def __init__(self, relation, resource, many, parent_column='id', child_column='id'):
+        self.relation = relation
+        self.resource = resource
+        self.many = many
+        self.parent_column = parent_column
+        self.child_column = child_column
+
+
+class Resource:
+    def __init__(self, model, fields, cursor_field=None, includes=None, form_class=None,
+                 filter_queryset=None, default_fields=None):
+        self.model = model
+        self.fields = fields
+        self.cursor_field = cursor_field
+        self.includes = includes or {}
+        self.form_class = form_class
+        self.filter_queryset = filter_queryset
+        self.default_fields = default_fields or list(fields)
+
+    def parse_fields(self, raw):
+        if not raw:
+            return self.default_fields
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(f'Неизвестные поля: {", ".join(unknown)}')
+        return names
+
+    def project(self, queryset, names, extra_columns=()):
+        """Только нужные столбцы: поля ответа, курсор и ключи связей"""
+        columns = {'id', *extra_columns}
+        columns.update(self.fields[name].column for name in names)
+        if self.cursor_field:
+            columns.add(self.cursor_field)
+        return queryset.only(*columns)
+
+    def serialize(self, obj, names, includes=()):
+        data = {name: self.fields[name].getter(obj) for name in names}
+        for name, include, child_names in includes:
+            child = RESOURCES[include.resource]
+            if include.many:
+                data[name] = [child.serialize(item, child_names) for item in getattr(obj, include.relation).all()]
+            else:
+                related = getattr(obj, include.relation)
+                data[name] = child.serialize(related, child_names) if related else None
+        return data
+
+    def read_queryset(self, params):
+        """Выборка с проекцией и prefetch связей; возвращает (queryset, names, includes)"""
+        names = self.parse_fields(params.get('fields'))
+        includes = []
+        parent_columns = []
+        prefetches = []
+        for name in filter(None, (part.strip() for part in params.get('include', '').split(','))):
+            include = self.includes.get(name)
+            if include is None:
+                raise ApiError(f'Неизвестная связь: {name}')
+            child = RESOURCES[include.resource]
+            child_names = child.parse_fields(params.get(f'fields[{name}]'))
+            child_queryset = child.project(child.model.objects.order_by('pk'), child_names, [include.child_column])
+            prefetches.append(Prefetch(include.relation, queryset=child_queryset))
+            parent_columns.append(include.parent_column)
+            includes.append((name, include, child_names))
+
+        queryset = self.project(self.model.objects.all(), names, parent_columns)
+        if prefetches:
+            queryset = queryset.prefetch_related(*prefetches)
+        return queryset, names, includes
+
+
+# ==================== ЗАПИСЬ ====================
+
+def _form_write(resource, body, instance=None):
+    """Создание или частичное изменение через ModelForm ресурса"""
+    form_class = resource.form_class
+    # Поля API называются client_id, status и т.п., а поля формы — client, status
+    body = {key[:-3] if key.endswith('_id') and key[:-3] in form_class.base_fields else key: value
+            for key, value in body.items()}
+    for key, table in (('status', refdata.statuses), ('payment_method', refdata.payment_methods)):
+        if key in form_class.base_fields and isinstance(body.get(key), str) and table.by_key(body[key]):
+            body[key] = table.pk_for(body[key])
+
+    data = {}
+    if instance is not None:
+        current = form_class(instance=instance)
+        data = {name: current[name].value() for name in current.fields}
+    data.update(body)
+
+    form = form_class(data, instance=instance)
+    if not form.is_valid():
+        raise ApiError('Ошибка проверки данных', errors=form.errors.get_json_data())
+    try:
+        return form.save()
+    except transitions.TransitionError as e:
+        raise ApiError(str(e), status=409)
+
+
+def _positive_int(body, key, default=None):
+    value = body.get(key, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        value = 0
+    if value <= 0:
+        raise ApiError('Ошибка проверки данных', errors={key: [{'message': 'Ожидается целое число больше 0'}]})
+    return value
+
+
+def _order_item_create(resource, body):
+    try:
+        order = Order.objects.get(pk=body.get('order_id'))
+        product = Product.objects.get(pk=body.get('product_id'))
+    except (Order.DoesNotExist, Product.DoesNotExist, TypeError, ValueError):
+        raise ApiError('Заказ или товар не найден')
+    return totals.add_item(order, product, _positive_int(body, 'quantity', 1))
+
+
+def _order_item_update(resource, body, item):
+    if 'quantity' in body:
+        item = totals.change_quantity(item, _positive_int(body, 'quantity'))
+        if item is None:
+            raise ApiError('Запись не найдена', status=404)
+    return item
+
+
+def _order_item_delete(item):
+    if not totals.remove_item(item):
+        raise ApiError('Запись не найдена', status=404)
+
+
+# ==================== РЕСУРСЫ ====================
+
+def _filter_orders(queryset, params):
+    return OrderSearchForm(params).filter_queryset(queryset)
+
+
+def _filter_order_items(queryset, params):
+    if params.get('order'):
+        queryset = queryset.filter(order_id=params['order'])
+    return queryset
+
+
+def _filter_by_search(queryset, params):
+    return search_queryset(queryset, params.get('search', ''), rank=False)
+
+
+RESOURCES = {
+    'orders': Resource(
+        Order,
+        fields={
+            'id': Field('id'),
+            'client_id': Field('client_id'),
+            'delivery_address_id': Field('delivery_address_id'),
+            'pickup_address_id': Field('pickup_address_id'),
+            'courier_id': Field('courier_id'),
+            'status': ref_code(refdata.statuses, 'status_id'),
+            'payment_method': ref_code(refdata.payment_methods, 'payment_method_id'),
+            'delivery_cost': Field('delivery_cost'),
+            'order_total': Field('order_total'),
+            'created_at': Field('created_at'),
+            'confirmed_at': Field('confirmed_at'),
+            'courier_assigned_at': Field('courier_assigned_at'),
+            'dispatched_at': Field('dispatched_at'),
+            'delivered_at': Field('delivered_at'),
+            'comment': Field('comment'),
+        },
+        cursor_field='created_at',
+        includes={
+            'items': Include('items', 'order-items', many=True, child_column='order_id'),
+            'client': Include('client', 'clients', many=False, parent_column='client_id'),
+            'delivery_address': Include('delivery_address', 'addresses', many=False,
+                                        parent_column='delivery_address_id'),
+            'pickup_address': Include('pickup_address', 'addresses', many=False,
+                                      parent_column='pickup_address_id'),
+        },
+        form_class=OrderForm,
+        filter_queryset=_filter_orders,
+    ),
+    'order-items': Resource(
+        OrderItem,
+        fields={
+            'id': Field('id'),
+            'order_id': Field('order_id'),
+            'product_id': Field('product_id'),
+            'quantity': Field('quantity'),
+            'price_at_order': Field('price_at_order'),
+        },
+        includes={
+            'order': Include('order', 'orders', many=False, parent_column='order_id'),
+        },
+        filter_queryset=_filter_order_items,
+    ),
+    'clients': Resource(
+        Client,
+        fields={
+            'id': Field('id'),
+            'full_name': Field('full_name'),
+            'email': Field('email'),
+            'phone': Field('phone'),
+            'status': Field('status'),
+            'registration_date': Field('registration_date'),
+        },
+        cursor_field='registration_date',
+        includes={
+            'orders': Include('orders', 'orders', many=True, child_column='client_id'),
+        },
+        form_class=ClientForm,
+        filter_queryset=_filter_by_search,
+    ),
+    'addresses': Resource(
+        Address,
+        fields={
+            name: Field(name) for name in (
+                'id', 'street', 'house_number', 'apartment_number', 'entrance',
+                'floor', 'door_code', 'latitude', 'longitude',
+            )
+        },
+        form_class=AddressForm,
+        filter_queryset=_filter_by_search,
+    ),
+}
+
+WRITERS = {
+    'order-items': (_order_item_create, _order_item_update, _order_item_delete),
+}
+
+
+def get_resource(name):
+    resource = RESOURCES.get(name)
+    if resource is None:
+        raise ApiError(f'Неизвестный ресурс: {name}', status=404)
+    return resource
+
+
+@transaction.atomic
+def _write(name, resource, request, instance=None):
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError('Тело запроса должно быть JSON-объектом')
+    if not isinstance(body, dict):
+        raise ApiError('Тело запроса должно быть JSON-объектом')
+
+    create, update, _ = WRITERS.get(name, (None, None, None))
+    if instance is None:
+        obj = create(resource, body) if create else _form_write(resource, body)
+    else:
+        obj = update(resource, body, instance) if update else _form_write(resource, body, instance)
+    obj = resource.model.objects.get(pk=obj.pk)
+    return resource.serialize(obj, resource.default_fields)
+
+
+def _read_page(resource, params):
+    queryset, names, includes = resource.read_queryset(params)
+    if resource.filter_queryset:
+        queryset = resource.filter_queryset(queryset, params)
+
+    if params.get('ids'):
+        try:
+            ids = [int(pk) for pk in params['ids'].split(',') if pk.strip()]
+        except ValueError:
+            raise ApiError('ids — список целых чисел через запятую')
+        if len(ids) > MAX_BATCH_IDS:
+            raise ApiError(f'Не больше {MAX_BATCH_IDS} id за запрос')
+        found = {obj.pk: obj for obj in queryset.filter(pk__in=ids)}
+        return {
+            'data': [resource.serialize(found[pk], names, includes) for pk in ids if pk in found],
+            'missing': [pk for pk in ids if pk not in found],
+        }
+
+    try:
+        limit = max(1, min(int(params.get('limit', API_PAGE_SIZE)), MAX_API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit — целое число')
+    page = KeysetPaginator(queryset, limit, field=resource.cursor_field).get_page(params.get('cursor'))
+    return {
+        'data': [resource.serialize(obj, names, includes) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+    }
+
+
+# ==================== ПРЕДСТАВЛЕНИЯ ====================
+
+@api_login_required
+@require_http_methods(['GET', 'POST'])
+def collection(request, resource):
+    name = resource
+    try:
+        resource = get_resource(name)
+        if request.method == 'POST':
+            return JsonResponse({'data': _write(name, resource, request)}, status=201)
+        return JsonResponse(_read_page(resource, request.GET))
+    except ApiError as e:
+        return error_response(str(e), e.status, e.errors)
+
+
+@api_login_required
+@require_http_methods(['GET', 'PATCH', 'DELETE'])
+def detail(request, resource, pk):
+    name = resource
+    try:
+        resource = get_resource(name)
+        if request.method == 'GET':
+            queryset, names, includes = resource.read_queryset(request.GET)
+            obj = queryset.filter(pk=pk).first()
+        else:
+            obj = resource.model.objects.filter(pk=pk).first()
+        if obj is None:
+            raise ApiError('Запись не найдена', status=404)
+
+        if request.method == 'GET':
+            return JsonResponse({'data': resource.serialize(obj, names, includes)})
+        if request.method == 'PATCH':
+            return JsonResponse({'data': _write(name, resource, request, instance=obj)})
+
+        _, _, delete = WRITERS.get(name, (None, None, None))
+        with transaction.atomic():
+            if delete:
+                delete(obj)
+            else:
+                obj.delete()
+        return HttpResponse(status=204)
+    except ApiError as e:
+        return error_response(str(e), e.status, e.errors)
+
+
+@api_login_required
+@require_http_methods(['GET'])
+def event_feed(request):
+    """События журнала после смещения after"""
+    try:
+        try:
+            after = max(int(request.GET.get('after', 0)), 0)
+            limit = max(1, min(int(request.GET.get('limit', events.DEFAULT_LIMIT)), events.MAX_LIMIT))
+            order_id = int(request.GET['order_id']) if request.GET.get('order_id') else None
+        except ValueError:
+            raise ApiError('after, limit и order_id — целые числа')
+        page, next_offset = events.read(after, limit, order_id)
+        return JsonResponse({'data': [events.serialize(event) for event in page], 'next_offset': next_offset})
+    except ApiError as e:
+        return error_response(str(e), e.status, e.errors)
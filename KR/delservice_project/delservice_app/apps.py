@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class DelserviceAppConfig(AppConfig):
     name = 'delservice_app'
+
+    def ready(self):
+        # Регистрация обработчиков сигналов
+        from . import signals  # noqa: F401
@@ -0,0 +1,256 @@
+"""
+Архив заказов: доставленные заказы старше ARCHIVE_AFTER_MONTHS месяцев
+переносятся из orders, order_items и payments в orders_archive,
+order_items_archive и payments_archive (команда archive_orders).
+
+Рабочие таблицы, а с ними список заказов, счётчики, дневные агрегаты и
+индексы, хранят несколько последних месяцев, а не всю историю. Архив
+читается только по явному запросу: флаг «Включая архив» в списке заказов
+и в отчётах.
+
+На PostgreSQL архивные таблицы секционированы по месяцам даты заказа
+(миграция 0013): запрос с диапазоном дат читает только нужные секции, а
+старую секцию можно отсоединить целиком (DETACH PARTITION). Сами orders
+не секционируются: первичный ключ секционированной таблицы должен
+включать created_at, и на orders не могли бы ссылаться позиции, оплаты,
+отзывы и история статусов. На остальных СУБД архив — обычные таблицы.
+
+Перенос идёт пакетами, каждый пакет — одна транзакция. Из рабочих таблиц
+строки удаляются прямым DELETE, поэтому счётчики, дневные агрегаты (дни
+пересчитываются уже без архивных заказов), строки списка и журнал событий
+(действие archived) обновляются здесь же, как в bulk_actions.
+"""
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from . import counters, events, list_rows, refdata, rollups
+from .dates import day_start
+from .models import (
+    ArchivedOrder, ArchivedOrderItem, ArchivedPayment, Order, OrderEvent, OrderItem, OrderListRow,
+    OrderStatusHistory, Payment, Review, User,
+)
+
+ARCHIVABLE_STATUS_CODE = 'delivered'
+BATCH_SIZE = 1000
+
+# Секционированная таблица → ключ секционирования (миграция 0013)
+PARTITIONED_MODELS = {
+    ArchivedOrder: 'created_at',
+    ArchivedOrderItem: 'order_created_at',
+    ArchivedPayment: 'order_created_at',
+}
+
+ITEM_FIELDS = ('id', 'order_id', 'product_id', 'quantity', 'price_at_order')
+PAYMENT_FIELDS = ('id', 'order_id', 'payment_method_id', 'amount', 'status', 'transaction_number', 'paid_at')
+
+
+def after_months():
+    return getattr(settings, 'ARCHIVE_AFTER_MONTHS', 6)
+
+
+def add_months(day, months):
+    """Первое число месяца, отстоящего от месяца day на months"""
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def cutoff(months=None):
+    """Начало месяца: заказы, созданные раньше, переносятся в архив"""
+    months = after_months() if months is None else months
+    return day_start(add_months(timezone.localdate(), -months))
+
+
+def candidates(before):
+    """Доставленные заказы, созданные до before"""
+    return Order.objects.filter(
+        status_id=refdata.statuses.pk_for(ARCHIVABLE_STATUS_CODE), created_at__lt=before,
+    )
+
+
+# ==================== СЕКЦИИ (PostgreSQL) ====================
+
+def partition_name(table, month):
+    return f'{table}_y{month.year}m{month.month:02d}'
+
+
+def default_partition(table):
+    return f'{table}_default'
+
+
+def ensure_partitions(first, last):
+    """Секции архива для месяцев с first по last (datetime); на других СУБД ничего не делает"""
+    if connection.vendor != 'postgresql':
+        return
+    month = timezone.localdate(first).replace(day=1)
+    last_month = timezone.localdate(last).replace(day=1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        while month <= last_month:
+            for model, key in PARTITIONED_MODELS.items():
+                _create_partition(cursor, model, key, month)
+            month = add_months(month, 1)
+
+
+def _create_partition(cursor, model, key, month):
+    """Секция месяца month для таблицы model.
+
+    Если строки этого месяца уже лежат в секции DEFAULT (например, перенесены
+    до появления секции), CREATE ... PARTITION OF завершится ошибкой: секцию
+    DEFAULT отсоединяют, создают новую, переносят в неё строки и
+    присоединяют DEFAULT обратно — в одной транзакции.
+    """
+    table = model._meta.db_table
+    name = partition_name(table, month)
+    start, end = day_start(month), day_start(add_months(month, 1))
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+    if cursor.fetchone()[0]:
+        return
+    default = default_partition(table)
+    bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    in_range = f'{key} >= %s AND {key} < %s'
+    cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})', [start, end])
+    if not cursor.fetchone()[0]:
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {bounds}')
+        return
+
+    columns = ', '.join(field.column for field in model._meta.concrete_fields)
+    cursor.execute(f'ALTER TABLE {table} DETACH PARTITION {default}')
+    cursor.execute(f'CREATE TABLE {name} PARTITION OF {table} {bounds}')
+    cursor.execute(
+        f'INSERT INTO {name} ({columns}) SELECT {columns} FROM {default} WHERE {in_range}', [start, end],
+    )
+    cursor.execute(f'DELETE FROM {default} WHERE {in_range}', [start, end])
+    cursor.execute(f'ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT')
+
+
+# ==================== ПЕРЕНОС ====================
+
+@transaction.atomic
+def archive_batch(before, batch_size=BATCH_SIZE):
+    """Перенос в архив одного пакета заказов; возвращает число перенесённых"""
+    pks = list(
+        candidates(before).order_by('pk').select_for_update().values_list('pk', flat=True)[:batch_size]
+    )
+    if not pks:
+        return 0
+
+    order_fields = [field.attname for field in Order._meta.concrete_fields]
+    orders = list(Order.objects.filter(pk__in=pks).values(*order_fields))
+    rows = {row.order_id: row for row in list_rows.build_rows(Order.objects.filter(pk__in=pks))}
+    created = {order['id']: order['created_at'] for order in orders}
+    items = list(OrderItem.objects.filter(order_id__in=pks).values(*ITEM_FIELDS))
+    payments = list(Payment.objects.filter(order_id__in=pks).values(*PAYMENT_FIELDS))
+    reviews = {
+        order_id: {'rating': rating, 'text': text, 'created_at': created_at}
+        for order_id, rating, text, created_at in Review.objects.filter(order_id__in=pks).values_list(
+            'order_id', 'rating', 'text', 'created_at',
+        )
+    }
+    history = defaultdict(list)
+    for order_id, from_id, to_id, changed_at in OrderStatusHistory.objects.filter(order_id__in=pks).order_by(
+        'changed_at', 'pk',
+    ).values_list('order_id', 'from_status_id', 'to_status_id', 'changed_at'):
+        history[order_id].append({'from_status_id': from_id, 'to_status_id': to_id, 'changed_at': changed_at})
+
+    ensure_partitions(min(created.values()), max(created.values()))
+    archived = []
+    for order in orders:
+        row = rows[order['id']]
+        archived.append(ArchivedOrder(
+            **order, client_name=row.client_name, client_phone=row.client_phone, address=row.address,
+            courier_name=row.courier_name, item_count=row.item_count,
+            review=reviews.get(order['id']), status_history=history[order['id']],
+        ))
+    ArchivedOrder.objects.bulk_create(archived)
+    ArchivedOrderItem.objects.bulk_create([
+        ArchivedOrderItem(**item, order_created_at=created[item['order_id']]) for item in items
+    ])
+    ArchivedPayment.objects.bulk_create([
+        ArchivedPayment(**payment, order_created_at=created[payment['order_id']]) for payment in payments
+    ])
+
+    # Удаление — как в bulk_actions.delete_orders: по одному DELETE на таблицу
+    OrderStatusHistory.objects.filter(order_id__in=pks).delete()
+    Review.objects.filter(order_id__in=pks).delete()
+    OrderListRow.objects.filter(order_id__in=pks).delete()
+    for model in (OrderItem, Payment):
+        queryset = model.objects.filter(order_id__in=pks)
+        queryset._raw_delete(queryset.db)
+    queryset = Order.objects.filter(pk__in=pks)
+    queryset._raw_delete(queryset.db)
+
+    # Доставленные заказы не ожидают обработки — счётчик ожидающих не меняется
+    per_day = Counter(counters.order_day_key(created_at) for created_at in created.values())
+    counters.increment({
+        counters.ORDERS_TOTAL: -len(pks),
+        **{key: -count for key, count in per_day.items()},
+    })
+    rollups.mark_dirty(list(created.values()) + [payment['paid_at'] for payment in payments])
+    events.record_many([(OrderEvent.ORDER, pk, pk, OrderEvent.ARCHIVED, None) for pk in pks])
+    return len(pks)
+
+
+def archive(before, batch_size=BATCH_SIZE, progress=None):
+    """Перенос всех заказов, подходящих для архива; возвращает их число"""
+    total = 0
+    while True:
+        moved = archive_batch(before, batch_size)
+        if not moved:
+            return total
+        total += moved
+        if progress:
+            progress(total)
+
+
+# ==================== ОТЧЁТЫ С АРХИВОМ ====================
+# Архив не попадает в дневные агрегаты: его суммы считаются по запросу
+
+def with_courier_stats(stats, days=30):
+    """Эффективность курьеров (rollups.courier_stats) вместе с архивными заказами за тот же период"""
+    since = day_start(timezone.localdate() - timedelta(days=days))
+    archived = {
+        row['courier_id']: row for row in ArchivedOrder.objects.filter(
+            created_at__gte=since, courier_id__isnull=False,
+        ).values('courier_id').annotate(deliveries=Count('id'), earnings=Sum('delivery_cost')).order_by()
+    }
+    stats = list(stats)
+    for courier in stats:
+        row = archived.pop(courier.pk, None)
+        if row:
+            courier.total_deliveries += row['deliveries']
+            courier.total_earnings = (courier.total_earnings or 0) + row['earnings']
+    # Курьеры, у которых за период есть только архивные заказы
+    for courier in User.objects.filter(pk__in=archived, role_id=counters.courier_role_id()):
+        row = archived[courier.pk]
+        courier.total_deliveries, courier.total_earnings = row['deliveries'], row['earnings']
+        stats.append(courier)
+    return sorted(stats, key=lambda courier: courier.total_deliveries, reverse=True)
+
+
+def with_status_stats(stats):
+    """Количество заказов по статусам (rollups.status_stats) вместе с архивом"""
+    archived = dict(ArchivedOrder.objects.values_list('status_id').annotate(Count('id')).order_by())
+    stats = list(stats)
+    for status in stats:
+        status.order_count += archived.get(status.pk, 0)
+    return stats
+
+
+def with_payment_stats(stats):
+    """Платежи по способам оплаты (rollups.payment_stats) вместе с архивом"""
+    archived = {
+        row['payment_method_id']: row for row in ArchivedPayment.objects.values('payment_method_id').annotate(
+            amount=Sum('amount'), payments=Count('id'),
+        ).order_by()
+    }
+    stats = list(stats)
+    for method in stats:
+        row = archived.get(method.pk)
+        if row:
+            method.total_amount = (method.total_amount or 0) + row['amount']
+            method.payment_count += row['payments']
+    return stats
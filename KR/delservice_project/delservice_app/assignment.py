@@ -0,0 +1,136 @@
+"""
+Автоматическое назначение курьеров на подтверждённые заказы.
+
+Кандидаты — курьеры в статусе «works», у которых активных заказов
+(«assigned»/«dispatched») меньше COURIER_MAX_ACTIVE_ORDERS. Положение
+курьера — адрес доставки последнего назначенного ему заказа; курьеры без
+истории считаются находящимися в центре текущих заказов. Заказы
+обрабатываются по очереди создания, каждому достаётся ближайший по
+сеточному индексу (geo.GridIndex) курьер со свободным местом.
+
+Назначение — один UPDATE на курьера через transitions.bulk_transition с
+условием «курьер ещё не назначен и статус не изменился», поэтому заказы,
+которые за это время назначили вручную, не перезаписываются.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+
+from . import counters, refdata, transitions
+from .geo import GridIndex
+from .models import Order, User
+
+ASSIGNABLE_STATUS_CODE = 'confirmed'
+ASSIGNED_STATUS_CODE = 'assigned'
+ACTIVE_STATUS_CODES = ('assigned', 'dispatched')
+
+DEFAULT_CAPACITY = 3
+GRID_CELL_KM = 2.0
+
+
+class AssignmentResult:
+    def __init__(self):
+        self.assignments = []   # (order_id, courier_id, км)
+        self.assigned = 0
+        self.skipped = 0        # заказ успели изменить параллельно
+        self.no_location = []   # у заказа нет координат
+        self.no_courier = []    # не хватило свободных курьеров
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def pending_orders(limit=None):
+    """Подтверждённые заказы без курьера с координатами точки забора (или доставки)"""
+    orders = Order.objects.filter(
+        status_id=refdata.statuses.pk_for(ASSIGNABLE_STATUS_CODE), courier__isnull=True,
+    ).order_by('created_at', 'id').values_list(
+        'id', 'created_at',
+        'pickup_address__latitude', 'pickup_address__longitude',
+        'delivery_address__latitude', 'delivery_address__longitude',
+    )
+    if limit:
+        orders = orders[:limit]
+    return orders
+
+
+def available_couriers(capacity):
+    """Работающие курьеры со свободными местами: [(id, свободно, широта, долгота)]"""
+    active_ids = [refdata.statuses.pk_for(code) for code in ACTIVE_STATUS_CODES]
+    last_order = Order.objects.filter(
+        courier_id=OuterRef('pk'), delivery_address__latitude__isnull=False,
+    ).order_by(F('courier_assigned_at').desc(nulls_last=True), '-id')
+
+    couriers = User.objects.filter(
+        role_id=counters.courier_role_id(), status=counters.ACTIVE_USER_STATUS,
+    ).annotate(
+        load=Count('delivered_orders', filter=Q(delivered_orders__status_id__in=active_ids)),
+        latitude=Subquery(last_order.values('delivery_address__latitude')[:1]),
+        longitude=Subquery(last_order.values('delivery_address__longitude')[:1]),
+    ).values_list('id', 'load', 'latitude', 'longitude')
+
+    return [
+        (pk, capacity - load, _float(lat), _float(lon))
+        for pk, load, lat, lon in couriers if load < capacity
+    ]
+
+
+def plan(orders, couriers, result):
+    """Распределение заказов по ближайшим курьерам со свободными местами"""
+    located = []
+    for order_id, created_at, pickup_lat, pickup_lon, delivery_lat, delivery_lon in orders:
+        lat, lon = (pickup_lat, pickup_lon) if pickup_lat is not None else (delivery_lat, delivery_lon)
+        if lat is None or lon is None:
+            result.no_location.append(order_id)
+        else:
+            located.append((order_id, created_at, float(lat), float(lon)))
+    if not located or not couriers:
+        result.no_courier.extend(order_id for order_id, *_ in located)
+        return
+
+    center_lat = sum(lat for _, _, lat, _ in located) / len(located)
+    center_lon = sum(lon for _, _, _, lon in located) / len(located)
+    courier_ids = [pk for pk, *_ in couriers]
+    free = [slots for _, slots, _, _ in couriers]
+    index = GridIndex(
+        [lat if lat is not None else center_lat for _, _, lat, _ in couriers],
+        [lon if lon is not None else center_lon for _, _, _, lon in couriers],
+        cell_km=GRID_CELL_KM,
+    )
+
+    for order_id, created_at, lat, lon in located:
+        position, km = index.nearest(lat, lon, accept=lambda i: free[i] > 0)
+        if position is None:
+            result.no_courier.append(order_id)
+            continue
+        free[position] -= 1
+        result.assignments.append((order_id, courier_ids[position], km))
+
+
+def apply(result):
+    """Запись назначений: один условный UPDATE на курьера"""
+    by_courier = defaultdict(list)
+    for order_id, courier_id, _ in result.assignments:
+        by_courier[courier_id].append(order_id)
+
+    with transaction.atomic():
+        for courier_id, order_ids in by_courier.items():
+            # Заказ, которому курьера успели назначить вручную, не перезаписывается
+            result.assigned += transitions.bulk_transition(
+                Order.objects.filter(pk__in=order_ids, courier__isnull=True),
+                ASSIGNED_STATUS_CODE, from_codes=[ASSIGNABLE_STATUS_CODE], courier_id=courier_id,
+            )
+    result.skipped = len(result.assignments) - result.assigned
+
+
+def assign_pending(limit=None, capacity=None, dry_run=False):
+    """Назначение курьеров всем ожидающим заказам (не больше limit)"""
+    capacity = capacity or getattr(settings, 'COURIER_MAX_ACTIVE_ORDERS', DEFAULT_CAPACITY)
+    result = AssignmentResult()
+    plan(list(pending_orders(limit)), available_couriers(capacity), result)
+    if not dry_run and result.assignments:
+        apply(result)
+    return result
@@ -0,0 +1,192 @@
+"""
+Асинхронные версии нагруженных страниц: dashboard, список заказов,
+карточка заказа и отчёты, а также поток живых обновлений для них (live.py).
+
+Подключаются вместо синхронных при ASYNC_VIEWS = True (так делает
+delservice_project/asgi.py). Независимые запросы выполняются одновременно
+через asyncio.gather: асинхронный ORM (aget, async for) работает в общем
+потоке Django, а синхронный код с ORM (счётчики, пагинация, агрегаты)
+уходит в отдельные потоки со своими соединениями — иначе все запросы
+выстроились бы в очередь в одном потоке.
+
+Шаблоны рендерятся через sync_to_async: base.html читает request.user и
+сессию, а это синхронный код.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import render
+
+from . import analytics, archive, counters, events, list_rows, live, profiling, rollups
+from .forms import OrderBulkActionForm, OrderSearchForm
+from .models import ArchivedOrder, Order, OrderItem, OrderListRow
+from .pagination import KeysetPaginator
+
+
+def in_thread(func, *args, **kwargs):
+    """Синхронный код с ORM в отдельном потоке; соединение закрывается по правилам CONN_MAX_AGE.
+
+    Запросы потока попадают в открытый профиль (QueryProfilerMiddleware, тесты).
+    """
+    def run():
+        try:
+            with profiling.attach_active():
+                return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)()
+
+
+async def render_async(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def _nothing():
+    return None
+
+
+@login_required
+async def dashboard(request):
+    """Главная страница: счётчики и последние заказы одновременно"""
+    recent_orders = Order.objects.select_related(
+        'client', 'status', 'courier', 'delivery_address'
+    ).order_by('-created_at')[:10]
+
+    async def load_recent_orders():
+        return [order async for order in recent_orders]
+
+    context, orders, live_offset = await asyncio.gather(
+        in_thread(counters.dashboard_counts),
+        load_recent_orders(),
+        in_thread(events.last_offset),
+    )
+    context['recent_orders'] = orders
+    context['live_offset'] = live_offset
+    return await render_async(request, 'delservice_app/dashboard.html', context)
+
+
+def _filtered_orders(params):
+    form = OrderSearchForm(params or None)
+    orders = form.filter_queryset(OrderListRow.objects.all())
+    if form.include_archive:
+        orders = [orders, form.filter_queryset(ArchivedOrder.objects.all())]
+    return form, orders
+
+
+@login_required
+async def order_list(request):
+    """Список заказов: страница и примерное количество одновременно"""
+    form, orders = await in_thread(_filtered_orders, request.GET)
+
+    paginator = KeysetPaginator(orders, 20)
+    page_obj, total, live_offset, bulk_form = await asyncio.gather(
+        in_thread(paginator.get_page, request.GET.get('cursor')),
+        in_thread(paginator.approximate_count) if request.GET.get('total') == '1' else _nothing(),
+        in_thread(events.last_offset),
+        # Справочники при пустом кэше читаются из БД — не в цикле событий
+        in_thread(OrderBulkActionForm),
+    )
+    page_obj.approximate_total = total
+    await in_thread(list_rows.with_statuses, page_obj)
+
+    context = {
+        'orders': page_obj,
+        'form': form,
+        'page_obj': page_obj,
+        'live_offset': live_offset,
+        'bulk_form': bulk_form,
+    }
+    return await render_async(request, 'delservice_app/order_list.html', context)
+
+
+@login_required
+async def order_detail(request, order_id):
+    """Карточка заказа: заказ со связями и его позиции одновременно"""
+    order_query = Order.objects.select_related(
+        'client', 'delivery_address', 'pickup_address', 'courier', 'status',
+        'payment_method', 'payment', 'review',
+    ).aget(id=order_id)
+
+    async def load_items():
+        return [item async for item in OrderItem.objects.filter(order_id=order_id).select_related('product')]
+
+    try:
+        order, items = await asyncio.gather(order_query, load_items())
+    except Order.DoesNotExist:
+        raise Http404('Заказ не найден')
+
+    for item in items:
+        item.total_price = item.price_at_order * item.quantity
+
+    context = {
+        'order': order,
+        'items': items,
+        'payment': getattr(order, 'payment', None),
+        'review': getattr(order, 'review', None),
+    }
+    return await render_async(request, 'delservice_app/order_detail.html', context)
+
+
+def _refresh_reports():
+    # Оба пересчёта пишут в базу — по очереди в одном потоке и соединении:
+    # параллельно на SQLite они упирались бы в блокировку базы
+    rollups.refresh_dirty()
+    analytics.refresh(days=30)
+
+
+@login_required
+async def reports(request):
+    """Отчёты: агрегаты и перцентили времени выполнения читаются одновременно"""
+    await in_thread(_refresh_reports)
+
+    courier_stats, status_stats, payment_stats, latency, latency_by_day = await asyncio.gather(
+        in_thread(lambda: list(rollups.courier_stats(days=30))),
+        in_thread(lambda: list(rollups.status_stats())),
+        in_thread(lambda: list(rollups.payment_stats())),
+        in_thread(analytics.window_stats, days=30),
+        in_thread(analytics.daily_stats, days=30),
+    )
+    # Архив — по запросу: его суммы считаются по архивным таблицам
+    include_archive = request.GET.get('archive') == '1'
+    if include_archive:
+        courier_stats, status_stats, payment_stats = await asyncio.gather(
+            in_thread(archive.with_courier_stats, courier_stats, days=30),
+            in_thread(archive.with_status_stats, status_stats),
+            in_thread(archive.with_payment_stats, payment_stats),
+        )
+    context = {
+        'courier_stats': courier_stats,
+        'status_stats': status_stats,
+        'payment_stats': payment_stats,
+        'stage_titles': analytics.stage_titles(),
+        'latency': latency,
+        'latency_by_day': latency_by_day,
+        'include_archive': include_archive,
+    }
+    return await render_async(request, 'delservice_app/reports.html', context)
+
+
+async def live_events(request):
+    """Поток живых обновлений (SSE) для панели и списка заказов"""
+    user = await request.auser()
+    if not user.is_authenticated:
+        # Не перенаправление на вход: EventSource не переподключается после ошибки
+        return HttpResponse(status=401)
+    if not settings.ASYNC_VIEWS:
+        # Под WSGI поток занял бы рабочий поток целиком; 204 останавливает переподключения
+        return HttpResponse(status=204)
+
+    after = request.headers.get('Last-Event-ID') or request.GET.get('after')
+    try:
+        after = int(after) if after else None
+    except ValueError:
+        after = None
+    response = StreamingHttpResponse(live.stream(after), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # nginx не должен буферизовать поток
+    response['X-Accel-Buffering'] = 'no'
+    return response
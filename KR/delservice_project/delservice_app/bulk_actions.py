@@ -0,0 +1,190 @@
+"""
+Массовые действия над заказами из списка: смена статуса, назначение
+курьера, удаление.
+
+Каждое действие — одна транзакция: строки выбранных заказов блокируются
+одним SELECT ... FOR UPDATE, проверяются в Python, и допустимые
+изменяются одним UPDATE или DELETE на таблицу, без загрузки моделей и
+формы заказа на каждую строку. Результат — по каждому id: выполнено
+или причина отказа.
+
+UPDATE и DELETE не вызывают сигналы, поэтому счётчики, дневные агрегаты,
+журнал событий и строки списка заказов обновляются здесь же (смена
+статуса — через transitions).
+"""
+from collections import Counter
+
+from django.db import transaction
+
+from . import counters, events, list_rows, refdata, rollups, transitions
+from .models import Order, OrderEvent, OrderItem, OrderListRow, OrderStatusHistory, Payment, Review, User
+
+CHANGE_STATUS = 'status'
+ASSIGN_COURIER = 'courier'
+DELETE = 'delete'
+ACTIONS = [
+    (CHANGE_STATUS, 'Сменить статус'),
+    (ASSIGN_COURIER, 'Назначить курьера'),
+    (DELETE, 'Удалить'),
+]
+DONE_MESSAGES = {
+    CHANGE_STATUS: 'Статус изменён у заказов',
+    ASSIGN_COURIER: 'Курьер назначен заказам',
+    DELETE: 'Удалено заказов',
+}
+
+# Не больше стольких заказов за одно действие
+MAX_ORDERS = 1000
+
+ASSIGNABLE_STATUS_CODE = 'confirmed'
+ASSIGNED_STATUS_CODE = 'assigned'
+REASSIGNABLE_STATUS_CODES = ('assigned', 'dispatched')
+
+NOT_FOUND = 'Заказ не найден'
+
+
+class BulkResult:
+    def __init__(self, ids):
+        self.results = {pk: NOT_FOUND for pk in ids}   # id → None (выполнено) или причина отказа
+
+    def done(self, pk):
+        self.results[pk] = None
+
+    def fail(self, pk, reason):
+        self.results[pk] = reason
+
+    @property
+    def succeeded(self):
+        return [pk for pk, reason in self.results.items() if reason is None]
+
+    @property
+    def failed(self):
+        return {pk: reason for pk, reason in self.results.items() if reason is not None}
+
+    def as_dict(self):
+        return {
+            'results': {
+                str(pk): {'ok': True} if reason is None else {'ok': False, 'error': reason}
+                for pk, reason in self.results.items()
+            },
+            'succeeded': len(self.succeeded),
+            'failed': len(self.failed),
+        }
+
+
+def _locked(ids, *fields):
+    """Строки выбранных заказов под блокировкой до конца транзакции"""
+    return list(Order.objects.filter(pk__in=ids).select_for_update().values_list('pk', *fields))
+
+
+@transaction.atomic
+def change_status(ids, to_code):
+    """Перевод заказов в статус to_code; недопустимые переходы не выполняются"""
+    result = BulkResult(ids)
+    target = refdata.statuses.by_key(to_code)
+    allowed = []
+    for pk, status_id in _locked(ids, 'status_id'):
+        current = refdata.statuses.get(status_id)
+        if transitions.is_allowed(current.code, to_code):
+            allowed.append(pk)
+        elif status_id == target.pk:
+            result.fail(pk, f'Заказ уже в статусе «{target.name}»')
+        else:
+            result.fail(pk, f'Из статуса «{current.name}» нельзя перейти в «{target.name}»')
+
+    # Строки заблокированы выше — статусы не изменятся, и UPDATE затронет все разрешённые
+    transitions.bulk_transition(allowed, to_code)
+    for pk in allowed:
+        result.done(pk)
+    return result
+
+
+@transaction.atomic
+def assign_courier(ids, courier_id):
+    """Назначение курьера.
+
+    Подтверждённые заказы переходят в «assigned», у назначенных и уже
+    выехавших меняется курьер, остальные не трогаются.
+    """
+    result = BulkResult(ids)
+    assignable_id = refdata.statuses.pk_for(ASSIGNABLE_STATUS_CODE)
+    reassignable_ids = {refdata.statuses.pk_for(code) for code in REASSIGNABLE_STATUS_CODES}
+
+    to_assign, to_reassign = [], []
+    for pk, status_id, current_courier_id, created_at in _locked(ids, 'status_id', 'courier_id', 'created_at'):
+        if status_id == assignable_id:
+            to_assign.append(pk)
+        elif status_id in reassignable_ids:
+            if current_courier_id == courier_id:
+                result.done(pk)
+            else:
+                to_reassign.append((pk, created_at))
+        else:
+            status = refdata.statuses.get(status_id)
+            result.fail(pk, f'Курьера нельзя назначить заказу в статусе «{status.name}»')
+
+    transitions.bulk_transition(to_assign, ASSIGNED_STATUS_CODE, courier_id=courier_id)
+    if to_reassign:
+        pks = [pk for pk, _ in to_reassign]
+        Order.objects.filter(pk__in=pks).update(courier_id=courier_id)
+        # Агрегаты по курьерам считаются по дню создания заказа
+        rollups.mark_dirty([created_at for _, created_at in to_reassign])
+        events.record_updated(OrderEvent.ORDER, {pk: (pk, {'courier_id': courier_id}) for pk in pks})
+        list_rows.refresh(pks)
+    for pk in to_assign + [pk for pk, _ in to_reassign]:
+        result.done(pk)
+    return result
+
+
+@transaction.atomic
+def delete_orders(ids):
+    """Удаление заказов вместе с позициями, оплатами, отзывами и историей статусов"""
+    result = BulkResult(ids)
+    rows = _locked(ids, 'created_at', 'status_id')
+    if not rows:
+        return result
+    pks = [pk for pk, _, _ in rows]
+    items = list(OrderItem.objects.filter(order_id__in=pks).values_list('pk', 'order_id'))
+    paid_days = list(Payment.objects.filter(order_id__in=pks).values_list('paid_at', flat=True))
+
+    # По одному DELETE на таблицу. QuerySet.delete() загрузил бы все объекты ради
+    # сигналов, поэтому у моделей с обработчиками сигналов — прямой DELETE
+    OrderStatusHistory.objects.filter(order_id__in=pks).delete()
+    Review.objects.filter(order_id__in=pks).delete()
+    OrderListRow.objects.filter(order_id__in=pks).delete()
+    for model in (OrderItem, Payment):
+        queryset = model.objects.filter(order_id__in=pks)
+        queryset._raw_delete(queryset.db)
+    orders = Order.objects.filter(pk__in=pks)
+    orders._raw_delete(orders.db)
+
+    pending_id = counters.pending_status_id()
+    per_day = Counter(counters.order_day_key(created_at) for _, created_at, _ in rows)
+    counters.increment({
+        counters.ORDERS_TOTAL: -len(rows),
+        counters.ORDERS_PENDING: -sum(status_id == pending_id for _, _, status_id in rows),
+        **{key: -count for key, count in per_day.items()},
+    })
+    rollups.mark_dirty([created_at for _, created_at, _ in rows] + paid_days)
+    events.record_many(
+        [(OrderEvent.ORDER_ITEM, pk, order_id, OrderEvent.DELETED, None) for pk, order_id in items] +
+        [(OrderEvent.ORDER, pk, pk, OrderEvent.DELETED, None) for pk in pks]
+    )
+    for pk in pks:
+        result.done(pk)
+    return result
+
+
+def working_couriers():
+    """Работающие курьеры — кого можно назначить"""
+    return User.objects.filter(
+        role_id=counters.courier_role_id(), status=counters.ACTIVE_USER_STATUS,
+    ).order_by('full_name')
+
+
+def apply(action, ids, status=None, courier=None):
+    if action == CHANGE_STATUS:
+        return change_status(ids, status)
+    if action == ASSIGN_COURIER:
+        return assign_courier(ids, courier.pk)
+    return delete_orders(ids)
@@ -0,0 +1,132 @@
+"""
+Счётчики панели управления.
+
+Значения хранятся в таблице dashboard_counters и меняются на ±1 сигналами
+post_save/post_delete моделей Order и User, поэтому dashboard читает их
+одним запросом вместо COUNT по orders и users. Массовые операции через
+QuerySet.update()/bulk_create() сигналы не вызывают — такой код должен
+сам вызвать increment() или reconcile(). Команда reconcile_counters
+пересчитывает значения с нуля и устраняет накопившиеся расхождения.
+"""
+from datetime import date, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import refdata
+from .dates import day_start
+from .models import DashboardCounter, Order, User
+
+ORDERS_TOTAL = 'orders_total'
+ORDERS_PENDING = 'orders_pending'
+COURIERS_ACTIVE = 'couriers_active'
+
+PENDING_STATUS_CODE = 'created'
+COURIER_ROLE_NAME = 'courier'
+ACTIVE_USER_STATUS = 'works'
+DAY_KEY_PREFIX = 'orders_day:'
+
+
+def day_key(day):
+    """Ключ счётчика заказов за день"""
+    return f'{DAY_KEY_PREFIX}{day.isoformat()}'
+
+
+def order_day_key(created_at):
+    return day_key(timezone.localdate(created_at))
+
+
+def pending_status_id():
+    return refdata.statuses.pk_for(PENDING_STATUS_CODE)
+
+
+def courier_role_id():
+    return refdata.roles.pk_for(COURIER_ROLE_NAME)
+
+
+def is_active_courier(role_id, status):
+    return role_id is not None and role_id == courier_role_id() and status == ACTIVE_USER_STATUS
+
+
+def increment(deltas):
+    """
+    Атомарное изменение счётчиков: {ключ: приращение}.
+
+    Вызывается после изменения исходных таблиц. Если строки счётчика ещё
+    нет, она создаётся сразу с точным значением, которое уже учитывает
+    это изменение, — приращение к нему не добавляется.
+    """
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        if DashboardCounter.objects.filter(key=key).update(value=F('value') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                DashboardCounter.objects.create(key=key, value=count(key))
+        except IntegrityError:
+            # Строку успел создать параллельный запрос
+            DashboardCounter.objects.filter(key=key).update(value=F('value') + delta)
+
+
+def get_many(keys):
+    """Значения счётчиков; отсутствующие ключи в словарь не попадают"""
+    return dict(DashboardCounter.objects.filter(key__in=keys).values_list('key', 'value'))
+
+
+def count(key):
+    """Точное значение одного счётчика по исходным таблицам"""
+    if key.startswith(DAY_KEY_PREFIX):
+        return count_day(date.fromisoformat(key[len(DAY_KEY_PREFIX):]))
+    if key == ORDERS_TOTAL:
+        return Order.objects.count()
+    if key == ORDERS_PENDING:
+        return Order.objects.filter(status_id=pending_status_id()).count()
+    if key == COURIERS_ACTIVE:
+        return User.objects.filter(role_id=courier_role_id(), status=ACTIVE_USER_STATUS).count()
+    raise KeyError(key)
+
+
+def compute(days=1):
+    """Точные значения счётчиков по исходным таблицам"""
+    values = {key: count(key) for key in (ORDERS_TOTAL, ORDERS_PENDING, COURIERS_ACTIVE)}
+    today = timezone.localdate()
+    for offset in range(days):
+        day = today - timedelta(days=offset)
+        values[day_key(day)] = count_day(day)
+    return values
+
+
+def count_day(day):
+    start = day_start(day)
+    return Order.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1)).count()
+
+
+@transaction.atomic
+def reconcile(days=1):
+    """Перезапись счётчиков точными значениями; возвращает словарь значений"""
+    values = compute(days)
+    for key, value in values.items():
+        DashboardCounter.objects.update_or_create(key=key, defaults={'value': value})
+    return values
+
+
+def dashboard_counts():
+    """Счётчики для dashboard; при первом обращении заполняются пересчётом"""
+    today = day_key(timezone.localdate())
+    keys = [ORDERS_TOTAL, ORDERS_PENDING, COURIERS_ACTIVE, today]
+    values = get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing == [today]:
+        # Наступили новые сутки — достаточно посчитать один день по индексу
+        values[today] = count_day(timezone.localdate())
+        DashboardCounter.objects.get_or_create(key=today, defaults={'value': values[today]})
+    elif missing:
+        values = reconcile()
+    return {
+        'total_orders': values[ORDERS_TOTAL],
+        'pending_orders': values[ORDERS_PENDING],
+        'active_couriers': values[COURIERS_ACTIVE],
+        'today_orders': values[today],
+    }
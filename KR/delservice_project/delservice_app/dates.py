@@ -0,0 +1,15 @@
+"""
+Границы суток для фильтров по датам.
+
+Даты в формах, счётчиках, агрегатах и архиве — локальные (TIME_ZONE), а
+поля created_at и прочие метки хранятся как aware datetime: фильтр «за
+день» — это полуинтервал от начала суток до начала следующих.
+"""
+from datetime import datetime, time
+
+from django.utils import timezone
+
+
+def day_start(day):
+    """Начало суток в текущем часовом поясе"""
+    return timezone.make_aware(datetime.combine(day, time.min))
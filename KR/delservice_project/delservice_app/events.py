@@ -0,0 +1,158 @@
+"""
+Журнал событий заказов (outbox): сжатые записи об изменениях заказов и
+их позиций для внешних потребителей.
+
+Событие пишется в той же транзакции, что и само изменение: откат убирает
+и событие, а зафиксированное изменение всегда есть в журнале. Изменения
+через save()/delete() записывают сигналы; массовые UPDATE и bulk_create
+(transitions, импорт) сигналов не вызывают и пишут события сами — так же,
+как счётчики. changes — только изменившиеся поля, при создании — все
+отслеживаемые. Сумма заказа, изменённая приращением (totals), отдельного
+события не даёт: её изменение следует из событий позиций.
+
+Потребитель читает журнал по смещению — position события: read(after)
+отдаёт события с position больше after по возрастанию. Id для этого не
+годится: он выдаётся при вставке, а видно событие только после фиксации,
+и событие долгой транзакции с меньшим id появилось бы позже соседних —
+потребитель, уже прочитавший соседей, его пропустил бы. Поэтому смещения
+выдаёт sequence() уже зафиксированным событиям, по порядку, под блокировкой
+строки POSITION_KEY в system_counters (там же — последнее выданное):
+событие, зафиксированное позже, получает большее смещение, сколько бы ни
+длилась его транзакция. Перед чтением read() сам вызывает sequence().
+"""
+from django.db import transaction
+from django.db.models import Max
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Order, OrderEvent, SystemCounter
+
+ORDER_FIELDS = (
+    'client_id', 'delivery_address_id', 'pickup_address_id', 'courier_id', 'status_id',
+    'payment_method_id', 'delivery_cost', 'order_total', 'comment',
+)
+ORDER_ITEM_FIELDS = ('order_id', 'product_id', 'quantity', 'price_at_order')
+
+FIELDS = {
+    OrderEvent.ORDER: ORDER_FIELDS,
+    OrderEvent.ORDER_ITEM: ORDER_ITEM_FIELDS,
+}
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+POSITION_KEY = 'order_events_position'
+SEQUENCE_BATCH_SIZE = 1000
+
+# В журнал добавлены события; отправляется после фиксации транзакции
+events_written = Signal()
+
+
+def entity_for(instance):
+    return OrderEvent.ORDER if isinstance(instance, Order) else OrderEvent.ORDER_ITEM
+
+
+def snapshot(instance):
+    """Значения отслеживаемых полей; отложенные (only/defer) не читаются"""
+    values = instance.__dict__
+    return {name: values[name] for name in FIELDS[entity_for(instance)] if name in values}
+
+
+def diff(before, after):
+    """Поля after, которых нет в before или значение которых изменилось"""
+    return {name: value for name, value in after.items() if name not in before or before[name] != value}
+
+
+def _event(entity, entity_id, order_id, action, changes=None, now=None):
+    return OrderEvent(
+        entity=entity, entity_id=entity_id, order_id=order_id, action=action,
+        changes=changes or {}, created_at=now or timezone.now(),
+    )
+
+
+def _order_id(instance):
+    return instance.pk if entity_for(instance) == OrderEvent.ORDER else instance.order_id
+
+
+def _written():
+    events_written.send(sender=OrderEvent)
+
+
+def record(instance, action, changes=None):
+    """Событие для заказа или позиции, сохранённых через save()/delete()"""
+    _event(entity_for(instance), instance.pk, _order_id(instance), action, changes).save()
+    transaction.on_commit(_written)
+
+
+def record_many(events):
+    """Пакетная запись [(entity, entity_id, order_id, action, changes)]"""
+    now = timezone.now()
+    OrderEvent.objects.bulk_create([_event(*event, now=now) for event in events])
+    transaction.on_commit(_written)
+
+
+def record_created(instances):
+    """События создания для объектов, записанных bulk_create"""
+    record_many(
+        (entity_for(instance), instance.pk, _order_id(instance), OrderEvent.CREATED, snapshot(instance))
+        for instance in instances
+    )
+
+
+def record_updated(entity, changes):
+    """События изменения для массового UPDATE: {entity_id: (order_id, changes)}"""
+    record_many(
+        (entity, entity_id, order_id, OrderEvent.UPDATED, values)
+        for entity_id, (order_id, values) in changes.items()
+    )
+
+
+# ==================== СМЕЩЕНИЯ ====================
+
+def sequence(batch_size=SEQUENCE_BATCH_SIZE):
+    """Смещения для зафиксированных событий без смещения, в порядке id; возвращает их число"""
+    if not OrderEvent.objects.filter(position__isnull=True).exists():
+        return 0
+    with transaction.atomic():
+        # Блокировка строки: смещения выдаёт один процесс за раз, без повторов
+        counter, _ = SystemCounter.objects.select_for_update().get_or_create(
+            key=POSITION_KEY, defaults={'value': last_offset},
+        )
+        pending = list(
+            OrderEvent.objects.filter(position__isnull=True).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        OrderEvent.objects.bulk_update([
+            OrderEvent(id=pk, position=position) for position, pk in enumerate(pending, counter.value + 1)
+        ], ['position'])
+        counter.value += len(pending)
+        counter.save(update_fields=['value', 'updated_at'])
+    return len(pending)
+
+
+# ==================== ЧТЕНИЕ ====================
+
+def serialize(event):
+    return {
+        'offset': event.position,
+        'entity': event.entity,
+        'entity_id': event.entity_id,
+        'order_id': event.order_id,
+        'action': event.action,
+        'changes': event.changes,
+        'created_at': event.created_at,
+    }
+
+
+def read(after=0, limit=DEFAULT_LIMIT, order_id=None):
+    """События со смещением больше after по возрастанию; (события, следующее смещение)"""
+    sequence(max(limit, SEQUENCE_BATCH_SIZE))
+    events = OrderEvent.objects.filter(position__gt=after).order_by('position')
+    if order_id is not None:
+        events = events.filter(order_id=order_id)
+    events = list(events[:limit])
+    return events, events[-1].position if events else after
+
+
+def last_offset():
+    """Последнее выданное смещение"""
+    return OrderEvent.objects.aggregate(last=Max('position'))['last'] or 0
@@ -1,5 +1,10 @@
 from django import forms
 from django.contrib.auth.hashers import make_password
+from datetime import timedelta
+from . import bulk_actions, geocoding, transitions
+from .dates import day_start
+from .refdata import CachedModelChoiceField, statuses
+from .search import search_queryset
 from .models import Client, Order, OrderItem, Address, Review, Payment, OrderStatus, Role, User, Product, PaymentMethod
 
 
@@ -35,6 +40,19 @@ class AddressForm(forms.ModelForm):
             'longitude': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.0000001'}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Координаты не указаны — берутся из кэша геокодирования или у провайдера
+        if (cleaned_data.get('latitude') is None and cleaned_data.get('longitude') is None
+                and cleaned_data.get('street') and cleaned_data.get('house_number')):
+            try:
+                point = geocoding.geocode(cleaned_data['street'], cleaned_data['house_number'])
+            except geocoding.GeocodingError:
+                point = None
+            if point:
+                cleaned_data['latitude'], cleaned_data['longitude'] = point
+        return cleaned_data
+
 
 class OrderForm(forms.ModelForm):
     """Форма для создания/редактирования заказа"""
@@ -53,6 +71,31 @@ class OrderForm(forms.ModelForm):
             'payment_method': forms.Select(attrs={'class': 'form-control'}),
             'comment': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
         }
+        field_classes = {
+            'status': CachedModelChoiceField,
+            'payment_method': CachedModelChoiceField,
+        }
+
+    def clean_status(self):
+        status = self.cleaned_data['status']
+        if self.instance.pk and status.pk != self.instance._loaded_status_id:
+            current = statuses.get(self.instance._loaded_status_id)
+            if not transitions.is_allowed(current.code, status.code):
+                raise forms.ValidationError(f'Из статуса «{current.name}» нельзя перейти в «{status.name}»')
+        return status
+
+    def save(self, commit=True):
+        """Смена статуса существующего заказа — через transitions (условный UPDATE и метка времени)"""
+        order = super().save(commit=False)
+        if not commit or order._state.adding or order.status_id == order._loaded_status_id:
+            if commit:
+                order.save()
+            return order
+
+        new_status = self.cleaned_data['status']
+        order.status_id = order._loaded_status_id
+        order.save(update_fields=[name for name in self._meta.fields if name != 'status'])
+        return transitions.transition(order, new_status.code)
 
 
 class OrderSearchForm(forms.Form):
@@ -88,15 +131,94 @@ class OrderSearchForm(forms.Form):
         widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'ID курьера'})
     )
 
+    archive = forms.BooleanField(
+        required=False,
+        label='Включая архив',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
     def __init__(self, *args, **kwargs):
-        """Динамическая загрузка статусов при создании формы"""
+        """Статусы берутся из кэша справочников"""
         super().__init__(*args, **kwargs)
-        # Загружаем статусы из базы данных при инициализации формы
-        from .models import OrderStatus
         self.fields['status'].choices = [('', 'Все')] + [
-            (s.code, s.name) for s in OrderStatus.objects.all()
+            (s.code, s.name) for s in statuses.all()
         ]
 
+    @property
+    def include_archive(self):
+        """Искать и в архиве заказов (archive.py) — только по явному запросу"""
+        return self.is_valid() and self.cleaned_data.get('archive')
+
+    def filter_queryset(self, orders):
+        """Применение фильтров формы к выборке заказов"""
+        if not self.is_valid():
+            return orders
+
+        data = self.cleaned_data
+        if data.get('client_name'):
+            clients = search_queryset(Client.objects.all(), data['client_name'], rank=False)
+            orders = orders.filter(client_id__in=clients.values('pk'))
+
+        if data.get('status'):
+            orders = orders.filter(status_id=statuses.pk_for(data['status']))
+
+        # Диапазон по самому created_at, а не по created_at::date, чтобы работал индекс
+        if data.get('date_from'):
+            orders = orders.filter(created_at__gte=day_start(data['date_from']))
+
+        if data.get('date_to'):
+            orders = orders.filter(created_at__lt=day_start(data['date_to'] + timedelta(days=1)))
+
+        if data.get('courier'):
+            orders = orders.filter(courier_id=data['courier'])
+
+        return orders
+
+
+class OrderBulkActionForm(forms.Form):
+    """Массовое действие над заказами, отмеченными в списке"""
+
+    action = forms.ChoiceField(label='Действие', widget=forms.Select(attrs={'class': 'form-select form-select-sm'}))
+    ids = forms.Field(
+        widget=forms.MultipleHiddenInput,
+        error_messages={'required': 'Не выбрано ни одного заказа'},
+    )
+    status = forms.ChoiceField(
+        required=False,
+        label='Статус',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+    courier = forms.ModelChoiceField(
+        queryset=User.objects.none(),
+        required=False,
+        label='Курьер',
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['action'].choices = bulk_actions.ACTIONS
+        self.fields['status'].choices = [('', '—')] + [(s.code, s.name) for s in statuses.all()]
+        self.fields['courier'].queryset = bulk_actions.working_couriers()
+        self.fields['courier'].label_from_instance = lambda user: user.full_name
+
+    def clean_ids(self):
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in self.cleaned_data['ids']))
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Неверный список заказов')
+        if len(ids) > bulk_actions.MAX_ORDERS:
+            raise forms.ValidationError(f'Не больше {bulk_actions.MAX_ORDERS} заказов за одно действие')
+        return ids
+
+    def clean(self):
+        data = super().clean()
+        if data.get('action') == bulk_actions.CHANGE_STATUS and not data.get('status'):
+            self.add_error('status', 'Выберите статус')
+        if data.get('action') == bulk_actions.ASSIGN_COURIER and not data.get('courier'):
+            self.add_error('courier', 'Выберите курьера')
+        return data
+
 
 class RoleForm(forms.ModelForm):
     """Форма для управления ролями"""
@@ -129,6 +251,9 @@ class UserForm(forms.ModelForm):
             'status': forms.Select(attrs={'class': 'form-control'}),
             'hire_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         }
+        field_classes = {
+            'role': CachedModelChoiceField,
+        }
 
     def save(self, commit=True):
         user = super().save(commit=False)
@@ -178,4 +303,18 @@ class OrderStatusForm(forms.ModelForm):
             'code': forms.TextInput(attrs={'class': 'form-control'}),
             'name': forms.TextInput(attrs={'class': 'form-control'}),
             'sort_order': forms.NumberInput(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+
+class OrderImportForm(forms.Form):
+    """Форма загрузки файла с заказами"""
+
+    file = forms.FileField(
+        label='Файл',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.json'})
+    )
+    format = forms.ChoiceField(
+        required=False,
+        label='Формат',
+        choices=[('', 'По расширению файла'), ('csv', 'CSV'), ('json', 'JSON')],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
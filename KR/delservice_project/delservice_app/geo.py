@@ -0,0 +1,115 @@
+"""
+Геометрия на сфере: расстояния по формуле гаверсинусов и сеточный
+пространственный индекс.
+
+NumPy необязателен: если он установлен, расстояния от точки до набора
+точек и матрица расстояний считаются векторно, иначе — циклом на чистом
+Python с тем же результатом.
+"""
+import math
+from collections import defaultdict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Расстояние между двумя точками, км"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def haversine_many(lat, lon, lats, lons):
+    """Расстояния от точки до каждой из точек (lats[i], lons[i]), км"""
+    if np is None:
+        return [haversine_km(lat, lon, lat2, lon2) for lat2, lon2 in zip(lats, lons)]
+    phi1 = np.radians(lat)
+    phi2 = np.radians(np.asarray(lats, dtype=float))
+    dlambda = np.radians(np.asarray(lons, dtype=float) - lon)
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def distance_matrix(points):
+    """Матрица попарных расстояний между точками [(lat, lon), ...], км"""
+    if np is None:
+        return [[haversine_km(a[0], a[1], b[0], b[1]) for b in points] for a in points]
+    coords = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat, lon = coords[:, 0:1], coords[:, 1:2]
+    a = (np.sin((lat.T - lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(lat.T) * np.sin((lon.T - lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class GridIndex:
+    """
+    Пространственный индекс точек: равномерная сетка ячеек ~cell_km × cell_km.
+
+    Поиск ближайшей точки обходит кольца ячеек вокруг запроса и
+    останавливается, как только следующее кольцо заведомо дальше уже
+    найденного кандидата. Масштаб долготы берётся по средней широте
+    набора — для города или области погрешность пренебрежимо мала.
+    """
+
+    def __init__(self, lats, lons, cell_km=2.0):
+        self.lats = list(lats)
+        self.lons = list(lons)
+        self.cell_km = cell_km
+        mean_lat = sum(self.lats) / len(self.lats) if self.lats else 0.0
+        self.cell_lat = cell_km / KM_PER_DEGREE
+        self.cell_lon = cell_km / (KM_PER_DEGREE * max(math.cos(math.radians(mean_lat)), 0.01))
+        self.cells = defaultdict(list)
+        for index, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            self.cells[self.cell(lat, lon)].append(index)
+        if self.cells:
+            xs = [x for x, _ in self.cells]
+            ys = [y for _, y in self.cells]
+            self.bounds = (min(xs), max(xs), min(ys), max(ys))
+
+    def cell(self, lat, lon):
+        return math.floor(lon / self.cell_lon), math.floor(lat / self.cell_lat)
+
+    def ring(self, cx, cy, radius):
+        """Индексы точек в ячейках на расстоянии radius (по Чебышёву) от (cx, cy)"""
+        if radius == 0:
+            yield from self.cells.get((cx, cy), ())
+            return
+        for dx in range(-radius, radius + 1):
+            yield from self.cells.get((cx + dx, cy - radius), ())
+            yield from self.cells.get((cx + dx, cy + radius), ())
+        for dy in range(-radius + 1, radius):
+            yield from self.cells.get((cx - radius, cy + dy), ())
+            yield from self.cells.get((cx + radius, cy + dy), ())
+
+    def nearest(self, lat, lon, accept=None):
+        """Ближайшая точка, для которой accept(index) истинно: (index, км) или (None, None)"""
+        if not self.cells:
+            return None, None
+        cx, cy = self.cell(lat, lon)
+        min_x, max_x, min_y, max_y = self.bounds
+        max_radius = max(abs(cx - min_x), abs(cx - max_x), abs(cy - min_y), abs(cy - max_y))
+
+        best, best_km = None, None
+        for radius in range(max_radius + 1):
+            candidates = [index for index in self.ring(cx, cy, radius) if accept is None or accept(index)]
+            if candidates:
+                distances = haversine_many(
+                    lat, lon, [self.lats[i] for i in candidates], [self.lons[i] for i in candidates]
+                )
+                if np is not None:
+                    position = int(np.argmin(distances))
+                else:
+                    position = min(range(len(candidates)), key=distances.__getitem__)
+                if best is None or distances[position] < best_km:
+                    best, best_km = candidates[position], float(distances[position])
+            # Точки из следующих колец не ближе radius ячеек
+            if best is not None and best_km <= radius * self.cell_km:
+                break
+        return best, best_km
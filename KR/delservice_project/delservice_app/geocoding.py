@@ -0,0 +1,213 @@
+"""
+Геокодирование адресов: улица + дом → координаты.
+
+Адрес сначала нормализуется (регистр, «ё», сокращения типов улиц,
+пробелы в номере дома), и все дальнейшие операции идут по этому ключу:
+одинаковые пары улица/дом в пакете запрашиваются один раз, а результат —
+в том числе «не найдено» — сохраняется в таблице GeocodeCache и больше
+не запрашивается у провайдера.
+
+Провайдер задаётся настройкой GEOCODER_BACKEND (путь к классу) с
+параметрами GEOCODER_OPTIONS. По умолчанию — GazetteerProvider: локальный
+справочник адресов в CSV-файле, пригодный для тестов и работы без сети.
+Внешний сервис подключается подклассом GeocodingProvider.
+"""
+import csv
+import re
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import versions
+from .models import Address, GeocodeCache
+
+COORDINATE_PLACES = Decimal('0.0000001')
+
+# Типы улиц в одной форме: «проспект Мира», «пр-т Мира» и «Мира просп.» дают один
+# ключ. «Улица» подразумевается по умолчанию и в ключ не входит
+_STREET_TYPES = {
+    'улица': '', 'ул': '',
+    'проспект': 'пр-т', 'пр-т': 'пр-т', 'просп': 'пр-т',
+    'переулок': 'пер', 'пер': 'пер',
+    'бульвар': 'б-р', 'б-р': 'б-р', 'бул': 'б-р',
+    'шоссе': 'ш', 'ш': 'ш',
+    'площадь': 'пл', 'пл': 'пл',
+    'проезд': 'пр-д', 'пр-д': 'пр-д',
+    'набережная': 'наб', 'наб': 'наб',
+}
+_HOUSE_PARTS = {'корпус': 'к', 'корп': 'к', 'к': 'к', 'строение': 'с', 'стр': 'с', 'с': 'с'}
+_PUNCTUATION = re.compile(r'[.,;"«»()]+')
+_SPACES = re.compile(r'\s+')
+
+
+class GeocodingError(Exception):
+    """Провайдер недоступен или неправильно настроен"""
+
+
+def _tokens(value):
+    value = (value or '').lower().replace('ё', 'е')
+    return _SPACES.sub(' ', _PUNCTUATION.sub(' ', value)).split()
+
+
+def normalize(street, house_number):
+    """Ключ адреса для кэша и дедупликации"""
+    street_tokens = _tokens(street)
+    kinds = sorted({_STREET_TYPES[token] for token in street_tokens if _STREET_TYPES.get(token)})
+    name = [token for token in street_tokens if token not in _STREET_TYPES]
+    house = ''.join(_HOUSE_PARTS.get(token, token) for token in _tokens(house_number))
+    return f"{' '.join(kinds + name)}|{house}"
+
+
+def quantize(value):
+    return Decimal(str(value)).quantize(COORDINATE_PLACES)
+
+
+class GeocodingProvider:
+    """Провайдер геокодирования"""
+
+    name = 'base'
+    # Сколько адресов передаётся провайдеру за один вызов geocode_many
+    batch_size = 1000
+
+    def geocode_many(self, queries):
+        """{ключ: (улица, дом)} → {ключ: (широта, долгота)} для найденных адресов"""
+        raise NotImplementedError
+
+
+class GazetteerProvider(GeocodingProvider):
+    """Локальный справочник: CSV с колонками street, house_number, latitude, longitude"""
+
+    name = 'gazetteer'
+    batch_size = 100000
+
+    def __init__(self, path=None):
+        self.path = path
+        self._index = None
+
+    def load(self):
+        if self._index is None:
+            if not self.path:
+                raise GeocodingError('Не задан файл справочника адресов (GEOCODER_OPTIONS["path"])')
+            try:
+                with open(self.path, encoding='utf-8-sig', newline='') as f:
+                    self._index = {
+                        normalize(row['street'], row['house_number']): (
+                            quantize(row['latitude']), quantize(row['longitude'])
+                        )
+                        for row in csv.DictReader(f)
+                    }
+            except OSError as e:
+                raise GeocodingError(f'Не удалось прочитать справочник адресов: {e}') from e
+            except (KeyError, ArithmeticError) as e:
+                raise GeocodingError(f'Неверный формат справочника адресов: {e}') from e
+        return self._index
+
+    def geocode_many(self, queries):
+        index = self.load()
+        return {key: index[key] for key in queries if key in index}
+
+
+_provider = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        backend = import_string(getattr(settings, 'GEOCODER_BACKEND', 'delservice_app.geocoding.GazetteerProvider'))
+        _provider = backend(**getattr(settings, 'GEOCODER_OPTIONS', {}))
+    return _provider
+
+
+def lookup_many(queries, provider=None, retry_missing=False):
+    """Координаты для {ключ: (улица, дом)}: из кэша, остальные — у провайдера.
+
+    Возвращает {ключ: (широта, долгота) или None}, если адрес не найден.
+    """
+    provider = provider or get_provider()
+    found = {
+        key: (latitude, longitude) if latitude is not None else None
+        for key, latitude, longitude in GeocodeCache.objects.filter(
+            key__in=list(queries)
+        ).values_list('key', 'latitude', 'longitude')
+    }
+    missing = [key for key in queries if key not in found or (retry_missing and found[key] is None)]
+
+    for start in range(0, len(missing), provider.batch_size):
+        chunk = {key: queries[key] for key in missing[start:start + provider.batch_size]}
+        answers = provider.geocode_many(chunk)
+        entries = []
+        for key in chunk:
+            point = answers.get(key)
+            found[key] = (quantize(point[0]), quantize(point[1])) if point else None
+            entries.append(GeocodeCache(
+                key=key,
+                latitude=found[key][0] if found[key] else None,
+                longitude=found[key][1] if found[key] else None,
+                provider=provider.name,
+            ))
+        GeocodeCache.objects.bulk_create(
+            entries, update_conflicts=True, unique_fields=['key'],
+            update_fields=['latitude', 'longitude', 'provider', 'updated_at'],
+        )
+    return found
+
+
+def geocode(street, house_number, provider=None):
+    """Координаты одного адреса или None"""
+    key = normalize(street, house_number)
+    return lookup_many({key: (street, house_number)}, provider)[key]
+
+
+class BackfillResult:
+    def __init__(self):
+        self.addresses = 0      # просмотрено адресов без координат
+        self.unique = 0         # различных ключей (сумма по пакетам)
+        self.updated = 0        # получили координаты
+        self.not_found = 0
+
+
+def backfill(batch_size=5000, limit=None, retry_missing=False, provider=None, progress=None):
+    """Заполнение координат у адресов без них, пакетами по первичному ключу.
+
+    progress(result) вызывается после каждого пакета.
+    """
+    provider = provider or get_provider()
+    result = BackfillResult()
+    last_pk = 0
+    while limit is None or result.addresses < limit:
+        size = batch_size if limit is None else min(batch_size, limit - result.addresses)
+        batch = list(
+            Address.objects.filter(pk__gt=last_pk, latitude__isnull=True)
+            .order_by('pk').values_list('pk', 'street', 'house_number')[:size]
+        )
+        if not batch:
+            break
+        last_pk = batch[-1][0]
+
+        by_key, queries = defaultdict(list), {}
+        for pk, street, house_number in batch:
+            key = normalize(street, house_number)
+            by_key[key].append(pk)
+            queries.setdefault(key, (street, house_number))
+
+        with transaction.atomic():
+            found = lookup_many(queries, provider, retry_missing)
+            addresses = [
+                Address(pk=pk, latitude=found[key][0], longitude=found[key][1])
+                for key, pks in by_key.items() if found[key] for pk in pks
+            ]
+            Address.objects.bulk_update(addresses, ['latitude', 'longitude'], batch_size=1000)
+            if addresses:
+                # UPDATE не вызывает сигналы — кэш страниц адресов сбрасывается здесь
+                versions.bump_on_commit(Address._meta.db_table)
+
+        result.addresses += len(batch)
+        result.unique += len(queries)
+        result.updated += len(addresses)
+        result.not_found += len(batch) - len(addresses)
+        if progress:
+            progress(result)
+    return result
@@ -0,0 +1,327 @@
+"""
+Пакетный импорт заказов из CSV/JSON.
+
+Справочники (статусы, способы оплаты) берутся из кэша refdata, клиенты,
+адреса и товары каждой порции — одним запросом на таблицу. Заказы и их
+позиции пишутся bulk_create в отдельной транзакции на каждую порцию.
+Строки с ошибками не прерывают импорт, а попадают в отчёт.
+
+Формат CSV — одна строка на позицию заказа; строки с одинаковым
+order_ref образуют один заказ, поля заказа берутся из первой строки:
+
+    order_ref, client_email, client_name, client_phone,
+    delivery_street, delivery_house, pickup_street, pickup_house,
+    status, payment_method, delivery_cost, comment, product_id, quantity
+
+Формат JSON — список заказов:
+
+    [{"ref": "A-1", "client": {"email": ..., "full_name": ..., "phone": ...},
+      "delivery_address": {"street": ..., "house_number": ...},
+      "pickup_address": {...}, "status": "created", "payment_method": "cash",
+      "delivery_cost": "150.00", "comment": "...",
+      "items": [{"product_id": 1, "quantity": 2}]}]
+"""
+import csv
+import io
+import json
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from . import counters, events, list_rows, refdata, rollups, transitions, versions
+from .models import Address, Client, Order, OrderItem, Product
+
+DEFAULT_CHUNK_SIZE = 1000
+BATCH_SIZE = 1000
+
+# Ошибки чтения файла: формат, кодировка, структура CSV/JSON
+READ_ERRORS = (ValueError, UnicodeDecodeError, csv.Error)
+
+# Стоимость — DecimalField(max_digits=10, decimal_places=2)
+MAX_DELIVERY_COST = Decimal(10) ** 8
+MAX_QUANTITY = 32767
+
+
+class ImportRejected(Exception):
+    """Заказ не может быть импортирован"""
+
+
+class ImportResult:
+    """Итог импорта: созданные объекты и отклонённые заказы"""
+
+    def __init__(self):
+        self.orders_created = 0
+        self.items_created = 0
+        self.clients_created = 0
+        self.addresses_created = 0
+        self.rejected = []
+
+    def reject(self, ref, reason):
+        self.rejected.append((ref, reason))
+
+
+def parse_csv(lines):
+    """Группировка строк CSV в записи заказов"""
+    records = {}
+    for line_number, row in enumerate(csv.DictReader(lines), start=2):
+        ref = (row.get('order_ref') or '').strip() or f'строка {line_number}'
+        record = records.get(ref)
+        if record is None:
+            record = records[ref] = {
+                'ref': ref,
+                'client': {
+                    'email': row.get('client_email'),
+                    'full_name': row.get('client_name'),
+                    'phone': row.get('client_phone'),
+                },
+                'delivery_address': {
+                    'street': row.get('delivery_street'),
+                    'house_number': row.get('delivery_house'),
+                },
+                'pickup_address': {
+                    'street': row.get('pickup_street'),
+                    'house_number': row.get('pickup_house'),
+                },
+                'status': row.get('status'),
+                'payment_method': row.get('payment_method'),
+                'delivery_cost': row.get('delivery_cost'),
+                'comment': row.get('comment'),
+                'items': [],
+            }
+        if row.get('product_id'):
+            record['items'].append({'product_id': row['product_id'], 'quantity': row.get('quantity') or 1})
+    return list(records.values())
+
+
+def parse_json(text):
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get('orders', [])
+    if not isinstance(data, list) or not all(isinstance(record, dict) for record in data):
+        raise ValueError('ожидается список заказов')
+    for number, record in enumerate(data, start=1):
+        record.setdefault('ref', f'заказ {number}')
+    return data
+
+
+def load_records(stream, format=None, name=''):
+    """Чтение записей из бинарного потока; формат по умолчанию — по расширению файла"""
+    format = format or ('json' if name.lower().endswith('.json') else 'csv')
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if format == 'json':
+        return parse_json(text.read())
+    return parse_csv(text)
+
+
+def _clean(value):
+    return (str(value).strip() if value is not None else '') or None
+
+
+def _address_key(address):
+    if not isinstance(address, dict):
+        return None
+    street, house = _clean(address.get('street')), _clean(address.get('house_number'))
+    return (street, house) if street and house else None
+
+
+def _check_length(value, model, field_name, title):
+    max_length = model._meta.get_field(field_name).max_length
+    if value and len(value) > max_length:
+        raise ImportRejected(f'{title} длиннее {max_length} символов')
+
+
+def _items(record):
+    """Позиции записи — только словари; остальное отклоняет _validate"""
+    items = record.get('items') or []
+    return [item for item in items if isinstance(item, dict)] if isinstance(items, list) else []
+
+
+class OrderImporter:
+    """Импорт заказов порциями с разрешением ссылок через словари в памяти"""
+
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.statuses = {s.code: s for s in refdata.statuses.all()}
+        self.payment_methods = {m.code: m for m in refdata.payment_methods.all()}
+        self.pending_status_id = counters.pending_status_id()
+
+    def run(self, records):
+        result = ImportResult()
+        for start in range(0, len(records), self.chunk_size):
+            self._import_chunk(records[start:start + self.chunk_size], result)
+        return result
+
+    def _validate(self, record, products):
+        client = record.get('client')
+        if not isinstance(client, dict) or not _clean(client.get('email')):
+            raise ImportRejected('не указан email клиента')
+        _check_length(_clean(client.get('email')), Client, 'email', 'email клиента')
+        _check_length(_clean(client.get('full_name')), Client, 'full_name', 'имя клиента')
+        _check_length(_clean(client.get('phone')), Client, 'phone', 'телефон клиента')
+        if _address_key(record.get('delivery_address')) is None:
+            raise ImportRejected('не указан адрес доставки')
+        for key in ('delivery_address', 'pickup_address'):
+            address = _address_key(record.get(key))
+            if address:
+                _check_length(address[0], Address, 'street', 'улица')
+                _check_length(address[1], Address, 'house_number', 'номер дома')
+
+        status = self.statuses.get(_clean(record.get('status')) or 'created')
+        if status is None:
+            raise ImportRejected(f'неизвестный статус «{record.get("status")}»')
+        payment_method = self.payment_methods.get(_clean(record.get('payment_method')))
+        if payment_method is None:
+            raise ImportRejected(f'неизвестный способ оплаты «{record.get("payment_method")}»')
+
+        try:
+            delivery_cost = Decimal(str(record.get('delivery_cost') or 0)).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            delivery_cost = None
+        # NaN, бесконечность, отрицательная или не влезающая в столбец стоимость
+        if delivery_cost is None or not delivery_cost.is_finite() or not 0 <= delivery_cost < MAX_DELIVERY_COST:
+            raise ImportRejected(f'некорректная стоимость доставки «{record.get("delivery_cost")}»')
+
+        raw_items = record.get('items') or []
+        if not isinstance(raw_items, list):
+            raise ImportRejected('позиции заказа должны быть списком')
+        items = []
+        for item in raw_items:
+            try:
+                product = products.get(int(item['product_id']))
+                quantity = int(item.get('quantity') or 1)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                raise ImportRejected(f'некорректная позиция {item}')
+            if product is None:
+                raise ImportRejected(f'товар {item["product_id"]} не найден')
+            if not 0 < quantity <= MAX_QUANTITY:
+                raise ImportRejected(f'некорректное количество {quantity}')
+            items.append((product, quantity))
+
+        return status, payment_method, delivery_cost, items
+
+    def _import_chunk(self, records, result):
+        product_ids = set()
+        for record in records:
+            for item in _items(record):
+                try:
+                    product_ids.add(int(item.get('product_id')))
+                except (TypeError, ValueError):
+                    pass
+        products = Product.objects.in_bulk(product_ids)
+
+        valid = []
+        for record in records:
+            try:
+                valid.append((record, *self._validate(record, products)))
+            except ImportRejected as e:
+                result.reject(record['ref'], str(e))
+        if not valid:
+            return
+
+        created = result.clients_created, result.addresses_created
+        try:
+            orders_created, items_created = self._write_chunk(valid, result)
+        except DatabaseError as e:
+            # Порция откатилась целиком: её заказы отклонены, клиенты и адреса не созданы
+            result.clients_created, result.addresses_created = created
+            for record, *_ in valid:
+                result.reject(record['ref'], f'ошибка записи в базу: {e}')
+            return
+        result.orders_created += orders_created
+        result.items_created += items_created
+
+    @transaction.atomic
+    def _write_chunk(self, valid, result):
+        """Запись проверенных заказов порции одной транзакцией; возвращает (заказов, позиций)"""
+        clients = self._resolve_clients([record['client'] for record, *_ in valid], result)
+        addresses = self._resolve_addresses(
+            [record.get('delivery_address') for record, *_ in valid] +
+            [record.get('pickup_address') for record, *_ in valid],
+            result,
+        )
+
+        orders = []
+        for record, status, payment_method, delivery_cost, items in valid:
+            orders.append(Order(
+                client=clients[_clean(record['client']['email']).lower()],
+                delivery_address=addresses[_address_key(record['delivery_address'])],
+                pickup_address=addresses.get(_address_key(record.get('pickup_address'))),
+                status=status,
+                payment_method=payment_method,
+                delivery_cost=delivery_cost,
+                order_total=sum((product.price * quantity for product, quantity in items), Decimal(0)),
+                comment=_clean(record.get('comment')),
+            ))
+        Order.objects.bulk_create(orders, batch_size=BATCH_SIZE)
+
+        order_items = [
+            OrderItem(order=order, product=product, quantity=quantity, price_at_order=product.price)
+            for order, (_, _, _, _, items) in zip(orders, valid)
+            for product, quantity in items
+        ]
+        OrderItem.objects.bulk_create(order_items, batch_size=BATCH_SIZE)
+
+        # bulk_create не отправляет сигналы — счётчики, агрегаты, историю статусов, журнал событий
+        # и строки списка заказов обновляем сами
+        per_day = Counter(counters.order_day_key(order.created_at) for order in orders)
+        counters.increment({
+            counters.ORDERS_TOTAL: len(orders),
+            counters.ORDERS_PENDING: sum(order.status_id == self.pending_status_id for order in orders),
+            **per_day,
+        })
+        rollups.mark_dirty({timezone.localdate(order.created_at) for order in orders})
+        transitions.record_created(orders)
+        events.record_created(orders + order_items)
+        list_rows.refresh([order.pk for order in orders])
+        return len(orders), len(order_items)
+
+    def _resolve_clients(self, client_data, result):
+        """Словарь email → Client; отсутствующие клиенты создаются одной пачкой"""
+        by_email = {}
+        for data in client_data:
+            by_email.setdefault(_clean(data['email']).lower(), data)
+
+        # Email сравнивается без учёта регистра: Mixed@Case.com и mixed@case.com — один клиент.
+        # При нескольких таких клиентах берётся самый ранний
+        clients = {}
+        for client in Client.objects.annotate(email_lower=Lower('email')).filter(
+            email_lower__in=list(by_email),
+        ).order_by('id'):
+            clients.setdefault(client.email_lower, client)
+        missing = [
+            Client(
+                email=email,
+                full_name=_clean(data.get('full_name')) or email,
+                phone=_clean(data.get('phone')) or '',
+            )
+            for email, data in by_email.items() if email not in clients
+        ]
+        Client.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        result.clients_created += len(missing)
+        clients.update((client.email, client) for client in missing)
+        return clients
+
+    def _resolve_addresses(self, address_data, result):
+        """Словарь (улица, дом) → Address; отсутствующие адреса создаются одной пачкой"""
+        keys = {key for key in map(_address_key, address_data) if key}
+        addresses = {}
+        for address in Address.objects.filter(
+            street__in={street for street, _ in keys},
+            house_number__in={house for _, house in keys},
+        ).order_by('id'):
+            addresses.setdefault((address.street, address.house_number), address)
+
+        missing = [
+            Address(street=street, house_number=house)
+            for street, house in keys if (street, house) not in addresses
+        ]
+        Address.objects.bulk_create(missing, batch_size=BATCH_SIZE)
+        if missing:
+            # bulk_create не отправляет сигналы — кэш списка адресов сбрасываем сами
+            versions.bump_on_commit(Address._meta.db_table)
+        result.addresses_created += len(missing)
+        addresses.update(((address.street, address.house_number), address) for address in missing)
+        return addresses
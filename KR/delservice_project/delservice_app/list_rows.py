@@ -0,0 +1,117 @@
+"""
+Список заказов без JOIN: денормализованная таблица order_list_view
+(OrderListRow) — одна строка на заказ с именами клиента и курьера,
+адресом доставки и числом позиций. Страница списка читается из неё
+одним проходом по индексу, как orders, но без соединения с clients,
+users, addresses и order_items.
+
+Строки обновляются в той же транзакции, что и исходные данные:
+сохранение заказа и позиций — сигналами, массовые UPDATE/bulk_create
+(transitions, импорт, массовые действия) — явными вызовами refresh(),
+изменение имени клиента или курьера и адреса — одним UPDATE по
+индексу. Название статуса в таблице не хранится: оно берётся из кэша
+справочников, и переименование статуса таблицу не затрагивает.
+
+Строка удаляется вместе с заказом (внешний ключ с CASCADE). Расхождения
+после правок в обход приложения исправляет rebuild() (команда
+rebuild_order_list).
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import refdata
+from .models import Order, OrderListRow
+
+UPDATE_FIELDS = [
+    'created_at', 'status_id', 'client_id', 'client_name', 'client_phone', 'delivery_address_id', 'address',
+    'courier_id', 'courier_name', 'delivery_cost', 'item_count',
+]
+
+REBUILD_BATCH_SIZE = 2000
+
+
+def format_address(street, house_number):
+    return f'{street}, {house_number}'
+
+
+def build_rows(orders):
+    """Строки для выборки заказов — одним запросом"""
+    return [
+        OrderListRow(
+            order_id=pk, created_at=created_at, status_id=status_id,
+            client_id=client_id, client_name=client_name, client_phone=client_phone,
+            delivery_address_id=address_id, address=format_address(street, house_number),
+            courier_id=courier_id, courier_name=courier_name,
+            delivery_cost=delivery_cost, item_count=item_count,
+        )
+        for (pk, created_at, status_id, client_id, client_name, client_phone, address_id, street, house_number,
+             courier_id, courier_name, delivery_cost, item_count) in orders.annotate(
+            item_count=Count('items'),
+        ).values_list(
+            'pk', 'created_at', 'status_id', 'client_id', 'client__full_name', 'client__phone',
+            'delivery_address_id', 'delivery_address__street', 'delivery_address__house_number',
+            'courier_id', 'courier__full_name', 'delivery_cost', 'item_count',
+        ).order_by()
+    ]
+
+
+def _upsert(rows):
+    OrderListRow.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=['order'], update_fields=UPDATE_FIELDS,
+    )
+
+
+def refresh(order_ids):
+    """Пересчёт строк заказов по исходным таблицам"""
+    order_ids = list(order_ids)
+    if order_ids:
+        _upsert(build_rows(Order.objects.filter(pk__in=order_ids)))
+
+
+def add_items(order_id, count):
+    """Изменение числа позиций без пересчёта строки"""
+    OrderListRow.objects.filter(order_id=order_id).update(item_count=F('item_count') + count)
+
+
+def client_changed(client):
+    OrderListRow.objects.filter(client_id=client.pk).update(client_name=client.full_name, client_phone=client.phone)
+
+
+def courier_changed(user):
+    OrderListRow.objects.filter(courier_id=user.pk).update(courier_name=user.full_name)
+
+
+def courier_deleted(user_id):
+    # Заказы удалённого курьера остаются без курьера (on_delete=SET_NULL)
+    OrderListRow.objects.filter(courier_id=user_id).update(courier_id=None, courier_name=None)
+
+
+def address_changed(address):
+    OrderListRow.objects.filter(delivery_address_id=address.pk).update(
+        address=format_address(address.street, address.house_number),
+    )
+
+
+def rebuild(batch_size=REBUILD_BATCH_SIZE, progress=None):
+    """Пересчёт строк всех заказов пакетами по первичному ключу; возвращает число заказов"""
+    total, last_pk = 0, 0
+    while True:
+        with transaction.atomic():
+            pks = list(
+                Order.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            _upsert(build_rows(Order.objects.filter(pk__in=pks)))
+        last_pk = pks[-1]
+        total += len(pks)
+        if progress:
+            progress(total)
+    return total
+
+
+def with_statuses(rows):
+    """Статусы строк из кэша справочников — для шаблонов, ожидающих row.status"""
+    for row in rows:
+        row.status = refdata.statuses.get(row.status_id)
+    return rows
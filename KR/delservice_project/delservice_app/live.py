@@ -0,0 +1,281 @@
+"""
+Живые обновления для диспетчеров: Server-Sent Events поверх журнала
+событий заказов (events.py).
+
+Журнал читает один опрос на процесс (Broker), а не каждое открытое
+подключение: новая порция событий один раз превращается в изменения
+для страниц (создан заказ, сменился статус, назначен курьер, удалён
+заказ) вместе со свежими счётчиками панели и рассылается в очереди
+подписчиков. Сотня открытых панелей — это один цикл запросов на процесс.
+
+Опрос идёт раз в LIVE_POLL_INTERVAL секунд, а после фиксации транзакции
+с событиями в этом же процессе — сразу (сигнал events.events_written;
+это замена PostgreSQL LISTEN/NOTIFY без отдельного соединения).
+
+Каждое сообщение несёт смещение журнала в поле id. Браузер при
+переподключении присылает его в заголовке Last-Event-ID, и пропущенные
+события досылаются из журнала; при слишком большом разрыве странице
+приходит событие reload. Поток держит соединение открытым, поэтому
+работает только под ASGI (ASYNC_VIEWS).
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.dispatch import receiver
+
+from . import counters, events, refdata
+from .models import Order, OrderEvent, User
+
+ORDER_CREATED = 'order.created'
+ORDER_STATUS_CHANGED = 'order.status_changed'
+ORDER_COURIER_ASSIGNED = 'order.courier_assigned'
+ORDER_DELETED = 'order.deleted'
+COUNTERS = 'counters'
+RELOAD = 'reload'
+
+BATCH_SIZE = 500
+
+logger = logging.getLogger('delservice_app.live')
+
+
+def poll_interval():
+    return getattr(settings, 'LIVE_POLL_INTERVAL', 1.0)
+
+
+def heartbeat_interval():
+    return getattr(settings, 'LIVE_HEARTBEAT_SECONDS', 15)
+
+
+def queue_size():
+    return getattr(settings, 'LIVE_QUEUE_SIZE', 1000)
+
+
+def max_replay():
+    return getattr(settings, 'LIVE_MAX_REPLAY', 1000)
+
+
+# ==================== СОБЫТИЯ ЖУРНАЛА → ИЗМЕНЕНИЯ ДЛЯ СТРАНИЦ ====================
+
+def _status(status_id):
+    status = refdata.statuses.get(status_id)
+    return {'id': status_id, 'code': status.code, 'name': status.name} if status else {'id': status_id}
+
+
+def deltas(page):
+    """[(смещение, тип, данные)] для порции событий; остальные изменения страницам не нужны.
+
+    Данные для новых заказов и имена курьеров — по одному запросу на порцию.
+    """
+    created_ids = [event.order_id for event in page
+                   if event.entity == OrderEvent.ORDER and event.action == OrderEvent.CREATED]
+    courier_ids = {event.changes.get('courier_id') for event in page if event.entity == OrderEvent.ORDER}
+    created = {
+        row[0]: row for row in Order.objects.filter(pk__in=created_ids).values_list(
+            'pk', 'client__full_name', 'client__phone', 'delivery_address__street',
+            'delivery_address__house_number', 'delivery_cost', 'created_at',
+        )
+    }
+    couriers = dict(User.objects.filter(pk__in=courier_ids - {None}).values_list('pk', 'full_name'))
+
+    result = []
+    for event in page:
+        if event.entity != OrderEvent.ORDER:
+            continue
+        changes = event.changes
+        base = {'order_id': event.order_id}
+        if event.action == OrderEvent.DELETED:
+            result.append((event.position, ORDER_DELETED, base))
+        elif event.action == OrderEvent.CREATED:
+            data = {**base, 'status': _status(changes.get('status_id'))}
+            row = created.get(event.order_id)
+            if row:
+                _, client, phone, street, house, delivery_cost, created_at = row
+                data.update(client=client, phone=phone, address=f'{street}, {house}',
+                            courier=couriers.get(changes.get('courier_id')),
+                            delivery_cost=delivery_cost, created_at=created_at)
+            result.append((event.position, ORDER_CREATED, data))
+        else:
+            if 'courier_id' in changes:
+                result.append((event.position, ORDER_COURIER_ASSIGNED, {
+                    **base, 'courier_id': changes['courier_id'], 'courier': couriers.get(changes['courier_id']),
+                }))
+            if 'status_id' in changes:
+                result.append((event.position, ORDER_STATUS_CHANGED, {**base, 'status': _status(changes['status_id'])}))
+    return result
+
+
+def fetch(after, limit=BATCH_SIZE):
+    """Следующая порция: (изменения, счётчики или None, новое смещение)"""
+    try:
+        page, offset = events.read(after, limit)
+        changes = deltas(page)
+        return changes, counters.dashboard_counts() if changes else None, offset
+    finally:
+        close_old_connections()
+
+
+def format_message(kind, data, offset=None):
+    """Сообщение SSE"""
+    lines = [] if offset is None else [f'id: {offset}']
+    lines.append(f'event: {kind}')
+    lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def format_batch(changes, counts):
+    """Сообщения порции; смещение события стоит на последнем его сообщении"""
+    messages = []
+    for index, (offset, kind, data) in enumerate(changes):
+        last = index + 1 == len(changes) or changes[index + 1][0] != offset
+        messages.append((offset, format_message(kind, data, offset if last else None)))
+    if counts is not None:
+        messages.append((None, format_message(COUNTERS, counts)))
+    return messages
+
+
+# ==================== РАССЫЛКА ====================
+
+class Subscription:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=queue_size())
+        self.overflowed = False
+
+    def put(self, messages):
+        """Сообщения порции; медленному подписчику — сигнал переподключиться"""
+        if self.overflowed:
+            return
+        if self.queue.qsize() + len(messages) > self.queue.maxsize - 1:
+            self.overflowed = True
+            self.queue.put_nowait(None)
+            return
+        for message in messages:
+            self.queue.put_nowait(message)
+
+
+class Broker:
+    """Общий на процесс опрос журнала и рассылка подписчикам в его цикле событий"""
+
+    def __init__(self):
+        self.subscribers = set()
+        self.offset = None
+        self.started = False
+        self.loop = None
+        self.task = None
+        self.wakeup = None
+
+    def subscribe(self, after=None):
+        """(подписка, смещение опроса на момент подписки или None).
+
+        Всё, что разослано до подписки, подписчик досылает себе сам из
+        журнала — до возвращённого смещения. Если опрос ещё не начался,
+        он начнётся не позже after.
+        """
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            # Новый цикл событий (перезапуск сервера, тесты): прежний опрос не переносится
+            self.loop, self.task, self.wakeup = loop, None, asyncio.Event()
+            self.subscribers = set()
+        subscription = Subscription()
+        self.subscribers.add(subscription)
+        if self.task is None or self.task.done():
+            self.offset, self.started = after, False
+            self.task = loop.create_task(self.run())
+        if not self.started:
+            if after is not None and (self.offset is None or after < self.offset):
+                self.offset = after
+            return subscription, None
+        return subscription, self.offset
+
+    def unsubscribe(self, subscription):
+        self.subscribers.discard(subscription)
+
+    def notify(self):
+        """Разбудить опрос; можно вызывать из любого потока"""
+        loop, wakeup = self.loop, self.wakeup
+        if loop is not None and wakeup is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    async def run(self):
+        end = await sync_to_async(events.last_offset, thread_sensitive=False)()
+        # Пока читался конец журнала, подписчик мог попросить начать раньше
+        if self.offset is None:
+            self.offset = end
+        self.started = True
+        while self.subscribers:
+            try:
+                changes, counts, self.offset = await sync_to_async(fetch, thread_sensitive=False)(self.offset)
+            except Exception:
+                # База недоступна — подписчики остаются, опрос повторится
+                logger.exception('Не удалось прочитать журнал событий')
+                changes = []
+            if changes:
+                messages = format_batch(changes, counts)
+                for subscription in list(self.subscribers):
+                    subscription.put(messages)
+            if len(changes) < BATCH_SIZE:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), poll_interval())
+                except asyncio.TimeoutError:
+                    pass
+
+
+broker = Broker()
+
+
+@receiver(events.events_written)
+def wake_broker(sender, **kwargs):
+    broker.notify()
+
+
+# ==================== ПОТОК ДЛЯ ОДНОГО ПОДКЛЮЧЕНИЯ ====================
+
+def replay(after, until):
+    """Сообщения событий (after, until] из журнала; None — их больше LIVE_MAX_REPLAY"""
+    try:
+        page, _ = events.read(after, max_replay() + 1)
+        page = [event for event in page if event.position <= until]
+        if len(page) > max_replay():
+            return None
+        return format_batch(deltas(page), counters.dashboard_counts())
+    finally:
+        close_old_connections()
+
+
+async def stream(after=None):
+    """Сообщения SSE для одного подключения; after — последнее полученное смещение"""
+    subscription, until = broker.subscribe(after)
+    try:
+        yield f'retry: {int(poll_interval() * 3000)}\n\n'
+        sent = 0
+        if after is not None and until is not None and after < until:
+            messages = await sync_to_async(replay, thread_sensitive=False)(after, until)
+            if messages is None:
+                yield format_message(RELOAD, {})
+                return
+            for _, message in messages:
+                yield message
+            sent = until
+
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), heartbeat_interval())
+            except asyncio.TimeoutError:
+                # Комментарий SSE: держит соединение через прокси и выявляет закрытые
+                yield ': ping\n\n'
+                continue
+            if item is None:
+                return
+            offset, message = item
+            # Уже отправлено при досылке из журнала
+            if offset is not None and offset <= sent:
+                continue
+            yield message
+    finally:
+        broker.unsubscribe(subscription)
+
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from delservice_app import archive
+
+
+class Command(BaseCommand):
+    help = 'Переносит доставленные заказы старше N месяцев в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=None,
+            help='Заказы, созданные раньше начала месяца N месяцев назад (по умолчанию ARCHIVE_AFTER_MONTHS)',
+        )
+        parser.add_argument('--batch-size', type=int, default=archive.BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать заказы, ничего не переносить')
+
+    def handle(self, *args, **options):
+        if options['months'] is not None and options['months'] < 1:
+            raise CommandError('--months должно быть не меньше 1')
+        before = archive.cutoff(options['months'])
+        self.stdout.write(f'Заказы, созданные до {timezone.localtime(before):%d.%m.%Y}')
+
+        if options['dry_run']:
+            self.stdout.write(f'Будет перенесено заказов: {archive.candidates(before).count()}')
+            return
+
+        total = archive.archive(
+            before,
+            batch_size=options['batch_size'],
+            progress=lambda count: self.stdout.write(f'Перенесено: {count}'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Перенесено в архив заказов: {total}'))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from delservice_app import assignment
+
+
+class Command(BaseCommand):
+    help = 'Назначает подтверждённым заказам ближайших курьеров со свободными местами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, help='Не больше стольких заказов (самые старые)')
+        parser.add_argument('--capacity', type=int, help='Активных заказов на курьера (по умолчанию COURIER_MAX_ACTIVE_ORDERS)')
+        parser.add_argument('--dry-run', action='store_true', help='Только показать план, ничего не записывать')
+
+    def handle(self, *args, **options):
+        result = assignment.assign_pending(
+            limit=options['limit'], capacity=options['capacity'], dry_run=options['dry_run'],
+        )
+        for order_id, courier_id, km in result.assignments:
+            self.stdout.write(f'Заказ #{order_id} → курьер {courier_id} ({km:.2f} км)')
+        if result.no_location:
+            self.stdout.write(self.style.WARNING(f'Без координат: {len(result.no_location)}'))
+        if result.no_courier:
+            self.stdout.write(self.style.WARNING(f'Не хватило курьеров: {len(result.no_courier)}'))
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Запланировано: {len(result.assignments)}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Назначено: {result.assigned}, изменены параллельно: {result.skipped}'
+            ))
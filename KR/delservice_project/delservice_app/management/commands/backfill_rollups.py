@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from delservice_app import rollups
+from delservice_app.models import Order, RollupDirtyDay
+
+
+class Command(BaseCommand):
+    help = 'Заполняет дневные агрегаты отчётов за прошлые периоды'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Первый день (ГГГГ-ММ-ДД), по умолчанию — дата первого заказа')
+        parser.add_argument('--until', help='Последний день (ГГГГ-ММ-ДД), по умолчанию — сегодня')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Сколько дней пересчитывать в одной транзакции')
+
+    def handle(self, *args, **options):
+        try:
+            first_day = date.fromisoformat(options['since']) if options['since'] else None
+            last_day = date.fromisoformat(options['until']) if options['until'] else timezone.localdate()
+        except ValueError as e:
+            raise CommandError(f'Некорректная дата: {e}')
+
+        if first_day is None:
+            first_created = Order.objects.aggregate(first=Min('created_at'))['first']
+            if first_created is None:
+                self.stdout.write('Заказов нет, пересчитывать нечего')
+                return
+            first_day = timezone.localdate(first_created)
+
+        chunk = timedelta(days=max(options['chunk_days'], 1))
+        day = first_day
+        while day <= last_day:
+            chunk_end = min(day + chunk - timedelta(days=1), last_day)
+            with transaction.atomic():
+                RollupDirtyDay.objects.filter(day__gte=day, day__lte=chunk_end).delete()
+                rollups.rebuild_range(day, chunk_end)
+            self.stdout.write(f'{day} — {chunk_end}: готово')
+            day = chunk_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS('Агрегаты заполнены'))
@@ -0,0 +1,174 @@
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from delservice_app.models import Order
+
+MODES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность нагруженных страниц под WSGI '
+        '(синхронные представления) и ASGI (асинхронные представления)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждую страницу')
+        parser.add_argument('--concurrency', type=int, default=8, help='Одновременных запросов')
+        parser.add_argument('--username', help='Пользователь, от имени которого идут запросы (по умолчанию — первый суперпользователь)')
+        parser.add_argument('--mode', choices=MODES, help='Запустить только один режим в текущем процессе')
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self.run_mode(options)))
+            return
+
+        # Набор маршрутов (sync/async) выбирается при импорте urls.py,
+        # поэтому каждый режим измеряется в отдельном процессе
+        results = {}
+        for mode in MODES:
+            command = [
+                sys.executable, sys.argv[0], 'benchmark_views', '--mode', mode,
+                '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+            ]
+            if options['username']:
+                command += ['--username', options['username']]
+            env = {**os.environ, 'DELSERVICE_ASYNC_VIEWS': '1' if mode == 'asgi' else '0'}
+            completed = subprocess.run(command, env=env, capture_output=True, text=True)
+            if completed.returncode:
+                raise CommandError(f'Режим {mode} завершился с ошибкой:\n{completed.stderr}')
+            results[mode] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        self.stdout.write(f'{"Страница":<28}{"Режим":<7}{"запр/с":>10}{"p50, мс":>10}{"p95, мс":>10}{"ошибок":>8}')
+        for path in results['wsgi']:
+            for mode in MODES:
+                row = results[mode][path]
+                self.stdout.write(
+                    f'{path:<28}{mode:<7}{row["rps"]:>10.1f}{row["p50"]:>10.1f}{row["p95"]:>10.1f}{row["errors"]:>8}'
+                )
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def session_cookie(self, username):
+        users = get_user_model().objects.all()
+        user = users.get(username=username) if username else users.filter(is_superuser=True).first()
+        if user is None:
+            raise CommandError('Нет пользователя для входа: укажите --username')
+        client = Client()
+        client.force_login(user)
+        return '; '.join(f'{name}={morsel.value}' for name, morsel in client.cookies.items())
+
+    def paths(self):
+        order_id = Order.objects.values_list('pk', flat=True).first()
+        paths = [
+            reverse('delservice_app:dashboard'),
+            reverse('delservice_app:order_list'),
+            reverse('delservice_app:reports'),
+        ]
+        if order_id:
+            paths.append(reverse('delservice_app:order_detail', args=[order_id]))
+        return paths
+
+    def run_mode(self, options):
+        # Профилировщик запросов исказил бы замеры
+        settings.QUERY_PROFILER_ENABLED = False
+        cookie = self.session_cookie(options['username'])
+        count, concurrency = options['requests'], options['concurrency']
+
+        results = {}
+        for path in self.paths():
+            if options['mode'] == 'wsgi':
+                timings, errors, elapsed = self.run_wsgi(path, cookie, count, concurrency)
+            else:
+                timings, errors, elapsed = asyncio.run(self.run_asgi(path, cookie, count, concurrency))
+            timings.sort()
+            results[path] = {
+                'rps': count / elapsed,
+                'p50': statistics.median(timings) * 1000,
+                'p95': timings[int(len(timings) * 0.95) - 1] * 1000,
+                'errors': errors,
+            }
+        return results
+
+    def run_wsgi(self, path, cookie, count, concurrency):
+        from django.core.handlers.wsgi import WSGIHandler
+
+        handler = WSGIHandler()
+
+        def call(_):
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': 'localhost', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0), 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            status = []
+            started = time.perf_counter()
+            response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return time.perf_counter() - started, not status[0].startswith('200')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(call, range(count)))
+        elapsed = time.perf_counter() - started
+        return [timing for timing, _ in outcomes], sum(failed for _, failed in outcomes), elapsed
+
+    async def run_asgi(self, path, cookie, count, concurrency):
+        from django.core.handlers.asgi import ASGIHandler
+
+        handler = ASGIHandler()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            body_sent = False
+            disconnected = asyncio.Event()
+            status = []
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with semaphore:
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                elapsed = time.perf_counter() - started
+            disconnected.set()
+            return elapsed, status[0] != 200
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(call() for _ in range(count)))
+        elapsed = time.perf_counter() - started
+        return [timing for timing, _ in outcomes], sum(failed for _, failed in outcomes), elapsed
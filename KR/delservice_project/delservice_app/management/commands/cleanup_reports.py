@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from delservice_app import report_export
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые задания на PDF-отчёты и их файлы в REPORTS_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Задания старше N дней (по умолчанию REPORT_JOBS_KEEP_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 1:
+            raise CommandError('--days должно быть не меньше 1')
+        jobs, files = report_export.cleanup(options['days'])
+        self.stdout.write(self.style.SUCCESS(f'Удалено заданий: {jobs}, файлов: {files}'))
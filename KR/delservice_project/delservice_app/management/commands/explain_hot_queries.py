@@ -0,0 +1,119 @@
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from delservice_app import analytics, counters, rollups
+from delservice_app.dates import day_start
+from delservice_app.forms import OrderSearchForm
+from delservice_app.models import DailyLatencyStat, DashboardCounter, Order, OrderEvent, OrderListRow, User
+
+# Таблицы, полный просмотр которых на рабочих объёмах недопустим. Дневные
+# агрегаты по статусам и способам оплаты отчёт читает целиком (итоги за всё
+# время), а строк в них — дни × статусы, поэтому их здесь нет
+LARGE_TABLES = (
+    'orders', 'order_items', 'payments', 'clients', 'users', 'order_list_view', 'order_events',
+    'order_status_history', 'daily_courier_stats', 'daily_latency_stats',
+)
+
+PAGE_SIZE = 21
+
+
+def _order_list(**filters):
+    """Страница списка заказов так, как её выбирает order_list: order_list_view с фильтрами формы"""
+    form = OrderSearchForm(filters)
+    return form.filter_queryset(OrderListRow.objects.all()).order_by('-created_at', '-pk')[:PAGE_SIZE]
+
+
+def hot_queries():
+    """Запросы, которые выполняют dashboard, order_list, reports и поток живых обновлений.
+
+    Список нужно менять вместе с этими представлениями: запросы берутся из
+    тех же функций (формы, rollups, analytics), где это возможно.
+    """
+    today = timezone.localdate()
+    first_day, last_day = today - timedelta(days=30), today - timedelta(days=1)
+    since, until = day_start(first_day), day_start(today)
+
+    queries = [
+        ('dashboard: счётчики',
+         DashboardCounter.objects.filter(key__in=[counters.ORDERS_TOTAL, counters.ORDERS_PENDING])),
+        ('dashboard: заказы за новые сутки',
+         Order.objects.filter(created_at__gte=day_start(today), created_at__lt=day_start(today + timedelta(days=1)))),
+        ('dashboard: последние заказы',
+         Order.objects.select_related('client', 'courier', 'delivery_address').order_by('-created_at')[:10]),
+        ('order_list: первая страница', _order_list()),
+        ('order_list: фильтр по статусу', _order_list(status='created')),
+        ('order_list: фильтр по курьеру', _order_list(courier='1')),
+        ('order_list: диапазон дат',
+         _order_list(date_from=(today - timedelta(days=7)).isoformat(), date_to=today.isoformat())),
+        ('reports: эффективность курьеров', rollups.courier_stats(days=30)),
+        ('reports: заказы по статусам', rollups.status_stats()),
+        ('reports: платежи по способам оплаты', rollups.payment_stats()),
+        ('reports: перцентили по дням',
+         DailyLatencyStat.objects.filter(courier__isnull=True, day__gte=first_day, day__lte=last_day)),
+        ('live: журнал событий',
+         OrderEvent.objects.filter(position__gt=0).order_by('position')[:100]),
+        ('live: события без смещения',
+         OrderEvent.objects.filter(position__isnull=True).order_by('id')[:1000]),
+    ]
+    # Окно перцентилей считается по заказам, закончившим этап за период
+    for stage, start_field, end_field, _ in analytics.STAGES:
+        queries.append((f'reports: этап {stage} за 30 дней',
+                        analytics._stage_orders(start_field, end_field, since, until)))
+    return queries
+
+
+def sequential_scans(plan, vendor):
+    """Список крупных таблиц, которые план читает полным просмотром"""
+    tables = '|'.join(LARGE_TABLES)
+    if vendor == 'postgresql':
+        pattern = rf'Seq Scan on "?({tables})"?\b'
+    elif vendor == 'sqlite':
+        # SEARCH — поиск по индексу, SCAN ... USING INDEX — обход индекса в нужном порядке
+        pattern = rf'\bSCAN "?({tables})"?(?! USING)(?:\s|$)'
+    else:
+        return []
+    return sorted(set(re.findall(pattern, plan, flags=re.MULTILINE)))
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для «горячих» запросов представлений и завершается '
+        'с ошибкой, если какой-либо из них читает крупную таблицу полным просмотром'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--no-force-index', action='store_true',
+            help='Не отключать Seq Scan на PostgreSQL (план будет зависеть от объёма данных)',
+        )
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'Разбор планов для СУБД {vendor} не поддерживается')
+
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql' and not options['no_force_index']:
+                # На маленькой базе планировщик честно выбирает Seq Scan.
+                # Запрещаем его, чтобы проверить, есть ли вообще подходящий индекс.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset in hot_queries():
+                plan = queryset.explain()
+                scans = sequential_scans(plan, vendor)
+                if scans:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'✗ {name}: полный просмотр {", ".join(scans)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'✓ {name}'))
+                if options['verbosity'] > 1 or scans:
+                    self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'Запросов с полным просмотром таблиц: {len(failures)}')
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from delservice_app import geocoding
+
+
+class Command(BaseCommand):
+    help = 'Заполняет координаты адресов без них через кэш геокодирования и провайдер'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Адресов в одном пакете')
+        parser.add_argument('--limit', type=int, help='Обработать не больше стольких адресов')
+        parser.add_argument('--retry-missing', action='store_true',
+                            help='Повторно запросить адреса, которые раньше не были найдены')
+        parser.add_argument('--gazetteer', help='CSV-справочник адресов вместо провайдера из настроек')
+
+    def handle(self, *args, **options):
+        provider = geocoding.GazetteerProvider(options['gazetteer']) if options['gazetteer'] else None
+        started = time.perf_counter()
+
+        def progress(result):
+            rate = result.addresses / max(time.perf_counter() - started, 1e-6)
+            self.stdout.write(
+                f'Адресов: {result.addresses}, уникальных: {result.unique}, '
+                f'заполнено: {result.updated} ({rate:.0f} адр/с)'
+            )
+
+        try:
+            result = geocoding.backfill(
+                batch_size=options['batch_size'], limit=options['limit'],
+                retry_missing=options['retry_missing'], provider=provider, progress=progress,
+            )
+        except geocoding.GeocodingError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнено координат: {result.updated}, не найдено: {result.not_found}'
+        ))
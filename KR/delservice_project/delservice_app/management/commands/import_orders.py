@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from delservice_app import importer
+
+
+class Command(BaseCommand):
+    help = 'Импортирует заказы с позициями из CSV- или JSON-файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Формат файла, по умолчанию — по расширению')
+        parser.add_argument('--chunk-size', type=int, default=importer.DEFAULT_CHUNK_SIZE,
+                            help='Сколько заказов записывать в одной транзакции')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as stream:
+                records = importer.load_records(stream, options['format'], options['path'])
+        except (OSError, *importer.READ_ERRORS) as e:
+            raise CommandError(f'Не удалось прочитать файл: {e}')
+
+        result = importer.OrderImporter(chunk_size=max(options['chunk_size'], 1)).run(records)
+
+        for ref, reason in result.rejected:
+            self.stderr.write(f'{ref}: {reason}')
+        self.stdout.write(
+            f'Клиентов создано: {result.clients_created}, адресов: {result.addresses_created}, '
+            f'позиций: {result.items_created}'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано заказов: {result.orders_created}, отклонено: {len(result.rejected)}'
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from delservice_app import routing
+
+
+class Command(BaseCommand):
+    help = 'Строит маршруты курьеров по активным заказам (забор раньше доставки)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--courier', type=int, action='append', help='ID курьера (можно несколько раз)')
+
+    def handle(self, *args, **options):
+        routes = routing.plan_routes(options['courier'])
+        for courier_id, route in routes.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'Курьер {courier_id}: заказов {len(route.orders)}, {route.total_km:.2f} км'
+            ))
+            for number, stop in enumerate(route.stops, 1):
+                action = 'забрать' if stop.is_pickup else 'доставить'
+                distance = f'{stop.distance_km:.2f} км' if stop.distance_km is not None else 'старт'
+                self.stdout.write(f'  {number}. {action} #{stop.order.id} — {stop.address} ({distance})')
+            for stop in route.unplaced:
+                action = 'забрать' if stop.is_pickup else 'доставить'
+                self.stdout.write(self.style.WARNING(f'  -. {action} #{stop.order.id} — {stop.address} (нет координат)'))
+        self.stdout.write(self.style.SUCCESS(f'Маршрутов: {len(routes)}'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from delservice_app import list_rows
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает строки списка заказов (order_list_view) по исходным таблицам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=list_rows.REBUILD_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = list_rows.rebuild(
+            batch_size=options['batch_size'],
+            progress=lambda count: self.stdout.write(f'Заказов: {count}'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Строк списка пересчитано: {total}'))
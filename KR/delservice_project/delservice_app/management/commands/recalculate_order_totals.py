@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from delservice_app import totals
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает суммы заказов по позициям одним запросом'
+
+    def handle(self, *args, **options):
+        fixed = totals.recalculate()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено сумм заказов: {fixed}'))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from delservice_app import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики панели управления по исходным таблицам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=7,
+            help='За сколько последних дней пересчитать счётчики заказов по дням',
+        )
+
+    def handle(self, *args, **options):
+        values = counters.reconcile(days=options['days'])
+        for key, value in sorted(values.items()):
+            self.stdout.write(f'{key}: {value}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
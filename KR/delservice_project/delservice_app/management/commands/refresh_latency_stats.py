@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from delservice_app import analytics
+
+
+class Command(BaseCommand):
+    help = 'Считает перцентили времени выполнения заказов за завершённые дни'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Сколько последних завершённых дней')
+        parser.add_argument('--rebuild', action='store_true', help='Пересчитать и уже посчитанные дни')
+
+    def handle(self, *args, **options):
+        computed = analytics.refresh(days=options['days'], rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f'Посчитано дней: {computed}'))
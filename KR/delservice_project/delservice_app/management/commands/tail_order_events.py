@@ -0,0 +1,37 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from delservice_app import events
+
+
+class Command(BaseCommand):
+    help = 'Выводит события журнала заказов по одному JSON-объекту в строке'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--after', type=int, help='Смещение, после которого читать (по умолчанию — с начала)')
+        parser.add_argument('--from-end', action='store_true', help='Только новые события, начиная с текущего конца')
+        parser.add_argument('--follow', action='store_true', help='Ждать новые события, как tail -f')
+        parser.add_argument('--interval', type=float, default=1.0, help='Пауза между опросами при --follow, с')
+        parser.add_argument('--batch-size', type=int, default=events.MAX_LIMIT)
+
+    def handle(self, *args, **options):
+        after = options['after'] or 0
+        if options['from_end']:
+            after = events.last_offset()
+
+        try:
+            while True:
+                page, after = events.read(after, options['batch_size'])
+                for event in page:
+                    self.stdout.write(json.dumps(events.serialize(event), cls=DjangoJSONEncoder, ensure_ascii=False))
+                if len(page) < options['batch_size']:
+                    if not options['follow']:
+                        break
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        # Смещение для продолжения: --after N
+        self.stderr.write(f'Последнее смещение: {after}')
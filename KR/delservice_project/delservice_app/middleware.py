@@ -0,0 +1,40 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .profiling import QueryProfile
+
+logger = logging.getLogger('delservice_app.queries')
+
+
+class QueryProfilerMiddleware:
+    """
+    Профиль SQL-запросов каждого запроса: количество, время БД, повторы и
+    подозрения на N+1 пишутся в журнал delservice_app.queries с именем
+    представления, время — в заголовок Server-Timing. Включается
+    настройкой QUERY_PROFILER_ENABLED (по умолчанию — при DEBUG).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_PROFILER_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryProfile() as profile:
+            response = self.get_response(request)
+
+        match = request.resolver_match
+        label = f'{request.method} {match.view_name if match else request.path}'
+        suspects = profile.n_plus_one()
+        if suspects or profile.duplicates():
+            logger.warning(profile.report(label))
+        else:
+            logger.info(profile.report(label))
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={profile.db_time * 1000:.1f};desc="{profile.count} queries"',
+            f'app;dur={(profile.elapsed - profile.db_time) * 1000:.1f}',
+        ])
+        return response
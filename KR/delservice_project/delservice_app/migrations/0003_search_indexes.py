@@ -0,0 +1,87 @@
+from django.db import migrations
+
+# Таблицы и столбцы, по которым работает поиск (см. delservice_app.search)
+SEARCH_TABLES = {
+    'clients': ('full_name', 'email', 'phone'),
+    'products': ('name', 'description'),
+    'addresses': ('street', 'house_number'),
+    'users': ('full_name', 'login', 'phone'),
+}
+
+
+def postgres_forwards(schema_editor):
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in SEARCH_TABLES.items():
+        for column in columns:
+            # Выражение совпадает с тем, что Django генерирует для icontains
+            schema_editor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{column}_trgm ON {table} '
+                f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+            )
+
+
+def postgres_backwards(schema_editor):
+    for table, columns in SEARCH_TABLES.items():
+        for column in columns:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {table}_{column}_trgm')
+
+
+def sqlite_forwards(schema_editor):
+    for table, columns in SEARCH_TABLES.items():
+        fts = f'{table}_fts'
+        cols = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', "
+            f"content_rowid='id', tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN '
+            f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END'
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END"
+        )
+        schema_editor.execute(
+            f'CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+            f'INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END'
+        )
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def sqlite_backwards(schema_editor):
+    for table in SEARCH_TABLES:
+        fts = f'{table}_fts'
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        postgres_forwards(schema_editor)
+    elif vendor == 'sqlite':
+        sqlite_forwards(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        postgres_backwards(schema_editor)
+    elif vendor == 'sqlite':
+        sqlite_backwards(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0002_order_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0.2 on 2026-10-18 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0004_dashboard_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('marked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'rollup_dirty_days',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyCourierStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('deliveries', models.IntegerField(default=0)),
+                ('earnings', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('courier', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='delservice_app.user')),
+            ],
+            options={
+                'db_table': 'daily_courier_stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'courier'), name='daily_courier_stats_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyPaymentStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('payments', models.IntegerField(default=0)),
+                ('payment_method', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='delservice_app.paymentmethod')),
+            ],
+            options={
+                'db_table': 'daily_payment_stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'payment_method'), name='daily_payment_stats_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyStatusStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('status', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='delservice_app.orderstatus')),
+            ],
+            options={
+                'db_table': 'daily_status_stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'status'), name='daily_status_stats_uniq')],
+            },
+        ),
+    ]
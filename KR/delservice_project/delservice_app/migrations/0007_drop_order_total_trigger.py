@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def forwards(apps, schema_editor):
+    # Сумму заказа теперь поддерживает приложение (delservice_app.totals);
+    # триггер из schema.sql пересчитывал бы её повторно, а на DELETE не
+    # срабатывал вовсе (обращался к NEW)
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TRIGGER IF EXISTS trg_update_order_total_after_change ON order_items')
+        schema_editor.execute('DROP FUNCTION IF EXISTS update_order_total()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0006_report_jobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, migrations.RunPython.noop),
+    ]
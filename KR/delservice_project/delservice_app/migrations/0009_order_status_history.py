@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 19:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_timestamp_trigger(apps, schema_editor):
+    # Временные метки статусов ставит delservice_app.transitions в том же
+    # UPDATE, что и меняет статус; триггер из schema.sql делал для каждой
+    # строки лишний SELECT по order_statuses
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP TRIGGER IF EXISTS trg_set_order_timestamps ON orders')
+        schema_editor.execute('DROP FUNCTION IF EXISTS set_order_timestamps()')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0008_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('changed_at', models.DateTimeField()),
+                ('from_status', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='delservice_app.orderstatus')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='delservice_app.order')),
+                ('to_status', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='delservice_app.orderstatus')),
+            ],
+            options={
+                'db_table': 'order_status_history',
+                'indexes': [models.Index(fields=['order', 'changed_at'], name='status_history_order_idx'), models.Index(fields=['changed_at'], name='status_history_changed_idx'), models.Index(fields=['to_status', 'changed_at'], name='status_history_to_idx')],
+            },
+        ),
+        migrations.RunPython(drop_timestamp_trigger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0009_order_status_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLatencyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('stage', models.CharField(max_length=20)),
+                ('samples', models.IntegerField(default=0)),
+                ('p50', models.FloatField(blank=True, null=True)),
+                ('p90', models.FloatField(blank=True, null=True)),
+                ('p99', models.FloatField(blank=True, null=True)),
+                ('courier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_latency_stats', to='delservice_app.user')),
+            ],
+            options={
+                'db_table': 'daily_latency_stats',
+                'constraints': [models.UniqueConstraint(fields=('day', 'stage', 'courier'), name='daily_latency_stats_uniq'), models.UniqueConstraint(condition=models.Q(('courier__isnull', True)), fields=('day', 'stage'), name='daily_latency_stats_total_uniq')],
+            },
+        ),
+    ]
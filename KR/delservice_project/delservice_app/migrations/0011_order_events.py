@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 20:41
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0010_daily_latency_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('order', 'Заказ'), ('order_item', 'Позиция заказа')], max_length=20)),
+                ('entity_id', models.IntegerField()),
+                ('order_id', models.IntegerField()),
+                ('action', models.CharField(choices=[('created', 'Создание'), ('updated', 'Изменение'), ('deleted', 'Удаление')], max_length=10)),
+                ('changes', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'order_events',
+                'indexes': [models.Index(fields=['order_id', 'id'], name='order_events_order_idx')],
+            },
+        ),
+    ]
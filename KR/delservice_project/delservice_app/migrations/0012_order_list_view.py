@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-18 21:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate(apps, schema_editor):
+    # Одним INSERT ... SELECT, без загрузки заказов в Python
+    schema_editor.execute("""
+        INSERT INTO order_list_view (
+            order_id, created_at, status_id, client_id, client_name, client_phone,
+            delivery_address_id, address, courier_id, courier_name, delivery_cost, item_count
+        )
+        SELECT o.id, o.created_at, o.status_id, o.client_id, c.full_name, c.phone,
+               o.delivery_address_id, a.street || ', ' || a.house_number, o.courier_id, u.full_name,
+               o.delivery_cost, (SELECT COUNT(*) FROM order_items i WHERE i.order_id = o.id)
+        FROM orders o
+        JOIN clients c ON c.id = o.client_id
+        JOIN addresses a ON a.id = o.delivery_address_id
+        LEFT JOIN users u ON u.id = o.courier_id
+    """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0011_order_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderListRow',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='list_row', serialize=False, to='delservice_app.order')),
+                ('created_at', models.DateTimeField()),
+                ('status_id', models.IntegerField()),
+                ('client_id', models.IntegerField()),
+                ('client_name', models.CharField(max_length=255)),
+                ('client_phone', models.CharField(max_length=20)),
+                ('delivery_address_id', models.IntegerField()),
+                ('address', models.CharField(max_length=300)),
+                ('courier_id', models.IntegerField(blank=True, null=True)),
+                ('courier_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('delivery_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('item_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'order_list_view',
+                'indexes': [models.Index(fields=['-created_at', '-order'], name='order_list_created_idx'), models.Index(fields=['status_id', '-created_at'], name='order_list_status_idx'), models.Index(fields=['courier_id', 'created_at'], name='order_list_courier_idx'), models.Index(fields=['client_id', '-created_at'], name='order_list_client_idx')],
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
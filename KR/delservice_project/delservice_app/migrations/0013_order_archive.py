@@ -0,0 +1,119 @@
+# Generated by Django 6.0.2 on 2026-10-18 21:47
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+# Таблица архива → ключ секционирования
+PARTITIONED = {
+    'ArchivedOrder': 'created_at',
+    'ArchivedOrderItem': 'order_created_at',
+    'ArchivedPayment': 'order_created_at',
+}
+
+
+def partition_archive(apps, schema_editor):
+    # На PostgreSQL архив секционирован по месяцам (RANGE); секции месяцев
+    # создаёт archive.ensure_partitions перед переносом, строки вне них
+    # попадают в секцию DEFAULT. Первичный ключ секционированной таблицы
+    # обязан включать ключ секционирования. На других СУБД — обычные таблицы
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Индексы CreateModel отложены до конца миграции: выполняем их сейчас на
+    # обычных таблицах (уйдут вместе с ними), иначе они повторятся после add_index
+    for sql in schema_editor.deferred_sql:
+        schema_editor.execute(sql)
+    schema_editor.deferred_sql.clear()
+    for model_name, key in PARTITIONED.items():
+        model = apps.get_model('delservice_app', model_name)
+        table = model._meta.db_table
+        schema_editor.execute(f'ALTER TABLE {table} RENAME TO {table}_plain')
+        schema_editor.execute(
+            f'CREATE TABLE {table} (LIKE {table}_plain INCLUDING DEFAULTS) PARTITION BY RANGE ({key})'
+        )
+        schema_editor.execute(f'DROP TABLE {table}_plain')
+        schema_editor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, {key})')
+        schema_editor.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+        # Индексы на родительской таблице создаются во всех секциях
+        for index in model._meta.indexes:
+            schema_editor.add_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0012_order_list_view'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderevent',
+            name='action',
+            field=models.CharField(choices=[('created', 'Создание'), ('updated', 'Изменение'), ('deleted', 'Удаление'), ('archived', 'Перенос в архив')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('client_id', models.IntegerField()),
+                ('delivery_address_id', models.IntegerField()),
+                ('pickup_address_id', models.IntegerField(blank=True, null=True)),
+                ('courier_id', models.IntegerField(blank=True, null=True)),
+                ('status_id', models.IntegerField()),
+                ('payment_method_id', models.IntegerField()),
+                ('delivery_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('order_total', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('created_at', models.DateTimeField()),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('courier_assigned_at', models.DateTimeField(blank=True, null=True)),
+                ('dispatched_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('client_name', models.CharField(max_length=255)),
+                ('client_phone', models.CharField(max_length=20)),
+                ('address', models.CharField(max_length=300)),
+                ('courier_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('item_count', models.IntegerField(default=0)),
+                ('review', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('status_history', models.JSONField(default=list, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'orders_archive',
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='orders_archive_created_idx'), models.Index(fields=['status_id', '-created_at'], name='orders_archive_status_idx'), models.Index(fields=['courier_id', 'created_at'], name='orders_archive_courier_idx'), models.Index(fields=['client_id', '-created_at'], name='orders_archive_client_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('order_id', models.IntegerField()),
+                ('order_created_at', models.DateTimeField()),
+                ('product_id', models.IntegerField()),
+                ('quantity', models.SmallIntegerField(default=1)),
+                ('price_at_order', models.DecimalField(decimal_places=2, max_digits=10)),
+            ],
+            options={
+                'db_table': 'order_items_archive',
+                'indexes': [models.Index(fields=['order_id'], name='order_items_archive_order_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('order_id', models.IntegerField()),
+                ('order_created_at', models.DateTimeField()),
+                ('payment_method_id', models.IntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(max_length=20)),
+                ('transaction_number', models.CharField(blank=True, max_length=100, null=True)),
+                ('paid_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'payments_archive',
+                'indexes': [models.Index(fields=['order_id'], name='payments_archive_order_idx'), models.Index(fields=['payment_method_id'], name='payments_archive_method_idx')],
+            },
+        ),
+        migrations.RunPython(partition_archive, migrations.RunPython.noop),
+    ]
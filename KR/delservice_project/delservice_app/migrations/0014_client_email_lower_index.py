@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:12
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0013_order_archive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='client',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='clients_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:50
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def position_existing_events(apps, schema_editor):
+    # Смещения уже выданных событий совпадали с id — сохранённые потребителями
+    # смещения остаются верными; новые события получают номера после них
+    OrderEvent = apps.get_model('delservice_app', 'OrderEvent')
+    DashboardCounter = apps.get_model('delservice_app', 'DashboardCounter')
+    OrderEvent.objects.update(position=F('id'))
+    last = OrderEvent.objects.aggregate(last=Max('id'))['last'] or 0
+    DashboardCounter.objects.update_or_create(key='order_events_position', defaults={'value': last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0015_order_stage_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='orderevent',
+            name='order_events_order_idx',
+        ),
+        migrations.AddField(
+            model_name='orderevent',
+            name='position',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(position_existing_events, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(fields=['order_id', 'position'], name='order_events_order_pos_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderevent',
+            index=models.Index(condition=models.Q(('position__isnull', True)), fields=['id'], name='order_events_unsequenced_idx'),
+        ),
+    ]
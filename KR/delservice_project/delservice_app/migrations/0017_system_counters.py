@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+def move_rollups_version(apps, schema_editor):
+    # Версия агрегатов хранилась среди счётчиков dashboard
+    DashboardCounter = apps.get_model('delservice_app', 'DashboardCounter')
+    SystemCounter = apps.get_model('delservice_app', 'SystemCounter')
+    for counter in DashboardCounter.objects.filter(key='rollups_version'):
+        SystemCounter.objects.create(key=counter.key, value=counter.value)
+        counter.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0016_order_event_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'system_counters',
+            },
+        ),
+        migrations.RunPython(move_rollups_version, migrations.RunPython.noop),
+    ]
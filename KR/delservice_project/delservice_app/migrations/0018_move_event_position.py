@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:10
+
+from django.db import migrations
+
+
+def move_event_position(apps, schema_editor):
+    # Последнее выданное смещение журнала хранилось среди счётчиков dashboard
+    DashboardCounter = apps.get_model('delservice_app', 'DashboardCounter')
+    SystemCounter = apps.get_model('delservice_app', 'SystemCounter')
+    for counter in DashboardCounter.objects.filter(key='order_events_position'):
+        SystemCounter.objects.create(key=counter.key, value=counter.value)
+        counter.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('delservice_app', '0017_system_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_event_position, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,10 @@
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Lower, TruncDate
+from django.utils import timezone
 
 class Role(models.Model):
     name = models.CharField(max_length=50, unique=True)
@@ -24,6 +30,10 @@ class User(models.Model):
 
     class Meta:
         db_table = 'users'
+        indexes = [
+            # Подсчёт активных курьеров: role + status
+            models.Index(fields=['role', 'status'], name='users_role_status_idx'),
+        ]
 
 class Client(models.Model):
     email = models.EmailField(unique=True)
@@ -37,6 +47,10 @@ class Client(models.Model):
 
     class Meta:
         db_table = 'clients'
+        indexes = [
+            # Поиск клиента по email без учёта регистра (импорт заказов)
+            models.Index(Lower('email'), name='clients_email_lower_idx'),
+        ]
 
 class Address(models.Model):
     street = models.CharField(max_length=255)
@@ -110,6 +124,38 @@ class Order(models.Model):
 
     class Meta:
         db_table = 'orders'
+        indexes = [
+            # Список заказов и курсорная пагинация по (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='orders_created_id_idx'),
+            # Фильтр по статусу с сортировкой по дате
+            models.Index(fields=['status', '-created_at'], name='orders_status_created_idx'),
+            # Фильтр по курьеру и отчёты по курьерам за период
+            models.Index(fields=['courier', 'created_at'], name='orders_courier_created_idx'),
+            # Фильтры created_at__date (заказы за сегодня, диапазоны дат)
+            models.Index(TruncDate('created_at'), name='orders_created_date_idx'),
+            # Частичные индексы по незавершённым заказам
+            models.Index(
+                fields=['status', 'created_at'], name='orders_open_status_idx',
+                condition=Q(delivered_at__isnull=True),
+            ),
+            models.Index(
+                fields=['courier'], name='orders_open_courier_idx',
+                condition=Q(delivered_at__isnull=True),
+            ),
+            # Перцентили этапов (analytics): заказы, закончившие этап за период
+            models.Index(
+                fields=['confirmed_at'], name='orders_confirmed_at_idx',
+                condition=Q(confirmed_at__isnull=False),
+            ),
+            models.Index(
+                fields=['dispatched_at'], name='orders_dispatched_at_idx',
+                condition=Q(dispatched_at__isnull=False),
+            ),
+            models.Index(
+                fields=['delivered_at'], name='orders_delivered_at_idx',
+                condition=Q(delivered_at__isnull=False),
+            ),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -130,7 +176,7 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Отзыв к заказу #{self.order.id}"
+        return f"Отзыв к заказу #{self.order_id}"
 
     class Meta:
         db_table = 'reviews'
@@ -144,7 +190,334 @@ class Payment(models.Model):
     paid_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"Оплата заказа #{self.order.id}"
+        return f"Оплата заказа #{self.order_id}"
+
+    class Meta:
+        db_table = 'payments'
+
+class DashboardCounter(models.Model):
+    """Предрассчитанный счётчик панели управления"""
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+    class Meta:
+        db_table = 'dashboard_counters'
+
+
+class SystemCounter(models.Model):
+    """Служебный счётчик (версии данных, позиции журналов); на dashboard не выводится"""
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+    class Meta:
+        db_table = 'system_counters'
+
+
+
+class OrderStatusHistory(models.Model):
+    """Смена статуса заказа (только добавление записей)"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_history')
+    from_status = models.ForeignKey(OrderStatus, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    to_status = models.ForeignKey(OrderStatus, on_delete=models.PROTECT, related_name='+')
+    changed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Заказ #{self.order_id}: {self.from_status_id} → {self.to_status_id}"
+
+    class Meta:
+        db_table = 'order_status_history'
+        indexes = [
+            # История одного заказа и выборки за период (SLA, отчёты)
+            models.Index(fields=['order', 'changed_at'], name='status_history_order_idx'),
+            models.Index(fields=['changed_at'], name='status_history_changed_idx'),
+            models.Index(fields=['to_status', 'changed_at'], name='status_history_to_idx'),
+        ]
+
+
+class OrderEvent(models.Model):
+    """Изменение заказа или его позиции (журнал событий, только добавление записей).
+
+    position — смещение в журнале: потребители читают события с position
+    больше последнего прочитанного. Оно выдаётся уже зафиксированным
+    событиям (events.sequence), до этого position пуст. order_id — не
+    внешний ключ: события удалённого заказа остаются в журнале.
+    """
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ARCHIVED = 'archived'
+    ACTION_CHOICES = [
+        (CREATED, 'Создание'),
+        (UPDATED, 'Изменение'),
+        (DELETED, 'Удаление'),
+        (ARCHIVED, 'Перенос в архив'),
+    ]
+    ORDER = 'order'
+    ORDER_ITEM = 'order_item'
+    ENTITY_CHOICES = [
+        (ORDER, 'Заказ'),
+        (ORDER_ITEM, 'Позиция заказа'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.IntegerField()
+    order_id = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changes = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    position = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.entity} {self.entity_id} {self.action}"
+
+    class Meta:
+        db_table = 'order_events'
+        indexes = [
+            models.Index(fields=['order_id', 'position'], name='order_events_order_pos_idx'),
+            models.Index(fields=['id'], condition=Q(position__isnull=True), name='order_events_unsequenced_idx'),
+        ]
+
+class OrderListRow(models.Model):
+    """Строка списка заказов: заказ с именами клиента и курьера, адресом и числом позиций.
+
+    Денормализованная копия для страницы списка, без JOIN; поддерживается
+    модулем list_rows. Название статуса берётся из кэша справочников по status_id.
+    """
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name='list_row')
+    created_at = models.DateTimeField()
+    status_id = models.IntegerField()
+    client_id = models.IntegerField()
+    client_name = models.CharField(max_length=255)
+    client_phone = models.CharField(max_length=20)
+    delivery_address_id = models.IntegerField()
+    address = models.CharField(max_length=300)
+    courier_id = models.IntegerField(null=True, blank=True)
+    courier_name = models.CharField(max_length=255, blank=True, null=True)
+    delivery_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    item_count = models.IntegerField(default=0)
+
+    archived = False
+
+    @property
+    def id(self):
+        return self.order_id
+
+    def __str__(self):
+        return f"Заказ #{self.order_id}"
+
+    class Meta:
+        db_table = 'order_list_view'
+        indexes = [
+            # Те же фильтры и сортировка, что у orders (см. Order.Meta.indexes)
+            models.Index(fields=['-created_at', '-order'], name='order_list_created_idx'),
+            models.Index(fields=['status_id', '-created_at'], name='order_list_status_idx'),
+            models.Index(fields=['courier_id', 'created_at'], name='order_list_courier_idx'),
+            models.Index(fields=['client_id', '-created_at'], name='order_list_client_idx'),
+        ]
+
+# ==================== ДНЕВНЫЕ АГРЕГАТЫ ДЛЯ ОТЧЁТОВ ====================
+
+class DailyCourierStat(models.Model):
+    """Заказы курьера за день (по дате создания заказа)"""
+    day = models.DateField()
+    courier = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    deliveries = models.IntegerField(default=0)
+    earnings = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'daily_courier_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'courier'], name='daily_courier_stats_uniq'),
+        ]
+
+
+class DailyStatusStat(models.Model):
+    """Количество заказов, созданных за день, в разрезе текущего статуса"""
+    day = models.DateField()
+    status = models.ForeignKey(OrderStatus, on_delete=models.CASCADE, related_name='daily_stats')
+    orders = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_status_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='daily_status_stats_uniq'),
+        ]
+
+
+class DailyPaymentStat(models.Model):
+    """Платежи за день в разрезе способа оплаты"""
+    day = models.DateField()
+    payment_method = models.ForeignKey(PaymentMethod, on_delete=models.CASCADE, related_name='daily_stats')
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payments = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_payment_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'payment_method'], name='daily_payment_stats_uniq'),
+        ]
+
+
+
+class DailyLatencyStat(models.Model):
+    """Перцентили длительности этапа заказа за день (по дню окончания этапа).
+
+    Строка без курьера — по всем заказам дня; она пишется и при нуле
+    заказов и отмечает, что день уже посчитан.
+    """
+    day = models.DateField()
+    stage = models.CharField(max_length=20)
+    courier = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_latency_stats')
+    samples = models.IntegerField(default=0)
+    p50 = models.FloatField(null=True, blank=True)  # Секунды
+    p90 = models.FloatField(null=True, blank=True)
+    p99 = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'daily_latency_stats'
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'stage', 'courier'], name='daily_latency_stats_uniq'),
+            models.UniqueConstraint(
+                fields=['day', 'stage'], condition=Q(courier__isnull=True), name='daily_latency_stats_total_uniq',
+            ),
+        ]
+
+class RollupDirtyDay(models.Model):
+    """День, агрегаты которого устарели и должны быть пересчитаны"""
+    day = models.DateField(unique=True)
+    marked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'rollup_dirty_days'
+
+
+class ReportJob(models.Model):
+    """Задание на фоновое формирование PDF-отчёта"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'В очереди'),
+        (RUNNING, 'Формируется'),
+        (DONE, 'Готов'),
+        (FAILED, 'Ошибка'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    cache_key = models.CharField(max_length=64, db_index=True)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    file_path = models.CharField(max_length=500, blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Отчёт {self.id} ({self.get_status_display()})"
+
+    class Meta:
+        db_table = 'report_jobs'
+
+
+class GeocodeCache(models.Model):
+    """Результат геокодирования нормализованного адреса (пустые координаты — адрес не найден)"""
+    key = models.CharField(max_length=300, unique=True)
+    latitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
+    longitude = models.DecimalField(max_digits=10, decimal_places=7, blank=True, null=True)
+    provider = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+    class Meta:
+        db_table = 'geocode_cache'
+
+
+# ==================== АРХИВ ЗАКАЗОВ ====================
+# Доставленные заказы старше ARCHIVE_AFTER_MONTHS месяцев (см. archive.py).
+# Связи — не внешние ключи: клиент, адрес или курьер архивного заказа могут
+# быть удалены. На PostgreSQL таблицы секционированы по месяцам created_at.
+
+class ArchivedOrder(models.Model):
+    """Заказ в архиве: столбцы orders и поля строки списка (OrderListRow)"""
+    id = models.IntegerField(primary_key=True)
+    client_id = models.IntegerField()
+    delivery_address_id = models.IntegerField()
+    pickup_address_id = models.IntegerField(null=True, blank=True)
+    courier_id = models.IntegerField(null=True, blank=True)
+    status_id = models.IntegerField()
+    payment_method_id = models.IntegerField()
+    delivery_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    order_total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    created_at = models.DateTimeField()
+    confirmed_at = models.DateTimeField(null=True, blank=True)
+    courier_assigned_at = models.DateTimeField(null=True, blank=True)
+    dispatched_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    comment = models.TextField(blank=True, null=True)
+    client_name = models.CharField(max_length=255)
+    client_phone = models.CharField(max_length=20)
+    address = models.CharField(max_length=300)
+    courier_name = models.CharField(max_length=255, blank=True, null=True)
+    item_count = models.IntegerField(default=0)
+    # Отзыв и история статусов заказа — отдельных архивных таблиц для них нет
+    review = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    status_history = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    archived = True
+
+    def __str__(self):
+        return f"Заказ #{self.id} (архив)"
+
+    class Meta:
+        db_table = 'orders_archive'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='orders_archive_created_idx'),
+            models.Index(fields=['status_id', '-created_at'], name='orders_archive_status_idx'),
+            models.Index(fields=['courier_id', 'created_at'], name='orders_archive_courier_idx'),
+            models.Index(fields=['client_id', '-created_at'], name='orders_archive_client_idx'),
+        ]
+
+class ArchivedOrderItem(models.Model):
+    id = models.IntegerField(primary_key=True)
+    order_id = models.IntegerField()
+    # Ключ секционирования: дата заказа
+    order_created_at = models.DateTimeField()
+    product_id = models.IntegerField()
+    quantity = models.SmallIntegerField(default=1)
+    price_at_order = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        db_table = 'order_items_archive'
+        indexes = [
+            models.Index(fields=['order_id'], name='order_items_archive_order_idx'),
+        ]
+
+class ArchivedPayment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    order_id = models.IntegerField()
+    order_created_at = models.DateTimeField()
+    payment_method_id = models.IntegerField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20)
+    transaction_number = models.CharField(max_length=100, blank=True, null=True)
+    paid_at = models.DateTimeField()
 
     class Meta:
-        db_table = 'payments'
\ No newline at end of file
+        db_table = 'payments_archive'
+        indexes = [
+            models.Index(fields=['order_id'], name='payments_archive_order_idx'),
+            models.Index(fields=['payment_method_id'], name='payments_archive_method_idx'),
+        ]
@@ -0,0 +1,81 @@
+"""
+Кэш страниц-списков с версионной инвалидацией.
+
+Ключ страницы — представление, параметры запроса, пользователь и версии
+таблиц, которые страница показывает (delservice_app.versions). Сигналы
+сохранения и удаления этих моделей увеличивают версию, и следующий запрос
+получает новый ключ — старые записи просто перестают запрашиваться и
+вытесняются по таймауту.
+
+Ключ же служит ETag: если браузер прислал совпадающий If-None-Match,
+ответ 304 отдаётся без обращения к БД и к кэшу страниц. Бэкенд задаётся
+алиасом PAGE_CACHE в settings.CACHES (память процесса, файлы, Redis).
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from . import versions
+
+DEFAULT_TIMEOUT = 600
+
+
+def _page_key(request, view, labels):
+    current = versions.get_many(labels)
+    query = sorted(request.GET.lists())
+    raw = repr((
+        view.__module__, view.__qualname__, query, request.user.pk,
+        # Для HTMX по тому же адресу отдаются только строки таблицы
+        bool(request.headers.get('HX-Request')),
+        [(label, current[label]) for label in labels],
+    ))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def versioned_page(*models, timeout=None):
+    """Кэширование GET-ответа представления до изменения данных models"""
+    labels = sorted(model._meta.db_table for model in models)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # Всплывающие сообщения выводятся в шаблоне один раз — такую страницу не кэшируем
+            if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            key = _page_key(request, view, labels)
+            etag = f'"{key}"'
+            cache = caches[getattr(settings, 'PAGE_CACHE', 'default')]
+            entry = cache.get(f'page:{key}')
+
+            last_modified = entry['modified'] if entry else None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None and entry:
+                response = HttpResponse(entry['content'], content_type=entry['content_type'])
+            elif response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                last_modified = int(timezone.now().timestamp())
+                cache.set(f'page:{key}', {
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'modified': last_modified,
+                }, timeout or getattr(settings, 'PAGE_CACHE_TIMEOUT', DEFAULT_TIMEOUT))
+
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+            # Страница зависит от пользователя: браузер хранит её у себя и перепроверяет по ETag
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['HX-Request'])
+            return response
+        return wrapper
+    return decorator
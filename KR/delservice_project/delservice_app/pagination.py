@@ -0,0 +1,194 @@
+import json
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.shortcuts import render
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_LIST_PAGE_SIZE = 50
+MAX_LIST_PAGE_SIZE = 200
+
+
+class KeysetPage:
+    """Страница курсорной пагинации"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor, approximate_total=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_total = approximate_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Курсорная (keyset) пагинация по паре (created_at, id) в порядке убывания.
+    При field=None страницы идут только по id.
+
+    Вместо OFFSET и COUNT(*) каждая страница выбирается условием
+    «строго после последней показанной записи», поэтому время выборки
+    не зависит от глубины страницы. Курсор — подписанный токен,
+    содержимое которого клиенту знать не нужно.
+
+    Вместо одной выборки можно передать список (рабочая таблица и архив):
+    страница каждой читается по её индексу, и они сливаются в одну.
+    """
+
+    salt = 'delservice_app.keyset'
+
+    def __init__(self, queryset, per_page, field='created_at'):
+        self.querysets = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+        self.per_page = per_page
+        self.field = field
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field).isoformat() if self.field else None
+        return signing.dumps({'v': value, 'id': obj.pk, 'd': direction}, salt=self.salt)
+
+    def decode_cursor(self, token):
+        """Разбор токена; повреждённый или чужой курсор означает первую страницу"""
+        if not token:
+            return None
+        try:
+            data = signing.loads(token, salt=self.salt)
+            value = parse_datetime(data['v']) if self.field else None
+            direction = data['d']
+            pk = int(data['id'])
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+        if (self.field and value is None) or direction not in ('next', 'prev'):
+            return None
+        return value, pk, direction
+
+    def _ordering(self, descending):
+        ordering = [self.field, 'pk'] if self.field else ['pk']
+        return [f'-{name}' for name in ordering] if descending else ordering
+
+    def _after(self, value, pk, lookup):
+        """Условие «строго после (value, pk)» в направлении lookup (lt/gt)"""
+        if not self.field:
+            return Q(**{f'pk__{lookup}': pk})
+        return Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'pk__{lookup}': pk})
+
+    def _key(self, obj):
+        return (getattr(obj, self.field), obj.pk) if self.field else obj.pk
+
+    def _fetch(self, condition, descending):
+        """Первые per_page + 1 записей в порядке страницы; выборки сливаются по ключу сортировки"""
+        object_list = []
+        for queryset in self.querysets:
+            if condition is not None:
+                queryset = queryset.filter(condition)
+            # Берём на одну запись больше, чтобы узнать, есть ли следующая страница
+            object_list.extend(queryset.order_by(*self._ordering(descending))[:self.per_page + 1])
+        if len(self.querysets) > 1:
+            object_list.sort(key=self._key, reverse=descending)
+        return object_list[:self.per_page + 1]
+
+    def approximate_count(self):
+        return sum(approximate_count(queryset) for queryset in self.querysets)
+
+    def get_page(self, token, with_total=False):
+        cursor = self.decode_cursor(token)
+
+        if cursor is None:
+            direction = 'next'
+            object_list = self._fetch(None, descending=True)
+        else:
+            value, pk, direction = cursor
+            if direction == 'next':
+                object_list = self._fetch(self._after(value, pk, 'lt'), descending=True)
+            else:
+                object_list = self._fetch(self._after(value, pk, 'gt'), descending=False)
+
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+
+        if direction == 'prev':
+            object_list.reverse()
+            has_next = True
+            has_previous = has_more
+        else:
+            has_next = has_more
+            has_previous = cursor is not None
+
+        next_cursor = previous_cursor = None
+        if object_list:
+            if has_next:
+                next_cursor = self.encode_cursor(object_list[-1], 'next')
+            if has_previous:
+                previous_cursor = self.encode_cursor(object_list[0], 'prev')
+
+        approximate_total = self.approximate_count() if with_total else None
+        return KeysetPage(object_list, next_cursor, previous_cursor, approximate_total)
+
+
+def approximate_count(queryset):
+    """
+    Примерное количество строк в выборке.
+
+    На PostgreSQL берётся оценка планировщика из EXPLAIN (без выполнения
+    запроса), на остальных СУБД выполняется обычный COUNT(*).
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def list_page_size(request, default=None):
+    """Размер страницы из параметра per_page, ограниченный MAX_LIST_PAGE_SIZE"""
+    default = default or getattr(settings, 'LIST_PAGE_SIZE', DEFAULT_LIST_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('per_page', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, MAX_LIST_PAGE_SIZE))
+
+
+def render_list(request, queryset, template, rows_template, context, object_name,
+                fields=None, per_page=None, prepare=None):
+    """
+    Постраничный вывод списка.
+
+    Из БД читаются только столбцы fields (only()) и только строки текущей
+    страницы. Запрос от HTMX (заголовок HX-Request) получает лишь строки
+    таблицы rows_template — так подгружается следующая страница при
+    прокрутке; обычный запрос — всю страницу template. prepare(objects)
+    вызывается для строк страницы перед выводом.
+    """
+    if fields:
+        queryset = queryset.only(*fields)
+    page_obj = Paginator(queryset, per_page or list_page_size(request)).get_page(request.GET.get('page'))
+    page_obj.object_list = list(page_obj.object_list)
+    if prepare:
+        prepare(page_obj.object_list)
+
+    context = {**context, object_name: page_obj.object_list, 'page_obj': page_obj, 'rows_template': rows_template}
+    if request.headers.get('HX-Request'):
+        return render(request, rows_template, context)
+    return render(request, template, context)
@@ -0,0 +1,149 @@
+"""
+Профилирование SQL-запросов.
+
+QueryProfile подключается к соединению через connection.execute_wrapper
+и для каждого запроса запоминает время, отпечаток (SQL без значений
+параметров и с схлопнутыми списками IN) и место вызова в коде проекта.
+Одинаковые отпечатки, повторённые N_PLUS_ONE_THRESHOLD раз и больше, —
+характерный признак N+1: ленивая загрузка связи в цикле.
+
+Обёртка ставится на соединение потока, открывшего профиль. Код, ушедший
+через sync_to_async(thread_sensitive=False) в другой поток, работает со
+своим соединением; его запросы попадают в профиль, если поток выполняет
+их внутри attach_active() — так делает async_views.in_thread. Открытые
+профили хранятся в contextvars, а sync_to_async переносит контекст в
+рабочий поток.
+
+Используется QueryProfilerMiddleware (delservice_app.middleware) и
+помощником тестов assert_max_queries (delservice_app.testing).
+"""
+import contextvars
+import re
+import time
+import traceback
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+N_PLUS_ONE_THRESHOLD = 5
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACES = re.compile(r'\s+')
+
+_THIS_FILE = str(Path(__file__).resolve())
+
+# Профили, открытые в текущем контексте
+_active = contextvars.ContextVar('query_profiles', default=())
+
+
+def fingerprint(sql):
+    """Нормализованный текст запроса: без чисел, списков IN и лишних пробелов"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _NUMBER.sub('N', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def origin():
+    """Самый глубокий кадр стека в коде проекта (не Django и не сторонние пакеты)"""
+    base_dir = str(settings.BASE_DIR)
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if filename == _THIS_FILE or not filename.startswith(base_dir) or 'site-packages' in filename:
+            continue
+        return f'{Path(filename).relative_to(base_dir)}:{frame.lineno} in {frame.name}'
+    return None
+
+
+@contextmanager
+def attach_active():
+    """Профили, открытые в текущем контексте, — и на соединениях этого потока"""
+    with ExitStack() as stack:
+        for profile in _active.get():
+            connection = connections[profile.using]
+            if profile not in connection.execute_wrappers:
+                stack.enter_context(connection.execute_wrapper(profile))
+        yield
+
+
+class QueryProfile:
+    """Сбор статистики запросов внутри блока with"""
+
+    def __init__(self, using='default', capture_origin=True):
+        self.using = using
+        self.capture_origin = capture_origin
+        self.queries = []
+        self._started = None
+        self._wrapper_cm = None
+        self._token = None
+        self.elapsed = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        self._wrapper_cm = connections[self.using].execute_wrapper(self)
+        self._wrapper_cm.__enter__()
+        self._token = _active.set(_active.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active.reset(self._token)
+        self._wrapper_cm.__exit__(*exc_info)
+        self.elapsed = time.perf_counter() - self._started
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': params,
+                'duration': time.perf_counter() - started,
+                'fingerprint': fingerprint(sql),
+                'origin': origin() if self.capture_origin else None,
+            })
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(query['duration'] for query in self.queries)
+
+    def duplicates(self):
+        """Точные повторы: {sql: количество} для запросов, выполненных больше одного раза"""
+        counts = Counter((query['sql'], repr(query['params'])) for query in self.queries)
+        return {sql: count for (sql, _), count in counts.items() if count > 1}
+
+    def n_plus_one(self, threshold=None):
+        """Подозрения на N+1: отпечатки с числом повторов не меньше порога"""
+        threshold = threshold or getattr(settings, 'QUERY_PROFILER_N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD)
+        groups = defaultdict(list)
+        for query in self.queries:
+            groups[query['fingerprint']].append(query)
+
+        suspects = []
+        for sql, queries in groups.items():
+            if len(queries) >= threshold:
+                suspects.append({
+                    'fingerprint': sql,
+                    'count': len(queries),
+                    'duration': sum(query['duration'] for query in queries),
+                    'origins': Counter(query['origin'] for query in queries).most_common(3),
+                })
+        return sorted(suspects, key=lambda suspect: -suspect['count'])
+
+    def report(self, label=''):
+        """Текстовый отчёт для журнала"""
+        lines = [f'{label}: {self.count} запросов, БД {self.db_time * 1000:.1f} мс, всего {self.elapsed * 1000:.1f} мс']
+        for sql, count in self.duplicates().items():
+            lines.append(f'  повтор x{count}: {sql[:200]}')
+        for suspect in self.n_plus_one():
+            lines.append(f'  возможный N+1 x{suspect["count"]}: {suspect["fingerprint"][:200]}')
+            for place, count in suspect['origins']:
+                lines.append(f'    {place or "?"} ({count})')
+        return '\n'.join(lines)
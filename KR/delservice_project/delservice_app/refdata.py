@@ -0,0 +1,134 @@
+"""
+Кэш справочников в памяти процесса: статусы заказов, способы оплаты, роли.
+
+Таблицы маленькие и меняются редко, поэтому читаются целиком один раз и
+хранятся в процессе. При сохранении или удалении записи сигнал увеличивает
+версию таблицы (delservice_app.versions), и при следующем обращении каждый
+процесс перечитывает её. Формы, представления и фильтры берут отсюда
+списки выбора и первичные ключи — фильтр status_id=… вместо JOIN по
+status__code=….
+
+Возвращаемые объекты общие для всех запросов процесса — изменять их нельзя.
+"""
+import threading
+import time
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.forms.models import ModelChoiceIterator
+
+from . import versions
+from .models import OrderStatus, PaymentMethod, Role
+
+# Как часто (в секундах) сверять версию с общим кэшем
+CHECK_INTERVAL = 1.0
+
+
+class RefTable:
+    """Справочная таблица целиком в памяти"""
+
+    def __init__(self, model, key_field, ordering):
+        self.model = model
+        self.key_field = key_field
+        self.ordering = ordering
+        self.label = model._meta.db_table
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._rows = ()
+        self._by_pk = {}
+        self._by_key = {}
+
+    def _load(self):
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < CHECK_INTERVAL:
+            return
+        version = versions.get(self.label)
+        self._checked_at = now
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            rows = tuple(self.model.objects.order_by(*self.ordering))
+            self._by_pk = {row.pk: row for row in rows}
+            self._by_key = {getattr(row, self.key_field): row for row in rows}
+            self._rows = rows
+            self._version = version
+
+    def all(self):
+        self._load()
+        return self._rows
+
+    def get(self, pk):
+        self._load()
+        return self._by_pk.get(pk)
+
+    def by_key(self, key):
+        """Запись по коду (для ролей — по названию)"""
+        self._load()
+        return self._by_key.get(key)
+
+    def pk_for(self, key):
+        row = self.by_key(key)
+        return row.pk if row else None
+
+    def invalidate(self):
+        """Новая версия после фиксации транзакции; свой процесс перечитает таблицу сразу"""
+        def bump():
+            versions.bump(self.label)
+            self._version = None
+
+        transaction.on_commit(bump)
+
+
+statuses = RefTable(OrderStatus, 'code', ordering=('sort_order', 'id'))
+payment_methods = RefTable(PaymentMethod, 'code', ordering=('id',))
+roles = RefTable(Role, 'name', ordering=('id',))
+
+TABLES = {table.model: table for table in (statuses, payment_methods, roles)}
+
+
+def table_for(model):
+    return TABLES[model]
+
+
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.table.all():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.table.all()) + (self.field.empty_label is not None)
+
+
+class CachedModelChoiceField(forms.ModelChoiceField):
+    """ModelChoiceField для справочника: варианты и проверка значения без запросов к БД.
+
+    Подключается в ModelForm через Meta.field_classes.
+    """
+    iterator = CachedModelChoiceIterator
+
+    def __init__(self, queryset, **kwargs):
+        self.table = table_for(queryset.model)
+        super().__init__(queryset, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.table.model):
+            value = value.pk
+        try:
+            obj = self.table.get(int(value))
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
@@ -0,0 +1,303 @@
+"""
+Фоновое формирование PDF-отчёта.
+
+Запрос пользователя только ставит задание (ReportJob) в локальный пул
+потоков и сразу возвращает его идентификатор; клиент опрашивает статус и
+скачивает готовый файл. Файлы хранятся в REPORTS_ROOT под ключом
+«параметры + версия данных», поэтому одинаковые отчёты по неизменным
+данным повторно не строятся. Версия данных — счётчик rollups_version,
+который увеличивается при каждом пересчёте дневных агрегатов, и версия
+перцентилей времени выполнения (analytics.data_version).
+
+Задание ставится только POST-запросом; задания старше REPORT_JOBS_KEEP_DAYS
+дней и их файлы удаляет команда cleanup_reports (cleanup()).
+"""
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from . import analytics, rollups
+from .models import ReportJob
+
+# Задание в очереди дольше этого считается потерянным (например, после перезапуска)
+STALE_AFTER = timedelta(minutes=10)
+
+_executor = None
+_executor_lock = threading.Lock()
+_fonts_registered = False
+_fonts_lock = threading.Lock()
+
+
+def reportlab_available():
+    try:
+        import reportlab  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def keep_days():
+    return getattr(settings, 'REPORT_JOBS_KEEP_DAYS', 7)
+
+
+def reports_root():
+    return Path(getattr(settings, 'REPORTS_ROOT', settings.BASE_DIR / 'generated_reports'))
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'REPORT_WORKERS', 2),
+                thread_name_prefix='report-worker',
+            )
+        return _executor
+
+
+def register_fonts():
+    """Регистрация шрифтов с кириллицей — один раз на процесс"""
+    global _fonts_registered
+    with _fonts_lock:
+        if _fonts_registered:
+            return
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        pdfmetrics.registerFont(TTFont('DejaVuSans', str(settings.BASE_DIR / 'DejaVuSans.ttf')))
+        pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', str(settings.BASE_DIR / 'DejaVuSans-Bold.ttf')))
+        _fonts_registered = True
+
+
+def cache_key(params, version):
+    raw = json.dumps({'params': params, 'version': version}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def request_report(days=30):
+    """Готовое или уже выполняющееся задание для отчёта; при необходимости ставит новое"""
+    rollups.refresh_dirty()
+    analytics.refresh(days=days)
+    params = {'days': days, 'as_of': timezone.localdate().isoformat()}
+    key = cache_key(params, [rollups.data_version(), analytics.data_version()])
+
+    for job in ReportJob.objects.filter(cache_key=key).exclude(status=ReportJob.FAILED).order_by('-created_at'):
+        if job.status == ReportJob.DONE and job.file_path and os.path.exists(job.file_path):
+            return job
+        if job.status in (ReportJob.PENDING, ReportJob.RUNNING) and job.created_at > timezone.now() - STALE_AFTER:
+            return job
+
+    job = ReportJob.objects.create(cache_key=key, params=params)
+    get_executor().submit(run_job, job.pk)
+    return job
+
+
+def cleanup(days=None):
+    """Удаление заданий старше days дней и файлов отчётов без заданий; (заданий, файлов)"""
+    days = keep_days() if days is None else days
+    before = timezone.now() - timedelta(days=days)
+    jobs, _ = ReportJob.objects.filter(created_at__lt=before).delete()
+
+    # Один файл может принадлежать нескольким заданиям с тем же ключом: удаляется
+    # файл, на который не ссылается ни одно оставшееся задание. Файлы моложе
+    # срока не трогаются — среди них могут быть формирующиеся (.tmp)
+    root = reports_root()
+    if not root.is_dir():
+        return jobs, 0
+    kept = set(ReportJob.objects.exclude(file_path=None).values_list('file_path', flat=True))
+    files = 0
+    for path in root.iterdir():
+        if not path.is_file() or str(path) in kept:
+            continue
+        if path.stat().st_mtime >= before.timestamp():
+            continue
+        path.unlink(missing_ok=True)
+        files += 1
+    return jobs, files
+
+
+def run_job(job_id):
+    """Выполнение задания в рабочем потоке"""
+    close_old_connections()
+    try:
+        ReportJob.objects.filter(pk=job_id).update(status=ReportJob.RUNNING)
+        job = ReportJob.objects.get(pk=job_id)
+        root = reports_root()
+        root.mkdir(parents=True, exist_ok=True)
+        path = root / f'{job.cache_key}.pdf'
+        tmp_path = root / f'{job.cache_key}.{job_id}.tmp'
+        with open(tmp_path, 'wb') as output:
+            build_report_pdf(output, days=job.params.get('days', 30))
+        # Готовый файл появляется под итоговым именем атомарно
+        os.replace(tmp_path, path)
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.DONE, file_path=str(path), finished_at=timezone.now()
+        )
+    except Exception as e:
+        ReportJob.objects.filter(pk=job_id).update(
+            status=ReportJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+    finally:
+        connection.close()
+
+
+def build_report_pdf(output, days=30):
+    """Формирование PDF-отчёта по дневным агрегатам"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.units import inch
+
+    register_fonts()
+
+    doc = SimpleDocTemplate(output, pagesize=A4)
+    elements = []
+
+    styles = getSampleStyleSheet()
+
+    # Создание стилей с кириллическим шрифтом
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontName='DejaVuSans-Bold',
+        fontSize=16,
+        spaceAfter=30,
+        alignment=1,
+        textColor=colors.black
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading2'],
+        fontName='DejaVuSans-Bold',
+        fontSize=14,
+        spaceAfter=12,
+        spaceBefore=20,
+        textColor=colors.black
+    )
+
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=styles['Normal'],
+        fontName='DejaVuSans',
+        fontSize=10,
+        textColor=colors.black
+    )
+
+    def table_style(*extra):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.lightgrey, colors.white]),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            *extra,
+        ])
+
+    # Заголовок отчёта
+    elements.append(Paragraph('Отчёт о деятельности службы доставки', title_style))
+    elements.append(Paragraph(f'Дата формирования: {timezone.now().strftime("%d.%m.%Y %H:%M")}', normal_style))
+    elements.append(Spacer(1, 20))
+
+    # Статистика по курьерам
+    elements.append(Paragraph(f'Эффективность курьеров (за последние {days} дней)', heading_style))
+
+    courier_data = [['Курьер', 'Количество доставок', 'Общий доход (₽)']]
+    for courier in rollups.courier_stats(days=days):
+        courier_data.append([
+            courier.full_name,
+            str(courier.total_deliveries),
+            f"{courier.total_earnings or 0} ₽"
+        ])
+
+    if len(courier_data) > 1:
+        courier_table = Table(courier_data, colWidths=[2.5 * inch, 1.7 * inch, 1.3 * inch])
+        courier_table.setStyle(table_style())
+        elements.append(courier_table)
+    else:
+        elements.append(Paragraph('Нет данных за указанный период', normal_style))
+
+    elements.append(Spacer(1, 30))
+
+    # Статистика по статусам заказов
+    elements.append(Paragraph('Статистика заказов по статусам', heading_style))
+
+    status_data = [['Статус', 'Количество заказов']]
+    for status in rollups.status_stats():
+        status_data.append([status.name, str(status.order_count)])
+
+    if len(status_data) > 1:
+        status_table = Table(status_data, colWidths=[3 * inch, 2.5 * inch])
+        status_table.setStyle(table_style())
+        elements.append(status_table)
+    else:
+        elements.append(Paragraph('Нет данных', normal_style))
+
+    elements.append(Spacer(1, 30))
+
+    # Статистика по способам оплаты
+    elements.append(Paragraph('Доходы по способам оплаты', heading_style))
+
+    payment_data = [['Способ оплаты', 'Общая сумма (₽)', 'Кол-во платежей']]
+    for payment in rollups.payment_stats():
+        payment_data.append([
+            payment.name,
+            f"{payment.total_amount or 0} ₽",
+            str(payment.payment_count)
+        ])
+
+    if len(payment_data) > 1:
+        payment_table = Table(payment_data, colWidths=[2.5 * inch, 2 * inch, 1.7 * inch])
+        payment_table.setStyle(table_style(('WORDWRAP', (0, 0), (-1, -1), True)))
+        elements.append(payment_table)
+    else:
+        elements.append(Paragraph('Нет данных', normal_style))
+
+    elements.append(Spacer(1, 30))
+
+    # Перцентили времени выполнения заказов
+    latency = analytics.window_stats(days=days)
+    elements.append(Paragraph(
+        f'Время выполнения заказов, мин ({latency["first_day"].strftime("%d.%m.%Y")} — '
+        f'{latency["last_day"].strftime("%d.%m.%Y")})', heading_style,
+    ))
+
+    def minutes(value):
+        return f'{value:.1f}' if value is not None else '—'
+
+    latency_data = [['Этап', 'Заказов', 'p50', 'p90', 'p99']]
+    for stage in latency['totals']:
+        latency_data.append([
+            stage['title'], str(stage['samples']),
+            minutes(stage['p50']), minutes(stage['p90']), minutes(stage['p99']),
+        ])
+    latency_table = Table(latency_data, colWidths=[2.3 * inch, 0.9 * inch, 0.9 * inch, 0.9 * inch, 0.9 * inch])
+    latency_table.setStyle(table_style())
+    elements.append(latency_table)
+
+    if latency['couriers']:
+        elements.append(Spacer(1, 12))
+        courier_latency_data = [['Курьер'] + [f'{title}, p50 / p90' for title in analytics.stage_titles()]]
+        for courier in latency['couriers']:
+            courier_latency_data.append([courier['full_name']] + [
+                f'{minutes(stage["p50"])} / {minutes(stage["p90"])}' for stage in courier['stages']
+            ])
+        courier_latency_table = Table(courier_latency_data, colWidths=[1.9 * inch] + [1.6 * inch] * 3)
+        courier_latency_table.setStyle(table_style(('FONTSIZE', (0, 0), (-1, -1), 8)))
+        elements.append(courier_latency_table)
+
+    doc.build(elements)
@@ -0,0 +1,139 @@
+"""
+Дневные агрегаты для отчётов.
+
+Отчёты читают таблицы daily_courier_stats, daily_status_stats и
+daily_payment_stats, а не пересчитывают Count/Sum по orders и payments.
+Сигналы сохранения и удаления Order/Payment помечают день записи в
+rollup_dirty_days; refresh_dirty() пересчитывает только эти дни.
+Код, который пишет заказы в обход сигналов, должен сам вызвать
+mark_dirty(). Историю заполняет команда backfill_rollups.
+
+Каждый пересчёт увеличивает служебный счётчик rollups_version (таблица
+system_counters) — по нему кэши готовых отчётов понимают, что данные
+изменились.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from . import counters
+from .dates import day_start
+from .models import (
+    DailyCourierStat, DailyPaymentStat, DailyStatusStat, Order, OrderStatus, Payment,
+    PaymentMethod, RollupDirtyDay, SystemCounter, User,
+)
+
+ROLLUP_MODELS = (DailyCourierStat, DailyStatusStat, DailyPaymentStat)
+
+DATA_VERSION_KEY = 'rollups_version'
+
+
+def data_version():
+    """Версия данных агрегатов"""
+    return SystemCounter.objects.filter(key=DATA_VERSION_KEY).values_list('value', flat=True).first() or 0
+
+
+def bump_data_version():
+    if SystemCounter.objects.filter(key=DATA_VERSION_KEY).update(value=F('value') + 1):
+        return
+    _, created = SystemCounter.objects.get_or_create(key=DATA_VERSION_KEY, defaults={'value': 1})
+    if not created:
+        # Строку успел создать параллельный пересчёт
+        SystemCounter.objects.filter(key=DATA_VERSION_KEY).update(value=F('value') + 1)
+
+
+def mark_dirty(days):
+    """Пометка дней как требующих пересчёта"""
+    days = {timezone.localdate(day) if hasattr(day, 'tzinfo') else day for day in days}
+    RollupDirtyDay.objects.bulk_create(
+        [RollupDirtyDay(day=day) for day in days], ignore_conflicts=True
+    )
+
+
+def rebuild_range(first_day, last_day):
+    """Пересчёт агрегатов за дни first_day..last_day включительно"""
+    start = day_start(first_day)
+    end = day_start(last_day + timedelta(days=1))
+
+    for model in ROLLUP_MODELS:
+        model.objects.filter(day__gte=first_day, day__lte=last_day).delete()
+
+    orders = Order.objects.filter(created_at__gte=start, created_at__lt=end).annotate(
+        day=TruncDate('created_at')
+    ).order_by()
+
+    DailyCourierStat.objects.bulk_create([
+        DailyCourierStat(
+            day=row['day'], courier_id=row['courier_id'],
+            deliveries=row['deliveries'], earnings=row['earnings'] or 0,
+        )
+        for row in orders.filter(courier__isnull=False).values('day', 'courier_id').annotate(
+            deliveries=Count('id'), earnings=Sum('delivery_cost'),
+        )
+    ])
+
+    DailyStatusStat.objects.bulk_create([
+        DailyStatusStat(day=row['day'], status_id=row['status_id'], orders=row['orders'])
+        for row in orders.values('day', 'status_id').annotate(orders=Count('id'))
+    ])
+
+    payments = Payment.objects.filter(paid_at__gte=start, paid_at__lt=end).annotate(
+        day=TruncDate('paid_at')
+    ).order_by()
+    DailyPaymentStat.objects.bulk_create([
+        DailyPaymentStat(
+            day=row['day'], payment_method_id=row['payment_method_id'],
+            amount=row['amount'] or 0, payments=row['payments'],
+        )
+        for row in payments.values('day', 'payment_method_id').annotate(
+            amount=Sum('amount'), payments=Count('id'),
+        )
+    ])
+
+    bump_data_version()
+
+
+@transaction.atomic
+def refresh_dirty():
+    """Пересчёт помеченных дней; возвращает их количество"""
+    days = list(RollupDirtyDay.objects.values_list('day', flat=True))
+    if not days:
+        return 0
+    # Метки снимаются до пересчёта: изменение, пришедшее во время пересчёта,
+    # снова пометит день и будет учтено при следующем вызове
+    RollupDirtyDay.objects.filter(day__in=days).delete()
+    for day in days:
+        rebuild_range(day, day)
+    return len(days)
+
+
+# ==================== ЧТЕНИЕ АГРЕГАТОВ ====================
+
+def courier_stats(days=30):
+    """Эффективность курьеров за последние days дней"""
+    since = timezone.localdate() - timedelta(days=days)
+    return User.objects.filter(
+        role_id=counters.courier_role_id(),
+        daily_stats__day__gte=since,
+    ).annotate(
+        total_deliveries=Sum('daily_stats__deliveries'),
+        total_earnings=Sum('daily_stats__earnings'),
+    ).order_by('-total_deliveries')
+
+
+def status_stats():
+    """Количество заказов по статусам за всё время"""
+    return OrderStatus.objects.annotate(
+        order_count=Coalesce(Sum('daily_stats__orders'), 0)
+    ).order_by('sort_order')
+
+
+def payment_stats():
+    """Сумма и количество платежей по способам оплаты за всё время"""
+    return PaymentMethod.objects.annotate(
+        total_amount=Sum('daily_stats__amount'),
+        payment_count=Coalesce(Sum('daily_stats__payments'), 0),
+    )
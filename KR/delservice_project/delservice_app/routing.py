@@ -0,0 +1,280 @@
+"""
+Маршрут курьера: все его активные заказы одним рейсом.
+
+Каждый заказ даёт одну-две точки: забор (pickup_address, если задан и
+заказ ещё не в пути) и доставку. Порядок точек подбирается эвристикой
+задачи коммивояжёра с ограничением «забор раньше доставки»: жадный
+ближайший сосед, затем локальный поиск: 2-opt (разворот участка),
+перенос одной точки и перенос пары «забор + доставка» — пока маршрут
+сокращается и доставка не оказывается раньше забора.
+
+Матрица расстояний считается один раз на набор координат (geo.distance_matrix,
+векторно при наличии NumPy) и хранится в кэше: повторное открытие
+страницы маршрута не пересчитывает её.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import F
+
+from . import refdata
+from .geo import distance_matrix
+from .models import Order
+
+ACTIVE_STATUS_CODES = ('assigned', 'dispatched')
+PICKED_UP_STATUS_CODE = 'dispatched'
+DELIVERED_STATUS_CODE = 'delivered'
+
+PICKUP = 'pickup'
+DELIVERY = 'delivery'
+
+MATRIX_CACHE_TIMEOUT = 60 * 60
+
+
+class Stop:
+    def __init__(self, order, kind, address):
+        self.order = order
+        self.kind = kind
+        self.address = address
+        self.distance_km = None  # от предыдущей точки
+
+    @property
+    def point(self):
+        if self.address is None or self.address.latitude is None or self.address.longitude is None:
+            return None
+        return float(self.address.latitude), float(self.address.longitude)
+
+    @property
+    def is_pickup(self):
+        return self.kind == PICKUP
+
+
+class Route:
+    def __init__(self, courier_id, start=None):
+        self.courier_id = courier_id
+        self.start = start          # (lat, lon) последней доставки курьера или None
+        self.stops = []             # упорядоченные точки с координатами
+        self.unplaced = []          # точки без координат, в конце списка
+        self.total_km = 0.0
+
+    @property
+    def orders(self):
+        return {stop.order.pk: stop.order for stop in self.stops + self.unplaced}
+
+
+def cached_matrix(points):
+    """Матрица расстояний [[км]] для списка точек; повторно — из кэша"""
+    digest = hashlib.sha1(repr([(round(lat, 7), round(lon, 7)) for lat, lon in points]).encode())
+    key = f'routing:matrix:{digest.hexdigest()}'
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = distance_matrix(points)
+        # Списки быстрее массива NumPy при поэлементном доступе в циклах ниже
+        matrix = matrix.tolist() if hasattr(matrix, 'tolist') else matrix
+        cache.set(key, matrix, MATRIX_CACHE_TIMEOUT)
+    return matrix
+
+
+def _respects_order(path, before):
+    """Каждая точка из before стоит позже обязательной предыдущей"""
+    position = {node: index for index, node in enumerate(path)}
+    return all(position[required] < position[node] for node, required in before.items())
+
+
+def nearest_neighbour(matrix, start, nodes, before):
+    """Жадный маршрут из start: каждый раз ближайшая точка, которую уже можно посетить"""
+    path = [start]
+    remaining = set(nodes)
+    visited = {start}
+    while remaining:
+        current = path[-1]
+        ready = [node for node in remaining if before.get(node) is None or before[node] in visited]
+        node = min(ready, key=lambda candidate: (matrix[current][candidate], candidate))
+        path.append(node)
+        visited.add(node)
+        remaining.remove(node)
+    return path
+
+
+def _edge(matrix, path, i, j):
+    """Длина ребра path[i] → path[j]; за концом открытого маршрута рёбер нет"""
+    return matrix[path[i]][path[j]] if j < len(path) else 0.0
+
+
+def two_opt_pass(matrix, path, before):
+    """Развороты участков path[i..j], сокращающие маршрут"""
+    improved = False
+    for i in range(1, len(path) - 1):
+        for j in range(i + 1, len(path)):
+            delta = (matrix[path[i - 1]][path[j]] + _edge(matrix, path, i, j + 1)
+                     - matrix[path[i - 1]][path[i]] - _edge(matrix, path, j, j + 1))
+            if delta < -1e-9:
+                candidate = path[:i] + path[i:j + 1][::-1] + path[j + 1:]
+                if _respects_order(candidate, before):
+                    path[:] = candidate
+                    improved = True
+    return improved
+
+
+def relocate_pass(matrix, path, before):
+    """Перенос одной точки в другое место маршрута.
+
+    Дополняет 2-opt: разворот участка часто ставит доставку раньше своего
+    забора и отбрасывается, а перенос одной точки — нет.
+    """
+    improved = False
+    for i in range(1, len(path)):
+        node = path[i]
+        removed = (matrix[path[i - 1]][node] + _edge(matrix, path, i, i + 1)
+                   - _edge(matrix, path, i - 1, i + 1))
+        rest = path[:i] + path[i + 1:]
+        for k in range(1, len(rest) + 1):
+            if k == i:
+                continue
+            added = matrix[rest[k - 1]][node]
+            if k < len(rest):
+                added += matrix[node][rest[k]] - matrix[rest[k - 1]][rest[k]]
+            if added - removed < -1e-9:
+                candidate = rest[:k] + [node] + rest[k:]
+                if _respects_order(candidate, before):
+                    path[:] = candidate
+                    improved = True
+                    break
+    return improved
+
+
+def _open_length(matrix, path):
+    return sum(matrix[a][b] for a, b in zip(path, path[1:]))
+
+
+def relocate_pair_pass(matrix, path, before):
+    """Перенос пары «забор + доставка» одного заказа на лучшие места.
+
+    Поодиночке такие точки часто не сдвинуть: забор упирается в свою
+    доставку, и маршрут застревает в локальном минимуме.
+    """
+    improved = False
+    for node, required in before.items():
+        current = _open_length(matrix, path)
+        rest = [other for other in path if other not in (node, required)]
+        best, best_length = None, current - 1e-9
+        for k in range(1, len(rest) + 1):
+            with_pickup = rest[:k] + [required] + rest[k:]
+            for m in range(k + 1, len(with_pickup) + 1):
+                candidate = with_pickup[:m] + [node] + with_pickup[m:]
+                length = _open_length(matrix, candidate)
+                if length < best_length and _respects_order(candidate, before):
+                    best, best_length = candidate, length
+        if best is not None:
+            path[:] = best
+            improved = True
+    return improved
+
+
+def improve(matrix, path, before, max_passes=50):
+    """Локальный поиск (2-opt, перенос точки и пары точек заказа), пока маршрут сокращается.
+
+    Первая точка (старт) не двигается; маршрут открытый — без возврата в начало.
+    """
+    path = list(path)
+    for _ in range(max_passes):
+        improved = two_opt_pass(matrix, path, before)
+        improved |= relocate_pass(matrix, path, before)
+        improved |= relocate_pair_pass(matrix, path, before)
+        if not improved:
+            break
+    return path
+
+
+def solve(matrix, nodes, before, start=None):
+    """Порядок посещения узлов матрицы.
+
+    before — {узел: узел, который должен быть раньше}. start — узел
+    начальной позиции курьера (в ответ не входит); без него маршрут
+    начинается с доступной точки, ближайшей в сумме к остальным.
+    """
+    if not nodes:
+        return []
+    if start is not None:
+        return improve(matrix, nearest_neighbour(matrix, start, nodes, before), before)[1:]
+
+    first = min(
+        (node for node in nodes if node not in before),
+        key=lambda node: (sum(matrix[node][other] for other in nodes), node),
+    )
+    path = nearest_neighbour(matrix, first, [node for node in nodes if node != first], before)
+    return improve(matrix, path, before)
+
+
+def courier_start(courier_id):
+    """Координаты последней выполненной доставки курьера"""
+    point = Order.objects.filter(
+        courier_id=courier_id,
+        status_id=refdata.statuses.pk_for(DELIVERED_STATUS_CODE),
+        delivery_address__latitude__isnull=False,
+    ).order_by(F('delivered_at').desc(nulls_last=True), '-id').values_list(
+        'delivery_address__latitude', 'delivery_address__longitude'
+    ).first()
+    return (float(point[0]), float(point[1])) if point else None
+
+
+def active_orders(courier_ids=None):
+    orders = Order.objects.filter(
+        courier__isnull=False,
+        status_id__in=[refdata.statuses.pk_for(code) for code in ACTIVE_STATUS_CODES],
+    ).select_related('client', 'delivery_address', 'pickup_address').order_by('courier_id', 'created_at', 'id')
+    if courier_ids is not None:
+        orders = orders.filter(courier_id__in=courier_ids)
+    return orders
+
+
+def build_route(courier_id, orders, start=None):
+    """Маршрут по заказам курьера"""
+    route = Route(courier_id, start)
+    picked_up_id = refdata.statuses.pk_for(PICKED_UP_STATUS_CODE)
+
+    placed, before = [], {}
+    for order in orders:
+        pickup = None
+        if order.pickup_address_id and order.status_id != picked_up_id:
+            pickup = Stop(order, PICKUP, order.pickup_address)
+        delivery = Stop(order, DELIVERY, order.delivery_address)
+
+        # Заказ без координат хотя бы одной точки целиком уходит в конец:
+        # иначе забор и доставка оказались бы в разных частях маршрута
+        stops = [stop for stop in (pickup, delivery) if stop is not None]
+        if any(stop.point is None for stop in stops):
+            route.unplaced.extend(stops)
+            continue
+        if pickup is not None:
+            placed.append(pickup)
+            before[len(placed)] = len(placed) - 1
+        placed.append(delivery)
+
+    # Узел 0 — начальная позиция курьера, если она известна
+    points = [stop.point for stop in placed]
+    offset = 1 if start is not None else 0
+    matrix = cached_matrix(([start] if start is not None else []) + points)
+    nodes = [index + offset for index in range(len(placed))]
+    before = {node + offset: required + offset for node, required in before.items()}
+
+    previous = 0 if start is not None else None
+    for node in solve(matrix, nodes, before, 0 if start is not None else None):
+        stop = placed[node - offset]
+        if previous is not None:
+            stop.distance_km = matrix[previous][node]
+            route.total_km += stop.distance_km
+        previous = node
+        route.stops.append(stop)
+    return route
+
+
+def plan_routes(courier_ids=None):
+    """Маршруты всех курьеров с активными заказами: {courier_id: Route}"""
+    by_courier = {}
+    for order in active_orders(courier_ids):
+        by_courier.setdefault(order.courier_id, []).append(order)
+    return {
+        courier_id: build_route(courier_id, orders, courier_start(courier_id))
+        for courier_id, orders in by_courier.items()
+    }
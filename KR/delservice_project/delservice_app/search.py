@@ -0,0 +1,110 @@
+"""
+Полнотекстовый поиск по справочникам.
+
+Все списки с поиском вызывают search_queryset(). Конкретный механизм
+выбирается по СУБД:
+
+* PostgreSQL — обычный ILIKE '%...%', который обслуживают GIN-индексы
+  pg_trgm по UPPER(column) (миграция 0003), ранжирование по similarity();
+* SQLite — виртуальные таблицы FTS5 с токенизатором trigram, которые
+  поддерживаются триггерами, ранжирование по bm25;
+* остальные СУБД — OR-цепочка icontains без индексов.
+
+Бэкенд можно переопределить настройкой SEARCH_BACKEND (путь к классу).
+"""
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Address, Client, Product, User
+
+# Поля, по которым ищут списки; для SQLite — столбцы таблиц <db_table>_fts
+SEARCH_FIELDS = {
+    Client: ('full_name', 'email', 'phone'),
+    Product: ('name', 'description'),
+    Address: ('street', 'house_number'),
+    User: ('full_name', 'login', 'phone'),
+}
+
+
+class IcontainsSearchBackend:
+    """Поиск без индексов: OR-цепочка icontains"""
+
+    def filter(self, queryset, term, fields):
+        return queryset.filter(reduce(or_, (Q(**{f'{field}__icontains': term}) for field in fields)))
+
+    def rank(self, queryset, term, fields):
+        return queryset
+
+
+class PostgresTrigramSearchBackend(IcontainsSearchBackend):
+    """PostgreSQL: ILIKE по триграммным GIN-индексам, ранжирование по similarity()"""
+
+    def rank(self, queryset, term, fields):
+        from django.contrib.postgres.search import TrigramSimilarity
+        from django.db.models.functions import Greatest
+
+        similarities = [TrigramSimilarity(field, term) for field in fields]
+        rank = similarities[0] if len(similarities) == 1 else Greatest(*similarities)
+        return queryset.annotate(search_rank=rank).order_by('-search_rank', *queryset.query.order_by)
+
+
+class SqliteFTS5SearchBackend(IcontainsSearchBackend):
+    """SQLite: FTS5 с токенизатором trigram — тот же поиск подстроки, но по индексу"""
+
+    # Токенизатор trigram не находит подстроки короче трёх символов
+    min_length = 3
+
+    def _match(self, term):
+        return '"{}"'.format(term.replace('"', '""'))
+
+    def filter(self, queryset, term, fields):
+        if len(term) < self.min_length:
+            return super().filter(queryset, term, fields)
+        fts_table = f'{queryset.model._meta.db_table}_fts'
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s', [self._match(term)]
+        ))
+
+    def rank(self, queryset, term, fields):
+        if len(term) < self.min_length:
+            return queryset
+        table = queryset.model._meta.db_table
+        fts_table = f'{table}_fts'
+        # bm25: чем меньше значение, тем выше релевантность
+        rank = RawSQL(
+            f'SELECT rank FROM {fts_table} WHERE {fts_table} MATCH %s AND rowid = {table}.id',
+            [self._match(term)],
+        )
+        return queryset.annotate(search_rank=rank).order_by('search_rank', *queryset.query.order_by)
+
+
+BACKENDS = {
+    'postgresql': PostgresTrigramSearchBackend,
+    'sqlite': SqliteFTS5SearchBackend,
+}
+
+
+def get_backend(using='default'):
+    path = getattr(settings, 'SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return BACKENDS.get(connections[using].vendor, IcontainsSearchBackend)()
+
+
+def search_queryset(queryset, term, rank=True):
+    """Фильтрация выборки по строке поиска с сортировкой по релевантности"""
+    term = (term or '').strip()
+    if not term:
+        return queryset
+    fields = SEARCH_FIELDS[queryset.model]
+    backend = get_backend(queryset.db)
+    queryset = backend.filter(queryset, term, fields)
+    if rank:
+        queryset = backend.rank(queryset, term, fields)
+    return queryset
@@ -0,0 +1,191 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import counters, events, list_rows, refdata, rollups, transitions, versions
+from .models import (
+    Address, Client, Order, OrderEvent, OrderItem, OrderStatus, Payment, PaymentMethod, Product, Role, User,
+)
+
+
+# ==================== СЧЁТЧИКИ ПАНЕЛИ УПРАВЛЕНИЯ ====================
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    """Запоминаем исходный статус, чтобы при сохранении знать, изменился ли он"""
+    # __dict__, а не атрибут: при only()/defer() не должно быть лишнего запроса
+    instance._loaded_status_id = instance.__dict__.get('status_id')
+
+
+@receiver(post_save, sender=Order)
+def record_order_status(sender, instance, created, raw=False, **kwargs):
+    """История статусов для заказов, сохранённых через save(), а не transitions"""
+    if raw:
+        return
+    if created:
+        transitions.record_created([instance])
+    elif instance._loaded_status_id != instance.status_id:
+        transitions.record_saved_change(instance, instance._loaded_status_id)
+
+
+@receiver(post_save, sender=Order)
+def count_order_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    pending_id = counters.pending_status_id()
+    deltas = {}
+    if created:
+        deltas[counters.ORDERS_TOTAL] = 1
+        deltas[counters.order_day_key(instance.created_at)] = 1
+        deltas[counters.ORDERS_PENDING] = int(instance.status_id == pending_id)
+    elif instance._loaded_status_id != instance.status_id:
+        deltas[counters.ORDERS_PENDING] = (
+            int(instance.status_id == pending_id) - int(instance._loaded_status_id == pending_id)
+        )
+    instance._loaded_status_id = instance.status_id
+    counters.increment(deltas)
+
+
+@receiver(post_delete, sender=Order)
+def count_order_delete(sender, instance, **kwargs):
+    counters.increment({
+        counters.ORDERS_TOTAL: -1,
+        counters.order_day_key(instance.created_at): -1,
+        counters.ORDERS_PENDING: -int(instance._loaded_status_id == counters.pending_status_id()),
+    })
+
+
+@receiver(post_init, sender=User)
+def remember_user_state(sender, instance, **kwargs):
+    instance._loaded_courier_state = (instance.__dict__.get('role_id'), instance.__dict__.get('status'))
+
+
+@receiver(post_save, sender=User)
+def count_user_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    state = (instance.role_id, instance.status)
+    was_active = not created and counters.is_active_courier(*instance._loaded_courier_state)
+    if created or state != instance._loaded_courier_state:
+        counters.increment({
+            counters.COURIERS_ACTIVE: int(counters.is_active_courier(*state)) - int(was_active),
+        })
+    instance._loaded_courier_state = state
+
+
+@receiver(post_delete, sender=User)
+def count_user_delete(sender, instance, **kwargs):
+    if counters.is_active_courier(*instance._loaded_courier_state):
+        counters.increment({counters.COURIERS_ACTIVE: -1})
+
+
+# ==================== ДНЕВНЫЕ АГРЕГАТЫ ====================
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def mark_order_day_dirty(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rollups.mark_dirty([instance.created_at])
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def mark_payment_day_dirty(sender, instance, raw=False, **kwargs):
+    if not raw:
+        rollups.mark_dirty([instance.paid_at])
+
+
+# ==================== СПРАВОЧНИКИ ====================
+
+@receiver(post_save, sender=OrderStatus)
+@receiver(post_delete, sender=OrderStatus)
+@receiver(post_save, sender=PaymentMethod)
+@receiver(post_delete, sender=PaymentMethod)
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def invalidate_refdata(sender, **kwargs):
+    refdata.table_for(sender).invalidate()
+
+
+# ==================== ВЕРСИИ ДАННЫХ ДЛЯ КЭША СТРАНИЦ ====================
+# Справочники увеличивают версию сами (RefTable.invalidate)
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Address)
+@receiver(post_delete, sender=Address)
+def bump_data_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.bump_on_commit(sender._meta.db_table)
+
+
+# ==================== ЖУРНАЛ СОБЫТИЙ ====================
+# Событие пишется сразу после изменения — в его транзакции, если она открыта
+
+@receiver(post_init, sender=Order)
+@receiver(post_init, sender=OrderItem)
+def remember_event_snapshot(sender, instance, **kwargs):
+    instance._event_snapshot = events.snapshot(instance)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=OrderItem)
+def record_save_event(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = events.snapshot(instance)
+    if created:
+        events.record(instance, OrderEvent.CREATED, current)
+    else:
+        changes = events.diff(instance._event_snapshot, current)
+        if changes:
+            events.record(instance, OrderEvent.UPDATED, changes)
+    instance._event_snapshot = current
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=OrderItem)
+def record_delete_event(sender, instance, **kwargs):
+    events.record(instance, OrderEvent.DELETED)
+
+
+# ==================== СПИСОК ЗАКАЗОВ (order_list_view) ====================
+# Строка заказа удаляется вместе с ним (CASCADE)
+
+@receiver(post_save, sender=Order)
+def refresh_order_list_row(sender, instance, raw=False, **kwargs):
+    if not raw:
+        list_rows.refresh([instance.pk])
+
+
+@receiver(post_save, sender=OrderItem)
+def count_list_row_item(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        list_rows.add_items(instance.order_id, 1)
+
+
+@receiver(post_delete, sender=OrderItem)
+def uncount_list_row_item(sender, instance, **kwargs):
+    list_rows.add_items(instance.order_id, -1)
+
+
+@receiver(post_save, sender=Client)
+def update_list_rows_client(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        list_rows.client_changed(instance)
+
+
+@receiver(post_save, sender=Address)
+def update_list_rows_address(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        list_rows.address_changed(instance)
+
+
+@receiver(post_save, sender=User)
+def update_list_rows_courier(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        list_rows.courier_changed(instance)
+
+
+@receiver(post_delete, sender=User)
+def clear_list_rows_courier(sender, instance, **kwargs):
+    list_rows.courier_deleted(instance.pk)
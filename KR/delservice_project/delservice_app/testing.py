@@ -0,0 +1,38 @@
+"""
+Помощники для тестов: бюджет SQL-запросов на представление.
+
+    from delservice_app.testing import assert_max_queries
+
+    with assert_max_queries(5):
+        client.get(reverse('delservice_app:order_detail', args=[order.pk]))
+
+    assert_view_queries(client, 'delservice_app:order_list', budget=6)
+"""
+from contextlib import contextmanager
+
+from django.urls import reverse
+
+from .profiling import QueryProfile
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_max_queries(budget, using='default', label='блок'):
+    """Проверка, что внутри блока выполнено не больше budget запросов"""
+    with QueryProfile(using=using) as profile:
+        yield profile
+    if profile.count > budget:
+        raise QueryBudgetExceeded(
+            f'Превышен бюджет запросов ({profile.count} > {budget})\n{profile.report(label)}'
+        )
+
+
+def assert_view_queries(client, view_name, budget, args=None, kwargs=None, method='get', data=None):
+    """GET/POST к представлению по имени маршрута с проверкой бюджета запросов"""
+    url = reverse(view_name, args=args, kwargs=kwargs)
+    with assert_max_queries(budget, label=view_name):
+        response = getattr(client, method)(url, data)
+    return response
@@ -0,0 +1,73 @@
+"""
+Общие данные тестов: справочники, курьер, клиент, адреса и товар.
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import caches
+from django.test import TestCase
+
+from .. import counters, refdata, totals
+from ..models import Address, Client, Order, OrderListRow, OrderStatus, PaymentMethod, Product, Role, User
+
+STATUSES = [
+    ('created', 'Создан'), ('confirmed', 'Подтверждён'), ('assigned', 'Назначен'),
+    ('dispatched', 'В пути'), ('delivered', 'Доставлен'), ('cancelled', 'Отменён'),
+]
+
+
+def create_reference_data():
+    for sort_order, (code, name) in enumerate(STATUSES, start=1):
+        OrderStatus.objects.create(code=code, name=name, sort_order=sort_order)
+    PaymentMethod.objects.create(code='cash', name='Наличные')
+    PaymentMethod.objects.create(code='card', name='Карта')
+    Role.objects.create(name=counters.COURIER_ROLE_NAME)
+
+
+def reset_caches(test_case):
+    """Версии данных и справочники заново: в TestCase on_commit не выполняется"""
+    caches['default'].clear()
+    with test_case.captureOnCommitCallbacks(execute=True):
+        for table in refdata.TABLES.values():
+            table.invalidate()
+
+
+class DelserviceTestCase(TestCase):
+    """Справочники, курьер, клиент, адреса и товары; вход под администратором"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_reference_data()
+        # Справочники прошлого класса в кэше процесса: на PostgreSQL их ключи не совпадут
+        reset_caches(cls)
+        cls.admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        cls.courier = User.objects.create(
+            role=Role.objects.get(name=counters.COURIER_ROLE_NAME), login='courier', password_hash='x',
+            full_name='Курьер Петров', phone='+7 900 000', hire_date=date(2024, 1, 1),
+        )
+        cls.customer = Client.objects.create(email='ivanov@example.com', phone='+7 999 001', full_name='Иванов')
+        cls.address = Address.objects.create(street='Ленина', house_number='1')
+        cls.pickup = Address.objects.create(street='Мира', house_number='2')
+        cls.product = Product.objects.create(name='Пицца', price=Decimal('450.00'), weight_kg=Decimal('1.00'))
+
+    def setUp(self):
+        reset_caches(self)
+        self.client.force_login(self.admin)
+
+    def make_order(self, status='created', courier=None, created_at=None, items=0):
+        order = Order.objects.create(
+            client=self.customer, delivery_address=self.address, pickup_address=self.pickup, courier=courier,
+            status=OrderStatus.objects.get(code=status), payment_method=PaymentMethod.objects.get(code='cash'),
+            delivery_cost=Decimal('150.00'),
+        )
+        if created_at:
+            Order.objects.filter(pk=order.pk).update(created_at=created_at)
+            OrderListRow.objects.filter(order_id=order.pk).update(created_at=created_at)
+            order.refresh_from_db()
+        for _ in range(items):
+            totals.add_item(order, self.product, 1)
+        return order
+
+    def status_code(self, order):
+        return refdata.statuses.get(Order.objects.get(pk=order.pk).status_id).code
@@ -0,0 +1,63 @@
+import random
+import statistics
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from .. import analytics
+from ..dates import day_start
+from ..models import DailyLatencyStat, Order
+from .base import DelserviceTestCase
+
+
+class PercentileTests(SimpleTestCase):
+
+    def reference(self, values):
+        # Линейная интерполяция, как у percentile_cont и numpy.percentile
+        cuts = statistics.quantiles(values, n=100, method='inclusive')
+        return cuts[49], cuts[89], cuts[98]
+
+    def test_python_fallback_matches_linear_interpolation(self):
+        rng = random.Random(20)
+        with mock.patch.object(analytics, 'np', None):
+            for size in (2, 3, 10, 101, 1000):
+                values = [rng.expovariate(1 / 600) for _ in range(size)]
+                for actual, expected in zip(analytics.percentiles(values), self.reference(values)):
+                    self.assertAlmostEqual(actual, expected, places=6)
+            self.assertEqual(analytics.percentiles([42.0]), (42.0, 42.0, 42.0))
+            self.assertEqual(analytics.percentiles([]), (None, None, None))
+
+
+class LatencyTests(DelserviceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        yesterday = day_start(analytics.last_finished_day()) + timedelta(hours=12)
+        for minutes in (10, 20, 30, 40):
+            order = self.make_order(courier=self.courier)
+            Order.objects.filter(pk=order.pk).update(
+                created_at=yesterday - timedelta(minutes=minutes), confirmed_at=yesterday,
+            )
+        # Этап, закончившийся сегодня, в отчёт не входит
+        order = self.make_order()
+        Order.objects.filter(pk=order.pk).update(confirmed_at=timezone.now() + timedelta(minutes=1))
+
+    def test_window_percentiles(self):
+        stats = analytics.window_stats(days=7)
+        confirm = stats['totals'][0]
+        self.assertEqual(confirm['samples'], 4)
+        self.assertAlmostEqual(confirm['p50'], 25.0)
+        self.assertAlmostEqual(confirm['p90'], 37.0)
+        self.assertEqual([row['full_name'] for row in stats['couriers']], ['Курьер Петров'])
+
+    def test_finished_days_are_computed_once(self):
+        self.assertEqual(analytics.refresh(days=7), 7)
+        self.assertEqual(analytics.refresh(days=7), 0)
+        row = DailyLatencyStat.objects.get(day=analytics.last_finished_day(), stage='confirm', courier=None)
+        self.assertEqual(row.samples, 4)
+        self.assertAlmostEqual(row.p99, 39.7 * 60)
+
+        [day] = analytics.daily_stats(days=7)
+        self.assertEqual(day['day'], analytics.last_finished_day())
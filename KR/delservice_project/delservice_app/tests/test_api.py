@@ -0,0 +1,62 @@
+import json
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Order
+from .base import DelserviceTestCase
+
+
+class ApiTests(DelserviceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('delservice_app:api_collection', args=['orders'])
+
+    def test_sparse_fields_select_only_their_columns(self):
+        order = self.make_order(items=2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,status,order_total'})
+        self.assertEqual(response.json()['data'], [{'id': order.pk, 'status': 'created', 'order_total': '900.00'}])
+        [select] = [query['sql'] for query in queries if 'FROM "orders"' in query['sql']]
+        self.assertIn('"order_total"', select)
+        self.assertNotIn('"comment"', select)
+        self.assertNotIn('"delivery_cost"', select)
+
+        response = self.client.get(self.url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_includes_are_batched(self):
+        for _ in range(5):
+            self.make_order(items=2)
+        params = {'fields': 'id', 'include': 'items,client', 'fields[items]': 'quantity', 'fields[client]': 'email'}
+        # Сессия, пользователь, заказы и по одному запросу на связь
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url, params)
+        data = response.json()['data']
+        self.assertEqual(len(data), 5)
+        self.assertEqual(data[0]['items'], [{'quantity': 1}, {'quantity': 1}])
+        self.assertEqual(data[0]['client'], {'email': 'ivanov@example.com'})
+
+    def test_batched_ids_and_cursor(self):
+        orders = [self.make_order() for _ in range(3)]
+        response = self.client.get(self.url, {'ids': f'{orders[0].pk},100500', 'fields': 'id'})
+        self.assertEqual(response.json(), {'data': [{'id': orders[0].pk}], 'missing': [100500]})
+
+        first = self.client.get(self.url, {'fields': 'id', 'limit': 2}).json()
+        rest = self.client.get(self.url, {'fields': 'id', 'limit': 2, 'cursor': first['next_cursor']}).json()
+        ids = [row['id'] for row in first['data'] + rest['data']]
+        self.assertEqual(ids, list(Order.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)))
+        self.assertIsNone(rest['next_cursor'])
+
+    def test_write_and_auth(self):
+        order = self.make_order()
+        detail = reverse('delservice_app:api_detail', args=['orders', order.pk])
+        response = self.client.patch(detail, json.dumps({'status': 'confirmed'}), content_type='application/json')
+        self.assertEqual(response.json()['data']['status'], 'confirmed')
+        response = self.client.patch(detail, json.dumps({'status': 'delivered'}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
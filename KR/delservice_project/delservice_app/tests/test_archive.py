@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive, counters
+from ..models import ArchivedOrder, ArchivedOrderItem, Order, OrderEvent, OrderListRow
+from .base import DelserviceTestCase
+
+
+class ArchiveTests(DelserviceTestCase):
+
+    def test_old_delivered_orders_move_to_archive(self):
+        old = timezone.now() - timedelta(days=400)
+        archived = self.make_order(status='delivered', courier=self.courier, created_at=old, items=2)
+        old_cancelled = self.make_order(status='cancelled', created_at=old)
+        recent = self.make_order(status='delivered')
+        counters.reconcile()
+
+        self.assertEqual(archive.archive(archive.cutoff(months=6)), 1)
+
+        self.assertFalse(Order.objects.filter(pk=archived.pk).exists())
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {old_cancelled.pk, recent.pk})
+        row = ArchivedOrder.objects.get(pk=archived.pk)
+        self.assertEqual((row.client_name, row.courier_name, row.item_count), ('Иванов', 'Курьер Петров', 2))
+        self.assertEqual(ArchivedOrderItem.objects.filter(order_id=archived.pk).count(), 2)
+        self.assertFalse(OrderListRow.objects.filter(order_id=archived.pk).exists())
+        self.assertEqual(counters.get_many([counters.ORDERS_TOTAL]), {counters.ORDERS_TOTAL: 2})
+        self.assertTrue(OrderEvent.objects.filter(order_id=archived.pk, action=OrderEvent.ARCHIVED).exists())
+
+    def test_archive_is_read_only_on_request(self):
+        archived = self.make_order(status='delivered', created_at=timezone.now() - timedelta(days=400))
+        archive.archive(archive.cutoff(months=6))
+
+        response = self.client.get(reverse('delservice_app:order_list'))
+        self.assertNotIn(archived.pk, [order.pk for order in response.context['page_obj'].object_list])
+        response = self.client.get(reverse('delservice_app:order_list'), {'archive': '1'})
+        self.assertIn(archived.pk, [order.pk for order in response.context['page_obj'].object_list])
+
+        response = self.client.get(reverse('delservice_app:reports'), {'archive': '1'})
+        delivered = next(status for status in response.context['status_stats'] if status.code == 'delivered')
+        self.assertEqual(delivered.order_count, 1)
+
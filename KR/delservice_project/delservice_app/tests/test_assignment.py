@@ -0,0 +1,62 @@
+import random
+from datetime import date
+from decimal import Decimal
+
+from .. import assignment, geo
+from ..models import Address, Order, User
+from .base import DelserviceTestCase
+
+
+class GridIndexTests(DelserviceTestCase):
+
+    def test_nearest_matches_brute_force(self):
+        rng = random.Random(16)
+        lats = [55.5 + rng.random() * 0.5 for _ in range(300)]
+        lons = [37.3 + rng.random() * 0.7 for _ in range(300)]
+        index = geo.GridIndex(lats, lons, cell_km=2.0)
+
+        for _ in range(100):
+            lat, lon = 55.4 + rng.random() * 0.7, 37.2 + rng.random() * 0.9
+            accept = (lambda i: i % 3 == 0) if rng.random() < 0.5 else None
+            candidates = [i for i in range(len(lats)) if accept is None or accept(i)]
+            expected = min(candidates, key=lambda i: geo.haversine_km(lat, lon, lats[i], lons[i]))
+            position, km = index.nearest(lat, lon, accept=accept)
+            self.assertEqual(position, expected)
+            self.assertAlmostEqual(km, geo.haversine_km(lat, lon, lats[expected], lons[expected]))
+
+    def test_nothing_acceptable(self):
+        index = geo.GridIndex([55.75], [37.6])
+        self.assertEqual(index.nearest(55.7, 37.5, accept=lambda i: False), (None, None))
+        self.assertEqual(geo.GridIndex([], []).nearest(55.7, 37.5), (None, None))
+
+
+class AssignmentTests(DelserviceTestCase):
+
+    def place(self, lat, lon):
+        return Address.objects.create(street='Точка', house_number=f'{lat},{lon}',
+                                      latitude=Decimal(str(lat)), longitude=Decimal(str(lon)))
+
+    def order_at(self, address, status='confirmed', courier=None):
+        order = self.make_order(status=status, courier=courier)
+        Order.objects.filter(pk=order.pk).update(pickup_address=address, delivery_address=address)
+        return order
+
+    def test_orders_go_to_nearest_courier_with_free_slots(self):
+        north = User.objects.create(role=self.courier.role, login='north', password_hash='x',
+                                    full_name='Курьер Север', phone='+7 900 002', hire_date=date(2024, 1, 1))
+        # Положение курьера — адрес его последнего заказа
+        self.order_at(self.place(55.75, 37.60), status='delivered', courier=self.courier)
+        self.order_at(self.place(55.90, 37.60), status='delivered', courier=north)
+
+        # Заказы обрабатываются по очереди создания
+        near_south = self.order_at(self.place(55.76, 37.59))
+        near_north = [self.order_at(self.place(55.89, 37.61)) for _ in range(2)]
+        no_location = self.make_order(status='confirmed')
+        Order.objects.filter(pk=no_location.pk).update(pickup_address=None)
+
+        result = assignment.assign_pending(capacity=1)
+        assigned = dict(Order.objects.filter(courier__isnull=False, status__code='assigned')
+                        .values_list('pk', 'courier_id'))
+        self.assertEqual(assigned, {near_north[0].pk: north.pk, near_south.pk: self.courier.pk})
+        self.assertEqual(result.no_courier, [near_north[1].pk])
+        self.assertEqual(result.no_location, [no_location.pk])
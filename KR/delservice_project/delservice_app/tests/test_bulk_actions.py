@@ -0,0 +1,56 @@
+import json
+
+from django.urls import reverse
+
+from .. import bulk_actions, counters
+from ..models import Order, OrderEvent, OrderListRow
+from .base import DelserviceTestCase
+
+
+class BulkActionTests(DelserviceTestCase):
+
+    def test_change_status_reports_each_order(self):
+        order = self.make_order()
+        delivered = self.make_order(status='delivered')
+        result = bulk_actions.apply(bulk_actions.CHANGE_STATUS, [order.pk, delivered.pk, 10 ** 6], status='confirmed')
+        self.assertEqual(result.succeeded, [order.pk])
+        self.assertEqual(set(result.failed), {delivered.pk, 10 ** 6})
+        self.assertEqual(result.failed[10 ** 6], bulk_actions.NOT_FOUND)
+        self.assertEqual(self.status_code(order), 'confirmed')
+
+    def test_assign_courier(self):
+        confirmed = self.make_order(status='confirmed')
+        created = self.make_order()
+        result = bulk_actions.apply(bulk_actions.ASSIGN_COURIER, [confirmed.pk, created.pk], courier=self.courier)
+        self.assertEqual(result.succeeded, [confirmed.pk])
+        confirmed.refresh_from_db()
+        self.assertEqual(confirmed.courier_id, self.courier.pk)
+        self.assertEqual(self.status_code(confirmed), 'assigned')
+        self.assertEqual(OrderListRow.objects.get(order_id=confirmed.pk).courier_name, self.courier.full_name)
+
+    def test_delete_orders_updates_counters(self):
+        orders = [self.make_order(items=2) for _ in range(3)]
+        counters.reconcile()
+        result = bulk_actions.apply(bulk_actions.DELETE, [order.pk for order in orders[:2]])
+        self.assertEqual(len(result.succeeded), 2)
+        self.assertEqual(list(Order.objects.values_list('pk', flat=True)), [orders[2].pk])
+        self.assertEqual(OrderListRow.objects.count(), 1)
+        self.assertEqual(counters.get_many([counters.ORDERS_TOTAL]), {counters.ORDERS_TOTAL: 1})
+        self.assertEqual(counters.compute(), counters.get_many(list(counters.compute())))
+        self.assertEqual(OrderEvent.objects.filter(entity=OrderEvent.ORDER, action=OrderEvent.DELETED).count(), 2)
+
+    def test_view_answers_json_unless_html_was_asked(self):
+        order = self.make_order()
+        url = reverse('delservice_app:order_bulk_action')
+        data = {'action': bulk_actions.CHANGE_STATUS, 'status': 'confirmed', 'ids': [order.pk]}
+
+        response = self.client.post(url, data, HTTP_ACCEPT='*/*')
+        self.assertEqual(response.json()['succeeded'], 1)
+        response = self.client.post(
+            url, json.dumps({**data, 'status': 'cancelled'}), content_type='application/json',
+        )
+        self.assertEqual(response.json()['succeeded'], 1)
+        response = self.client.post(url, data, HTTP_ACCEPT='text/html,application/xhtml+xml,*/*;q=0.8')
+        self.assertEqual(response.status_code, 302)
+        response = self.client.post(url, data, HTTP_HX_REQUEST='true')
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .. import archive, bulk_actions, counters, transitions
+from ..models import DashboardCounter
+from .base import DelserviceTestCase
+
+
+class CounterTests(DelserviceTestCase):
+
+    def drop_order_counters(self):
+        DashboardCounter.objects.exclude(key=counters.COURIERS_ACTIVE).delete()
+
+    def assertCountersExact(self):
+        values = counters.compute(days=1)
+        self.assertEqual(counters.get_many(list(values)), values)
+
+    def test_first_save_on_existing_data_counts_everything(self):
+        for _ in range(6):
+            self.make_order()
+        counters.reconcile()
+        # Счётчики заказов ещё не заведены (например, сразу после миграции)
+        self.drop_order_counters()
+
+        self.make_order()
+        self.assertEqual(counters.dashboard_counts(), {
+            'total_orders': 7, 'pending_orders': 7, 'active_couriers': 1, 'today_orders': 7,
+        })
+        self.assertCountersExact()
+
+    def test_counters_follow_saves_and_transitions(self):
+        orders = [self.make_order() for _ in range(3)]
+        transitions.transition(orders[0], 'confirmed')
+        orders[1].delete()
+        self.courier.status = 'fired'
+        self.courier.save()
+        self.assertCountersExact()
+        self.assertEqual(counters.get_many([counters.ORDERS_PENDING]), {counters.ORDERS_PENDING: 1})
+
+    def test_bulk_delete_deltas(self):
+        orders = [self.make_order() for _ in range(4)]
+        transitions.transition(orders[0], 'confirmed')
+        bulk_actions.delete_orders([order.pk for order in orders[:3]])
+        self.assertCountersExact()
+
+        # Без строк счётчиков отрицательное приращение не уводит значение в минус
+        self.drop_order_counters()
+        bulk_actions.delete_orders([orders[3].pk])
+        self.assertEqual(counters.dashboard_counts()['total_orders'], 0)
+        self.assertCountersExact()
+
+    def test_archive_deltas(self):
+        old = timezone.now() - timedelta(days=400)
+        for _ in range(2):
+            self.make_order(status='delivered', created_at=old)
+        self.make_order(created_at=timezone.now() - timedelta(days=1))
+        self.make_order()
+        counters.reconcile(days=2)
+
+        self.assertEqual(archive.archive(archive.cutoff(months=6)), 2)
+        values = counters.compute(days=2)
+        self.assertEqual(counters.get_many(list(values)), values)
+        self.assertEqual(values[counters.ORDERS_TOTAL], 2)
@@ -0,0 +1,34 @@
+from .. import counters, events
+from ..models import DashboardCounter, OrderEvent, SystemCounter
+from .base import DelserviceTestCase
+
+
+class EventFeedTests(DelserviceTestCase):
+
+    def test_late_committed_event_is_not_skipped(self):
+        events.sequence()
+        start = events.last_offset()
+        first = OrderEvent.objects.create(id=10 ** 9 + 5, entity=OrderEvent.ORDER, entity_id=1, order_id=1,
+                                          action=OrderEvent.UPDATED)
+        page, offset = events.read(start)
+        self.assertEqual([event.pk for event in page], [first.pk])
+
+        # Событие долгой транзакции: меньший id, видно позже
+        late = OrderEvent.objects.create(id=10 ** 9, entity=OrderEvent.ORDER, entity_id=1, order_id=1,
+                                         action=OrderEvent.UPDATED)
+        page, next_offset = events.read(offset)
+        self.assertEqual([event.pk for event in page], [late.pk])
+        self.assertGreater(next_offset, offset)
+
+    def test_position_is_kept_outside_dashboard_counters(self):
+        self.make_order()
+        self.assertEqual(events.sequence(), 1)
+        position = SystemCounter.objects.get(key=events.POSITION_KEY).value
+        self.assertEqual(position, events.last_offset())
+
+        counters.reconcile()
+        self.assertFalse(DashboardCounter.objects.filter(key=events.POSITION_KEY).exists())
+        self.make_order()
+        page, offset = events.read(position)
+        self.assertEqual(len(page), 1)
+        self.assertEqual(offset, position + 1)
@@ -0,0 +1,36 @@
+import csv
+import io
+
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+
+from .. import exports
+from .base import DelserviceTestCase
+
+
+class ExportTests(DelserviceTestCase):
+
+    def test_csv_is_streamed_with_filters(self):
+        created = [self.make_order(courier=self.courier, items=1) for _ in range(2)]
+        self.make_order(status='delivered')
+
+        response = self.client.get(reverse('delservice_app:order_export'), {'status': 'created'})
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(content)))
+
+        self.assertEqual(rows[0], exports.ORDER_COLUMNS)
+        self.assertEqual([int(row[0]) for row in rows[1:]], [order.pk for order in reversed(created)])
+        self.assertEqual(rows[1][4], 'Курьер Петров')
+        self.assertEqual(rows[1][8], '450.00')
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        order = self.make_order()
+        response = self.client.get(reverse('delservice_app:order_export'), {'format': 'xlsx'})
+        workbook = load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        response.close()
+        rows = list(workbook['Заказы'].values)
+        self.assertEqual(list(rows[0]), exports.ORDER_COLUMNS)
+        self.assertEqual(rows[1][0], order.pk)
@@ -0,0 +1,67 @@
+import os
+import tempfile
+from decimal import Decimal
+
+from .. import geocoding
+from ..models import Address, GeocodeCache
+from .base import DelserviceTestCase
+
+
+class CountingGazetteer(geocoding.GazetteerProvider):
+    """Справочник, который запоминает, какие ключи у него спрашивали"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.asked = []
+
+    def geocode_many(self, queries):
+        self.asked.append(sorted(queries))
+        return super().geocode_many(queries)
+
+
+class GeocodingTests(DelserviceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        gazetteer = tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False)
+        with gazetteer:
+            gazetteer.write('street,house_number,latitude,longitude\n'
+                            'ул. Ленина,1,55.7558,37.6173\n'
+                            'проспект Мира,2 корпус 1,55.7801,37.6336\n')
+        self.addCleanup(os.unlink, gazetteer.name)
+        self.provider = CountingGazetteer(gazetteer.name)
+
+    def test_normalized_keys(self):
+        self.assertEqual(geocoding.normalize('Королева ул.', '1'), geocoding.normalize('улица  Королёва', ' 1 '))
+        self.assertEqual(geocoding.normalize('Мира пр-т', '2к1'), geocoding.normalize('проспект Мира', '2 корпус 1'))
+        self.assertNotEqual(geocoding.normalize('Мира пер.', '2'), geocoding.normalize('Мира пр-т', '2'))
+
+    def test_cache_hit_skips_provider(self):
+        point = geocoding.geocode('Ленина', '1', self.provider)
+        self.assertEqual(point, (Decimal('55.7558000'), Decimal('37.6173000')))
+        self.assertIsNone(geocoding.geocode('Садовая', '5', self.provider))
+        self.assertEqual(len(self.provider.asked), 2)
+
+        # Найденный и ненайденный адреса — из кэша
+        self.assertEqual(geocoding.geocode('ул Ленина', '1', self.provider), point)
+        self.assertIsNone(geocoding.geocode('Садовая', '5', self.provider))
+        self.assertEqual(len(self.provider.asked), 2)
+        self.assertEqual(GeocodeCache.objects.count(), 2)
+
+        key = geocoding.normalize('Садовая', '5')
+        geocoding.lookup_many({key: ('Садовая', '5')}, self.provider, retry_missing=True)
+        self.assertEqual(self.provider.asked[-1], [key])
+
+    def test_backfill_asks_each_address_once(self):
+        for street in ('Ленина', 'ул. Ленина', 'Ленина улица'):
+            Address.objects.create(street=street, house_number='1')
+        Address.objects.create(street='Мира просп.', house_number='2 к 1')
+
+        result = geocoding.backfill(provider=self.provider)
+        # В базе уже были «Ленина 1» и «Мира 2» (без корпуса) из общих данных тестов
+        self.assertEqual((result.addresses, result.unique, result.updated, result.not_found), (6, 3, 5, 1))
+        self.assertEqual(len(self.provider.asked), 1)
+        self.assertFalse(Address.objects.filter(street__contains='Ленина', latitude__isnull=True).exists())
+
+        self.assertEqual(geocoding.backfill(provider=self.provider).updated, 0)
+        self.assertEqual(len(self.provider.asked), 1)
@@ -0,0 +1,80 @@
+import io
+import json
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from .. import counters, importer
+from ..models import Order, OrderListRow
+from .base import DelserviceTestCase
+
+
+class ImporterTests(DelserviceTestCase):
+
+    def record(self, ref, **fields):
+        return {
+            'ref': ref,
+            'client': {'email': 'new@example.com', 'full_name': 'Новый клиент', 'phone': '+7 999 100'},
+            'delivery_address': {'street': 'Ленина', 'house_number': '1'},
+            'pickup_address': {'street': 'Садовая', 'house_number': '5'},
+            'status': 'created', 'payment_method': 'cash', 'delivery_cost': '200.00',
+            'items': [{'product_id': self.product.pk, 'quantity': 2}],
+            **fields,
+        }
+
+    def test_import_creates_orders_and_reuses_references(self):
+        records = [
+            self.record('A-1'),
+            # Тот же клиент, что и в базе, но email в другом регистре
+            self.record('A-2', client={'email': 'IVANOV@example.com', 'full_name': 'Иванов', 'phone': '+7 999 001'}),
+        ]
+        counters.reconcile()
+        result = importer.OrderImporter().run(records)
+
+        self.assertEqual(result.rejected, [])
+        self.assertEqual((result.orders_created, result.items_created), (2, 2))
+        self.assertEqual((result.clients_created, result.addresses_created), (1, 1))
+        self.assertEqual(Order.objects.filter(client=self.customer).count(), 1)
+        self.assertEqual(set(Order.objects.values_list('order_total', flat=True)), {Decimal('900.00')})
+        self.assertEqual(OrderListRow.objects.count(), 2)
+        self.assertEqual(counters.get_many([counters.ORDERS_TOTAL]), {counters.ORDERS_TOTAL: 2})
+
+    def test_invalid_records_are_rejected_without_stopping_import(self):
+        records = [
+            self.record('ok'),
+            self.record('status', status='lost'),
+            self.record('cost', delivery_cost='NaN'),
+            self.record('items', items={'product_id': self.product.pk}),
+            self.record('product', items=[{'product_id': 10 ** 6}]),
+            self.record('email', client={'email': ''}),
+        ]
+        result = importer.OrderImporter().run(records)
+        self.assertEqual(result.orders_created, 1)
+        self.assertEqual([ref for ref, _ in result.rejected], ['status', 'cost', 'items', 'product', 'email'])
+
+    def test_csv_lines_are_grouped_by_order_ref(self):
+        header = ('order_ref,client_email,client_name,client_phone,delivery_street,delivery_house,'
+                  'pickup_street,pickup_house,status,payment_method,delivery_cost,comment,product_id,quantity\n')
+        line = 'B-1,ivanov@example.com,Иванов,+7 999 001,Ленина,1,,,created,card,100,,{},{}\n'
+        data = header + line.format(self.product.pk, 1) + line.format(self.product.pk, 3)
+        records = importer.load_records(io.BytesIO(data.encode()), name='orders.csv')
+        self.assertEqual(len(records), 1)
+        self.assertEqual(len(records[0]['items']), 2)
+
+        result = importer.OrderImporter().run(records)
+        self.assertEqual((result.orders_created, result.items_created), (1, 2))
+        self.assertEqual(Order.objects.get().order_total, Decimal('1800.00'))
+
+    def test_upload_view(self):
+        records = [self.record('C-1'), self.record('C-2', status='lost')]
+        upload = SimpleUploadedFile('orders.json', json.dumps(records).encode())
+        response = self.client.post(reverse('delservice_app:order_import'), {'file': upload, 'format': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['result'].orders_created, 1)
+        self.assertEqual(Order.objects.count(), 1)
+
+        broken = SimpleUploadedFile('orders.json', b'{not json')
+        response = self.client.post(reverse('delservice_app:order_import'), {'file': broken, 'format': ''})
+        self.assertIsNone(response.context['result'])
+        self.assertFalse(Order.objects.exclude(pk=Order.objects.get().pk).exists())
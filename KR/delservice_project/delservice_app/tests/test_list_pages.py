@@ -0,0 +1,55 @@
+import re
+from datetime import date
+from decimal import Decimal
+
+from django.urls import reverse
+
+from ..models import Client, Product, User
+from .base import DelserviceTestCase
+
+
+class ListPaginationTests(DelserviceTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(4):
+            Client.objects.create(email=f'client{number}@example.com', phone=f'+7 999 10{number}',
+                                  full_name=f'Клиент {number}')
+        # По две записи в каждом списке — при per_page=1 у всех есть вторая страница
+        User.objects.create(role=cls.courier.role, login='second', password_hash='x', full_name='Курьер Сидоров',
+                            phone='+7 900 001', hire_date=date(2024, 1, 1))
+        Product.objects.create(name='Суп', price=Decimal('300.00'), weight_kg=Decimal('0.50'))
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('delservice_app:client_list')
+
+    def test_page_has_navigation_outside_title(self):
+        response = self.client.get(self.url, {'per_page': 2})
+        self.assertEqual(len(response.context['clients']), 2)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 3)
+
+        content = response.content.decode()
+        title = re.search(r'<title>(.*?)</title>', content, re.S).group(1)
+        self.assertNotIn('<', title)
+        self.assertIn('class="list-pagination', content)
+        self.assertIn('class="list-more"', content)
+
+    def test_htmx_gets_only_next_rows(self):
+        first = self.client.get(self.url, {'per_page': 2})
+        response = self.client.get(self.url, {'per_page': 2, 'page': 3}, HTTP_HX_REQUEST='true')
+        content = response.content.decode()
+        self.assertNotIn('<title>', content)
+        self.assertNotIn('list-more', content)
+        self.assertEqual(len(response.context['clients']), 1)
+        seen = {client.pk for client in first.context['clients']}
+        self.assertFalse(seen & {client.pk for client in response.context['clients']})
+
+    def test_every_list_page_renders(self):
+        for name in ('client_list', 'user_list', 'product_list', 'address_list'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(f'delservice_app:{name}'), {'per_page': 1})
+                self.assertEqual(response.status_code, 200)
+                title = re.search(r'<title>(.*?)</title>', response.content.decode(), re.S).group(1)
+                self.assertNotIn('<', title)
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import list_rows, totals, transitions
+from ..models import Order, OrderItem, OrderListRow
+from .base import DelserviceTestCase
+
+
+class ListRowTests(DelserviceTestCase):
+
+    def assertRowsMatchOrders(self):
+        def values(rows):
+            return sorted(
+                [getattr(row, field) for field in ['order_id'] + list_rows.UPDATE_FIELDS] for row in rows
+            )
+        self.assertEqual(values(OrderListRow.objects.all()), values(list_rows.build_rows(Order.objects.all())))
+
+    def test_rows_follow_source_tables(self):
+        order = self.make_order(courier=self.courier, items=2)
+        other = self.make_order(items=1)
+        self.assertEqual(OrderListRow.objects.get(order_id=order.pk).item_count, 2)
+
+        self.customer.full_name = 'Иванов-Сидоров'
+        self.customer.save()
+        self.courier.full_name = 'Курьер Смирнов'
+        self.courier.save()
+        self.address.house_number = '1А'
+        self.address.save()
+        totals.add_item(other, self.product, 2)
+        OrderItem.objects.filter(order=order).first().delete()
+        transitions.transition(order, 'confirmed')
+        self.assertRowsMatchOrders()
+
+        row = OrderListRow.objects.get(order_id=order.pk)
+        self.assertEqual((row.client_name, row.courier_name, row.address, row.item_count),
+                         ('Иванов-Сидоров', 'Курьер Смирнов', 'Ленина, 1А', 1))
+
+        self.courier.delete()
+        order.delete()
+        self.assertRowsMatchOrders()
+        self.assertEqual(OrderListRow.objects.count(), 1)
+
+    def test_rebuild_repairs_drift(self):
+        orders = [self.make_order(items=1) for _ in range(5)]
+        # Правки в обход приложения
+        OrderListRow.objects.filter(order_id=orders[0].pk).update(client_name='?', item_count=0)
+        OrderListRow.objects.filter(order_id=orders[1].pk).delete()
+
+        out = StringIO()
+        call_command('rebuild_order_list', batch_size=2, stdout=out)
+        self.assertIn('Заказов: 4', out.getvalue())
+        self.assertRowsMatchOrders()
+
+    def test_order_list_reads_without_join(self):
+        self.make_order(courier=self.courier, items=2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('delservice_app:order_list'))
+        self.assertContains(response, 'Курьер Петров')
+        [select] = [query['sql'] for query in queries if 'FROM "order_list_view"' in query['sql']
+                    and 'COUNT' not in query['sql']]
+        self.assertNotIn('JOIN', select)
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_hot_queries', stdout=out)
+        self.assertNotIn('✗', out.getvalue())
@@ -0,0 +1,69 @@
+import json
+from unittest import mock
+
+from django.test import override_settings
+
+from .. import events, live, transitions
+from .base import DelserviceTestCase
+
+
+class LiveTests(DelserviceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        events.sequence()
+        self.start = events.last_offset()
+
+    def changes(self):
+        page, self.start = events.read(self.start)
+        return [(kind, data) for _, kind, data in live.deltas(page)]
+
+    def test_deltas_for_order_lifecycle(self):
+        order = self.make_order()
+        order.courier = self.courier
+        order.save()
+        transitions.transition(order, 'confirmed')
+
+        changes = self.changes()
+        self.assertEqual([kind for kind, _ in changes], [
+            live.ORDER_CREATED, live.ORDER_COURIER_ASSIGNED, live.ORDER_STATUS_CHANGED,
+        ])
+        created = changes[0][1]
+        self.assertEqual((created['client'], created['address'], created['status']['code']),
+                         ('Иванов', 'Ленина, 1', 'created'))
+        self.assertEqual(changes[1][1]['courier'], 'Курьер Петров')
+        self.assertEqual(changes[2][1]['status']['code'], 'confirmed')
+
+        order_id = order.pk
+        order.delete()
+        self.assertEqual(self.changes(), [(live.ORDER_DELETED, {'order_id': order_id})])
+
+    def test_offset_is_sent_on_last_message_of_event(self):
+        changes = [(5, live.ORDER_COURIER_ASSIGNED, {'order_id': 1}), (5, live.ORDER_STATUS_CHANGED, {'order_id': 1}),
+                   (6, live.ORDER_DELETED, {'order_id': 2})]
+        messages = live.format_batch(changes, {'orders_total': 3})
+        self.assertEqual([offset for offset, _ in messages], [5, 5, 6, None])
+        self.assertNotIn('id:', messages[0][1])
+        self.assertTrue(messages[1][1].startswith('id: 5\nevent: order.status_changed\n'))
+        self.assertEqual(messages[3][1], 'event: counters\ndata: {"orders_total": 3}\n\n')
+
+        message = live.format_message(live.ORDER_CREATED, {'client': 'Иванов'}, 7)
+        data = message.split('data: ', 1)[1]
+        self.assertEqual(json.loads(data), {'client': 'Иванов'})
+        self.assertIn('Иванов', data)
+
+    @override_settings(LIVE_MAX_REPLAY=2)
+    # Внутри транзакции теста соединение закрывать нельзя, как и в обработке запросов Django
+    @mock.patch.object(live, 'close_old_connections')
+    def test_long_gap_asks_page_to_reload(self, close_old_connections):
+        for _ in range(2):
+            self.make_order()
+        events.sequence()
+        messages = live.replay(self.start, events.last_offset())
+        self.assertEqual([offset for offset, _ in messages][:2], [self.start + 1, self.start + 2])
+
+        self.make_order()
+        events.sequence()
+        self.assertIsNone(live.replay(self.start, events.last_offset()))
+        # Досылка ограничена смещением, с которого подписчик получает рассылку
+        self.assertIsNotNone(live.replay(self.start, self.start + 2))
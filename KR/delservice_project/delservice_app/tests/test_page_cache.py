@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from ..models import Product
+from .base import DelserviceTestCase
+
+
+class PageCacheTests(DelserviceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('delservice_app:product_list')
+
+    def test_cached_page_and_not_modified(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('HX-Request', response['Vary'])
+        self.assertIn('private', response['Cache-Control'])
+
+        # Повтор — из кэша страниц, только сессия и пользователь
+        with self.assertNumQueries(2):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content, response.content)
+
+        with self.assertNumQueries(2):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+    def test_change_invalidates_after_commit(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Салат', price=Decimal('200.00'), weight_kg=Decimal('0.30'))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Салат')
+
+    def test_htmx_rows_are_cached_separately(self):
+        page = self.client.get(self.url)
+        rows = self.client.get(self.url, HTTP_HX_REQUEST='true')
+        self.assertNotEqual(rows['ETag'], page['ETag'])
+        self.assertNotIn(b'<html', rows.content)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core import signing
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Order
+from ..pagination import KeysetPaginator
+from .base import DelserviceTestCase
+
+
+class KeysetPaginationTests(DelserviceTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        # Два заказа с одинаковым created_at: порядок между ними решает id
+        self.orders = [self.make_order(created_at=now - timedelta(minutes=minutes)) for minutes in (5, 5, 3, 1, 0)]
+        self.expected = list(Order.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def ids(self, page):
+        return [order.pk for order in page]
+
+    def test_cursor_round_trip(self):
+        paginator = KeysetPaginator(Order.objects.all(), 2)
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        # Назад с последней страницы — та же вторая страница
+        previous = paginator.get_page(pages[2].previous_cursor)
+        self.assertEqual(self.ids(previous), self.ids(pages[1]))
+        self.assertTrue(previous.has_next())
+        first = paginator.get_page(previous.previous_cursor)
+        self.assertEqual(self.ids(first), self.expected[:2])
+        self.assertFalse(first.has_previous())
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        paginator = KeysetPaginator(Order.objects.all(), 2)
+        cursor = paginator.get_page(None).next_cursor
+        foreign = signing.dumps({'v': timezone.now().isoformat(), 'id': 1, 'd': 'next'}, salt='other')
+        broken = signing.dumps({'v': 'not a date', 'id': 1, 'd': 'sideways'}, salt=KeysetPaginator.salt)
+
+        for token in (cursor[:-3] + 'xyz', foreign, broken, 'garbage'):
+            self.assertIsNone(paginator.decode_cursor(token))
+            page = paginator.get_page(token)
+            self.assertEqual(self.ids(page), self.expected[:2])
+            self.assertFalse(page.has_previous())
+
+    def test_order_list_follows_cursor(self):
+        url = reverse('delservice_app:order_list')
+        response = self.client.get(url, {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual(self.ids(page.object_list), self.expected)
+        self.assertFalse(page.has_other_pages())
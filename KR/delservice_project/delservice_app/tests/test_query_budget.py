@@ -0,0 +1,93 @@
+from decimal import Decimal
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User as AuthUser
+from django.core.cache import caches
+from django.test import RequestFactory, TransactionTestCase
+from django.urls import reverse
+
+from .. import async_views, refdata
+from ..models import Payment
+from ..profiling import QueryProfile
+from ..testing import assert_view_queries
+from .base import DelserviceTestCase, create_reference_data, reset_caches
+
+# Бюджеты запросов страниц: с сессией и пользователем, а в отчётах — с
+# SAVEPOINT/RELEASE транзакций пересчёта. Число запросов не должно зависеть
+# от числа заказов на странице
+ORDER_LIST_QUERIES = 6
+ORDER_DETAIL_QUERIES = 5
+DASHBOARD_QUERIES = 5
+REPORTS_QUERIES = 14
+
+
+class QueryBudgetTests(DelserviceTestCase):
+    """Число запросов страницы не растёт с числом заказов (нет N+1)"""
+
+    def test_order_list(self):
+        for _ in range(3):
+            self.make_order(courier=self.courier, items=1)
+        response = assert_view_queries(self.client, 'delservice_app:order_list', ORDER_LIST_QUERIES)
+        self.assertEqual(response.status_code, 200)
+
+        for _ in range(15):
+            self.make_order(courier=self.courier, items=2)
+        reset_caches(self)
+        response = assert_view_queries(
+            self.client, 'delservice_app:order_list', ORDER_LIST_QUERIES, data={'status': 'created'},
+        )
+        self.assertEqual(len(response.context['page_obj'].object_list), 18)
+
+    def test_order_detail(self):
+        order = self.make_order(courier=self.courier, items=5)
+        Payment.objects.create(order=order, payment_method=order.payment_method, amount=Decimal('600'), status='paid')
+        response = assert_view_queries(
+            self.client, 'delservice_app:order_detail', ORDER_DETAIL_QUERIES, kwargs={'order_id': order.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard(self):
+        for _ in range(12):
+            self.make_order(courier=self.courier)
+        # Первое обращение заполняет dashboard_counters пересчётом
+        self.client.get(reverse('delservice_app:dashboard'))
+        reset_caches(self)
+        response = assert_view_queries(self.client, 'delservice_app:dashboard', DASHBOARD_QUERIES)
+        self.assertEqual(response.context['total_orders'], 12)
+        self.assertEqual(response.context['pending_orders'], 12)
+
+    def test_reports(self):
+        for status in ('created', 'confirmed', 'delivered'):
+            self.make_order(status=status, courier=self.courier, items=1)
+        # Первое обращение пересчитывает дневные агрегаты
+        self.client.get(reverse('delservice_app:reports'))
+        response = assert_view_queries(self.client, 'delservice_app:reports', REPORTS_QUERIES)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sum(status.order_count for status in response.context['status_stats']), 3)
+
+
+class AsyncProfilingTests(TransactionTestCase):
+    """Запросы из рабочих потоков async_views.in_thread попадают в профиль"""
+
+    def setUp(self):
+        caches['default'].clear()
+        create_reference_data()
+        for table in refdata.TABLES.values():
+            table.invalidate()
+        self.admin = AuthUser.objects.create_superuser('admin', 'admin@example.com', 'admin')
+
+    def test_worker_thread_queries_are_profiled(self):
+        request = RequestFactory().get('/')
+        request.user = self.admin
+
+        async def auser():
+            return self.admin
+
+        request.auser = auser
+        with QueryProfile() as profile:
+            response = async_to_sync(async_views.dashboard)(request)
+        self.assertEqual(response.status_code, 200)
+        tables = ' '.join(query['sql'] for query in profile.queries)
+        # counters.dashboard_counts и events.last_offset выполняются в отдельных потоках
+        self.assertIn('dashboard_counters', tables)
+        self.assertIn('order_events', tables)
@@ -0,0 +1,47 @@
+from unittest import mock
+
+from django.core.exceptions import ValidationError
+
+from .. import refdata, versions
+from ..models import OrderStatus
+from .base import DelserviceTestCase
+
+
+class RefDataTests(DelserviceTestCase):
+
+    def test_lookups_do_not_query_once_loaded(self):
+        created = refdata.statuses.by_key('created')
+        cancelled = OrderStatus.objects.get(code='cancelled')
+        with self.assertNumQueries(0):
+            self.assertEqual(refdata.statuses.get(created.pk), created)
+            self.assertEqual(refdata.statuses.pk_for('cancelled'), cancelled.pk)
+            self.assertEqual([status.code for status in refdata.statuses.all()][:2], ['created', 'confirmed'])
+
+    def test_saved_row_is_seen_after_commit(self):
+        refdata.statuses.all()
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderStatus.objects.create(code='returned', name='Возврат', sort_order=7)
+        self.assertIsNotNone(refdata.statuses.by_key('returned'))
+
+        status = OrderStatus.objects.get(code='returned')
+        with self.captureOnCommitCallbacks(execute=True):
+            status.delete()
+        self.assertIsNone(refdata.statuses.by_key('returned'))
+
+    def test_change_in_another_process(self):
+        refdata.statuses.all()
+        # Соседний процесс: запись в БД и новая версия в общем кэше, без сигнала в этом процессе
+        OrderStatus.objects.filter(code='created').update(name='Новый')
+        versions.bump(refdata.statuses.label)
+        self.assertEqual(refdata.statuses.by_key('created').name, 'Создан')
+        with mock.patch.object(refdata, 'CHECK_INTERVAL', 0):
+            self.assertEqual(refdata.statuses.by_key('created').name, 'Новый')
+
+    def test_choice_field_validates_from_cache(self):
+        field = refdata.CachedModelChoiceField(OrderStatus.objects.all())
+        status = refdata.statuses.by_key('confirmed')
+        with self.assertNumQueries(0):
+            self.assertEqual(field.clean(str(status.pk)), status)
+            self.assertEqual(len(list(field.choices)), len(refdata.statuses.all()) + 1)
+        with self.assertRaises(ValidationError):
+            field.clean('100500')
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import report_export
+from ..models import ReportJob
+from .base import DelserviceTestCase
+
+
+class ReportJobTests(DelserviceTestCase):
+    """Задания ставятся в пул потоков; пул подменён — рабочие потоки открыли бы свои соединения"""
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.root.cleanup)
+        settings = override_settings(REPORTS_ROOT=self.root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        patcher = mock.patch.object(report_export, 'get_executor')
+        self.executor = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def finish(self, job):
+        path = Path(self.root.name) / f'{job.cache_key}.pdf'
+        path.write_bytes(b'%PDF-1.4')
+        ReportJob.objects.filter(pk=job.pk).update(
+            status=ReportJob.DONE, file_path=str(path), finished_at=timezone.now(),
+        )
+        return path
+
+    def test_same_data_reuses_job_and_file(self):
+        job = report_export.request_report()
+        self.assertEqual(report_export.request_report(), job)
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+        self.finish(job)
+        self.assertEqual(report_export.request_report().status, ReportJob.DONE)
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+        # Новые данные — новая версия агрегатов и новое задание
+        self.make_order()
+        self.assertNotEqual(report_export.request_report(), job)
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+    def test_only_post_enqueues(self):
+        url = reverse('delservice_app:generate_pdf_report')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertFalse(ReportJob.objects.exists())
+
+        response = self.client.post(url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 202)
+        job = ReportJob.objects.get()
+        self.assertEqual(response.json()['id'], str(job.pk))
+        self.assertEqual(self.client.get(url, {'job': job.pk}).status_code, 202)
+
+        self.finish(job)
+        response = self.client.get(reverse('delservice_app:report_job_download', args=[job.pk]))
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        # Чтение через клиент закрывает файл без сигнала request_finished
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+
+    def test_cleanup_removes_old_jobs_and_orphan_files(self):
+        old = report_export.request_report()
+        path = self.finish(old)
+        ReportJob.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=30))
+        stale = timezone.now() - timedelta(days=30)
+        os.utime(path, (stale.timestamp(), stale.timestamp()))
+        self.make_order()
+        fresh = report_export.request_report()
+
+        self.assertEqual(report_export.cleanup(days=7), (1, 1))
+        self.assertEqual(list(ReportJob.objects.all()), [fresh])
+        self.assertFalse(path.exists())
@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.db.models import Count
+
+from .. import counters, rollups, transitions
+from ..models import DashboardCounter, Order, Payment, RollupDirtyDay
+from .base import DelserviceTestCase
+
+
+class RollupTests(DelserviceTestCase):
+
+    def status_counts(self):
+        rollups.refresh_dirty()
+        return {status.code: status.order_count for status in rollups.status_stats() if status.order_count}
+
+    def exact_status_counts(self):
+        return dict(Order.objects.values_list('status__code').annotate(count=Count('id')).order_by())
+
+    def test_rollups_follow_saves_and_deletes(self):
+        orders = [self.make_order(courier=self.courier) for _ in range(3)]
+        self.assertEqual(self.status_counts(), {'created': 3})
+
+        transitions.transition(orders[0], 'confirmed')
+        orders[1].delete()
+        self.assertEqual(self.status_counts(), self.exact_status_counts())
+        self.assertEqual(self.status_counts(), {'created': 1, 'confirmed': 1})
+
+        [courier] = rollups.courier_stats()
+        self.assertEqual((courier.total_deliveries, courier.total_earnings), (2, Decimal('300.00')))
+
+    def test_payments_are_aggregated_per_method(self):
+        order = self.make_order()
+        Payment.objects.create(order=order, payment_method=order.payment_method, amount=Decimal('600'), status='paid')
+        rollups.refresh_dirty()
+        cash = next(method for method in rollups.payment_stats() if method.code == 'cash')
+        self.assertEqual((cash.total_amount, cash.payment_count), (Decimal('600.00'), 1))
+
+    def test_refresh_bumps_version_outside_dashboard_counters(self):
+        self.make_order()
+        version = rollups.data_version()
+        self.assertEqual(rollups.refresh_dirty(), 1)
+        self.assertEqual(rollups.data_version(), version + 1)
+        self.assertFalse(RollupDirtyDay.objects.exists())
+
+        # Пересчёт счётчиков dashboard версию агрегатов не видит и не трогает
+        counters.reconcile()
+        self.assertFalse(DashboardCounter.objects.filter(key=rollups.DATA_VERSION_KEY).exists())
+        self.assertEqual(rollups.data_version(), version + 1)
@@ -0,0 +1,82 @@
+import itertools
+import random
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .. import geo, routing
+from ..models import Address, Order
+from .base import DelserviceTestCase
+
+
+def random_orders(rng, count, start=None):
+    """Точки count заказов: забор и следом доставка; узел 0 — start, если задан"""
+    offset = 1 if start else 0
+    points = ([start] if start else []) + [
+        (55.6 + rng.random() * 0.3, 37.4 + rng.random() * 0.4) for _ in range(2 * count)
+    ]
+    nodes = list(range(offset, offset + 2 * count))
+    before = {node + 1: node for node in nodes[::2]}
+    return geo.distance_matrix(points), nodes, before
+
+
+def length(matrix, path):
+    return sum(matrix[a][b] for a, b in zip(path, path[1:]))
+
+
+class SolverTests(SimpleTestCase):
+
+    def test_pickup_always_precedes_delivery(self):
+        rng = random.Random(17)
+        for _ in range(30):
+            matrix, nodes, before = random_orders(rng, rng.randint(1, 6))
+            path = routing.solve(matrix, nodes, before)
+            self.assertEqual(sorted(path), nodes)
+            self.assertTrue(routing._respects_order(path, before))
+
+            greedy = routing.nearest_neighbour(matrix, path[0], [node for node in nodes if node != path[0]], before)
+            self.assertLessEqual(length(matrix, path), length(matrix, greedy) + 1e-9)
+
+    def test_small_routes_are_close_to_optimal(self):
+        # Эвристика: при известном старте курьера не длиннее полного перебора больше чем на 15%
+        rng = random.Random(170)
+        for _ in range(20):
+            matrix, nodes, before = random_orders(rng, 3, start=(55.75, 37.6))
+            best = min(
+                length(matrix, (0,) + path) for path in itertools.permutations(nodes)
+                if routing._respects_order(path, before)
+            )
+            path = routing.solve(matrix, nodes, before, start=0)
+            self.assertTrue(routing._respects_order(path, before))
+            self.assertLessEqual(length(matrix, [0] + path), best * 1.15)
+
+
+class RouteTests(DelserviceTestCase):
+
+    def place(self, lat, lon):
+        return Address.objects.create(street='Точка', house_number=f'{lat},{lon}',
+                                      latitude=Decimal(str(lat)), longitude=Decimal(str(lon)))
+
+    def route_order(self, status, pickup, delivery):
+        order = self.make_order(status=status, courier=self.courier)
+        Order.objects.filter(pk=order.pk).update(pickup_address=pickup, delivery_address=delivery)
+        return order
+
+    def test_courier_route(self):
+        assigned = self.route_order('assigned', self.place(55.70, 37.50), self.place(55.80, 37.60))
+        dispatched = self.route_order('dispatched', self.place(55.90, 37.70), self.place(55.75, 37.55))
+        unknown = self.route_order('assigned', None, self.address)
+
+        route = routing.plan_routes()[self.courier.pk]
+        stops = [(stop.order.pk, stop.kind) for stop in route.stops]
+        # Заказ в пути уже забран — только доставка
+        self.assertEqual(sorted(stops), sorted([
+            (assigned.pk, routing.PICKUP), (assigned.pk, routing.DELIVERY), (dispatched.pk, routing.DELIVERY),
+        ]))
+        self.assertLess(stops.index((assigned.pk, routing.PICKUP)), stops.index((assigned.pk, routing.DELIVERY)))
+        self.assertEqual([(stop.order.pk, stop.kind) for stop in route.unplaced], [(unknown.pk, routing.DELIVERY)])
+        self.assertAlmostEqual(route.total_km, sum(stop.distance_km for stop in route.stops[1:]))
+
+        response = self.client.get(reverse('delservice_app:courier_route', args=[self.courier.pk]))
+        self.assertEqual(response.status_code, 200)
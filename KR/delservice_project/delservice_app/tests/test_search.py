@@ -0,0 +1,51 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from .. import search
+from ..models import Client, Product
+from .base import DelserviceTestCase
+
+
+class SearchTests(DelserviceTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Client.objects.create(email='petrov@example.com', phone='+7 999 002', full_name='Петров Пётр')
+        Client.objects.create(email='sidorova@mail.test', phone='+7 999 003', full_name='Сидорова Анна')
+        Product.objects.create(name='Пицца пепперони', price=Decimal('550.00'), weight_kg=Decimal('1.00'))
+        Product.objects.create(name='Суп', description='Острый томатный', price=Decimal('300.00'),
+                               weight_kg=Decimal('0.50'))
+
+    def names(self, queryset, field):
+        return sorted(queryset.values_list(field, flat=True))
+
+    def plain(self, queryset, term):
+        # icontains в SQLite не приводит регистр кириллицы — термины даны в нужном регистре
+        backend = search.IcontainsSearchBackend()
+        return backend.filter(queryset, term, search.SEARCH_FIELDS[queryset.model])
+
+    def test_backend_matches_plain_substring_search(self):
+        for model, field, term in [
+            (Client, 'full_name', 'Петров'), (Client, 'full_name', 'mail.te'), (Client, 'full_name', '999 00'),
+            (Product, 'name', 'Пицц'), (Product, 'name', 'томат'), (Product, 'name', 'у'),
+        ]:
+            with self.subTest(term=term):
+                found = search.search_queryset(model.objects.all(), term)
+                self.assertEqual(self.names(found, field), self.names(self.plain(model.objects.all(), term), field))
+                self.assertTrue(found.exists())
+
+    def test_index_follows_updates_and_deletes(self):
+        client = Client.objects.get(email='petrov@example.com')
+        client.full_name = 'Смирнов Пётр'
+        client.save()
+        self.assertFalse(search.search_queryset(Client.objects.all(), 'Петров').exists())
+        self.assertEqual(list(search.search_queryset(Client.objects.all(), 'Смирн')), [client])
+
+        client.delete()
+        self.assertFalse(search.search_queryset(Client.objects.all(), 'Смирн').exists())
+
+    def test_client_list_search(self):
+        response = self.client.get(reverse('delservice_app:client_list'), {'search': 'Сидоров'})
+        self.assertEqual([client.full_name for client in response.context['clients']], ['Сидорова Анна'])
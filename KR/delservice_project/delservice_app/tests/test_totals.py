@@ -0,0 +1,41 @@
+from decimal import Decimal
+
+from .. import totals
+from ..models import Order, OrderItem
+from .base import DelserviceTestCase
+
+
+class TotalsTests(DelserviceTestCase):
+
+    def order_total(self, order):
+        return Order.objects.get(pk=order.pk).order_total
+
+    def test_items_adjust_order_total(self):
+        order = self.make_order()
+        item = totals.add_item(order, self.product, 2)
+        self.assertEqual(self.order_total(order), Decimal('900.00'))
+        totals.change_quantity(item, 3)
+        self.assertEqual(self.order_total(order), Decimal('1350.00'))
+        self.assertTrue(totals.remove_item(item))
+        self.assertEqual(self.order_total(order), Decimal('0.00'))
+
+    def test_removed_item_is_not_counted_twice(self):
+        order = self.make_order(items=2)
+        item = OrderItem.objects.filter(order=order).first()
+        self.assertTrue(totals.remove_item(item))
+        self.assertFalse(totals.remove_item(item))
+        self.assertIsNone(totals.change_quantity(item, 5))
+        self.assertEqual(self.order_total(order), Decimal('450.00'))
+
+    def test_price_change_does_not_touch_existing_items(self):
+        order = self.make_order(items=1)
+        self.product.price = Decimal('500.00')
+        self.product.save()
+        totals.add_item(order, self.product, 1)
+        self.assertEqual(self.order_total(order), Decimal('950.00'))
+
+    def test_recalculate_repairs_drift(self):
+        order = self.make_order(items=2)
+        Order.objects.filter(pk=order.pk).update(order_total=Decimal('1.00'))
+        totals.recalculate()
+        self.assertEqual(self.order_total(order), Decimal('900.00'))
@@ -0,0 +1,57 @@
+from .. import counters, transitions
+from ..models import Order, OrderEvent, OrderListRow, OrderStatusHistory
+from ..testing import assert_max_queries
+from .base import DelserviceTestCase
+
+
+class TransitionTests(DelserviceTestCase):
+
+    def test_transition_stamps_time_and_records_history(self):
+        order = self.make_order()
+        counters.reconcile()
+        transitions.transition(order, 'confirmed')
+
+        order.refresh_from_db()
+        self.assertEqual(self.status_code(order), 'confirmed')
+        self.assertIsNotNone(order.confirmed_at)
+        history = OrderStatusHistory.objects.get(order=order, to_status_id=order.status_id)
+        self.assertEqual(history.from_status.code, 'created')
+        self.assertEqual(OrderListRow.objects.get(order_id=order.pk).status_id, order.status_id)
+        self.assertEqual(counters.get_many([counters.ORDERS_PENDING])[counters.ORDERS_PENDING], 0)
+        self.assertTrue(OrderEvent.objects.filter(
+            order_id=order.pk, action=OrderEvent.UPDATED, changes__status_id=order.status_id,
+        ).exists())
+
+    def test_full_path_stamps_every_stage(self):
+        order = self.make_order(courier=self.courier)
+        for code in ('confirmed', 'assigned', 'dispatched', 'delivered'):
+            transitions.transition(order, code)
+        order.refresh_from_db()
+        stamps = [order.created_at, order.confirmed_at, order.courier_assigned_at, order.dispatched_at,
+                  order.delivered_at]
+        self.assertEqual(stamps, sorted(stamps))
+        history = OrderStatusHistory.objects.filter(order=order).order_by('changed_at', 'id')
+        self.assertEqual([row.to_status.code for row in history],
+                         ['created', 'confirmed', 'assigned', 'dispatched', 'delivered'])
+
+    def test_skipping_a_status_is_rejected(self):
+        order = self.make_order()
+        with self.assertRaises(transitions.InvalidTransition):
+            transitions.transition(order, 'delivered')
+        self.assertEqual(self.status_code(order), 'created')
+
+    def test_stale_status(self):
+        order = self.make_order()
+        stale = Order.objects.get(pk=order.pk)
+        transitions.transition(order, 'cancelled')
+        with self.assertRaises(transitions.StaleStatus):
+            transitions.transition(stale, 'confirmed')
+
+    def test_bulk_transition_skips_disallowed_orders(self):
+        created = [self.make_order() for _ in range(3)]
+        delivered = self.make_order(status='delivered')
+        with assert_max_queries(12):
+            moved = transitions.bulk_transition([order.pk for order in created + [delivered]], 'confirmed')
+        self.assertEqual(moved, 3)
+        self.assertEqual(self.status_code(delivered), 'delivered')
+        self.assertEqual(OrderStatusHistory.objects.filter(to_status__code='confirmed').count(), 3)
@@ -0,0 +1,84 @@
+"""
+Сумма заказа (Order.order_total).
+
+Сумма меняется только приращением в базе — UPDATE ... SET order_total =
+order_total + delta — в одной транзакции с изменением позиции, поэтому
+параллельные правки одного заказа не затирают друг друга и остальные
+столбцы заказа не перезаписываются. Позиция перед изменением читается
+заново под блокировкой (SELECT ... FOR UPDATE): приращение считается по
+её текущему состоянию, и две правки одной позиции не учтут его дважды.
+recalculate() приводит суммы к SUM(quantity * price_at_order) одним
+UPDATE только для расходящихся строк.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Order, OrderItem
+
+
+def item_amount(item):
+    return item.price_at_order * item.quantity
+
+
+def adjust(order_id, delta):
+    """Атомарное изменение суммы заказа на delta"""
+    if delta:
+        Order.objects.filter(pk=order_id).update(order_total=F('order_total') + delta)
+
+
+@transaction.atomic
+def add_item(order, product, quantity):
+    """Добавление позиции по текущей цене товара"""
+    item = OrderItem.objects.create(
+        order=order, product=product, quantity=quantity, price_at_order=product.price
+    )
+    adjust(order.pk, item_amount(item))
+    return item
+
+
+def _locked(item):
+    """Позиция под блокировкой до конца транзакции; None — она уже удалена"""
+    return OrderItem.objects.select_for_update().filter(pk=item.pk).first()
+
+
+@transaction.atomic
+def change_quantity(item, quantity):
+    """Изменение количества в позиции; None — позиция уже удалена"""
+    item = _locked(item)
+    if item is None:
+        return None
+    delta = item.price_at_order * (quantity - item.quantity)
+    item.quantity = quantity
+    item.save(update_fields=['quantity'])
+    adjust(item.order_id, delta)
+    return item
+
+
+@transaction.atomic
+def remove_item(item):
+    """Удаление позиции; False — её уже удалили"""
+    item = _locked(item)
+    if item is None:
+        return False
+    _, deleted = OrderItem.objects.filter(pk=item.pk).delete()
+    if deleted.get(OrderItem._meta.label) != 1:
+        return False
+    adjust(item.order_id, -item_amount(item))
+    return True
+
+
+def items_total():
+    """Подзапрос: сумма позиций заказа из внешнего запроса"""
+    total = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+        total=Sum(F('quantity') * F('price_at_order'), output_field=DecimalField(max_digits=10, decimal_places=2))
+    ).values('total')
+    return Coalesce(Subquery(total), Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2))
+
+
+def recalculate(orders=None):
+    """Исправление разошедшихся сумм; возвращает число исправленных заказов"""
+    orders = Order.objects.all() if orders is None else orders
+    return orders.filter(~Q(order_total=items_total())).update(order_total=items_total())
@@ -0,0 +1,182 @@
+"""
+Переходы заказа между статусами.
+
+Правила те же, что в процедуре update_order_status из schema.sql:
+заказ движется на следующий по sort_order статус (created → confirmed →
+assigned → dispatched → delivered), а отменить его можно из любого
+статуса, кроме самой отмены.
+
+Переход — один условный UPDATE «... WHERE status_id = ожидаемый»: если
+статус успели изменить параллельно, строка не обновится и переход не
+состоится. В том же UPDATE ставится временная метка статуса
+(confirmed_at, courier_assigned_at, ...), если она ещё пуста. Каждый
+переход добавляет запись в OrderStatusHistory.
+
+UPDATE не вызывает сигналы, поэтому счётчики, дневные агрегаты и журнал
+событий (events) обновляются здесь же.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F, QuerySet, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import counters, events, list_rows, refdata, rollups
+from .models import Order, OrderEvent, OrderStatusHistory
+
+CANCELLED = 'cancelled'
+
+TIMESTAMP_FIELDS = {
+    'confirmed': 'confirmed_at',
+    'assigned': 'courier_assigned_at',
+    'dispatched': 'dispatched_at',
+    'delivered': 'delivered_at',
+}
+
+
+class TransitionError(Exception):
+    """Переход невозможен"""
+
+
+class InvalidTransition(TransitionError):
+    """Переход не разрешён правилами"""
+
+
+class StaleStatus(TransitionError):
+    """Статус заказа изменился параллельно"""
+
+
+def _code(status_id):
+    return refdata.statuses.get(status_id).code
+
+
+def next_codes(code):
+    """Статусы, в которые можно перейти из code"""
+    if code == CANCELLED:
+        return []
+    ordered = [status for status in refdata.statuses.all() if status.code != CANCELLED]
+    current = refdata.statuses.by_key(code)
+    following = [status.code for status in ordered if status.sort_order > current.sort_order]
+    return following[:1] + [CANCELLED]
+
+
+def is_allowed(from_code, to_code):
+    return to_code in next_codes(from_code)
+
+
+def source_codes(to_code):
+    """Статусы, из которых можно перейти в to_code"""
+    return [status.code for status in refdata.statuses.all() if is_allowed(status.code, to_code)]
+
+
+def _stamp(to_code, now):
+    """Временная метка нового статуса, если она ещё не стоит"""
+    field = TIMESTAMP_FIELDS.get(to_code)
+    return {field: Coalesce(F(field), Value(now))} if field else {}
+
+
+def _after_update(changes, now, values):
+    """История, счётчик ожидающих, агрегаты, события и строки списка для [(order_id, created_at, from_id, to_id)]"""
+    OrderStatusHistory.objects.bulk_create([
+        OrderStatusHistory(order_id=order_id, from_status_id=from_id, to_status_id=to_id, changed_at=now)
+        for order_id, _, from_id, to_id in changes
+    ])
+    pending_id = counters.pending_status_id()
+    counters.increment({counters.ORDERS_PENDING: sum(
+        int(to_id == pending_id) - int(from_id == pending_id) for _, _, from_id, to_id in changes
+    )})
+    rollups.mark_dirty([created_at for _, created_at, _, _ in changes])
+    events.record_updated(OrderEvent.ORDER, {
+        order_id: (order_id, {'status_id': to_id, **values}) for order_id, _, _, to_id in changes
+    })
+    list_rows.refresh([order_id for order_id, _, _, _ in changes])
+
+
+def transition(order, to_code, **values):
+    """Перевод одного заказа в статус to_code; values — другие поля того же UPDATE"""
+    from_code = _code(order.status_id)
+    if not is_allowed(from_code, to_code):
+        raise InvalidTransition(f'Недопустимый переход статуса: {from_code} → {to_code}')
+
+    from_id, to_id = order.status_id, refdata.statuses.pk_for(to_code)
+    now = timezone.now()
+    with transaction.atomic():
+        updated = Order.objects.filter(pk=order.pk, status_id=from_id).update(
+            status_id=to_id, **_stamp(to_code, now), **values,
+        )
+        if not updated:
+            raise StaleStatus(f'Статус заказа #{order.pk} уже изменён')
+        _after_update([(order.pk, order.created_at, from_id, to_id)], now, values)
+
+    order.status_id = order._loaded_status_id = to_id
+    for name, value in values.items():
+        setattr(order, name, value)
+    field = TIMESTAMP_FIELDS.get(to_code)
+    if field and getattr(order, field) is None:
+        setattr(order, field, now)
+    # Следующий save() не должен повторить событие этого перехода
+    order._event_snapshot = events.snapshot(order)
+    return order
+
+
+def bulk_transition(orders, to_code, from_codes=None, **values):
+    """Перевод многих заказов одним UPDATE; возвращает число переведённых.
+
+    orders — выборка или список id. Заказы в статусах, из которых переход
+    в to_code не разрешён (или не входит в from_codes), пропускаются.
+    """
+    queryset = orders if isinstance(orders, QuerySet) else Order.objects.filter(pk__in=list(orders))
+    codes = [code for code in (from_codes or source_codes(to_code)) if is_allowed(code, to_code)]
+    source_ids = [refdata.statuses.pk_for(code) for code in codes]
+    to_id = refdata.statuses.pk_for(to_code)
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Блокировка строк: исходные статусы для истории не изменятся до UPDATE
+        rows = list(
+            queryset.filter(status_id__in=source_ids).select_for_update()
+            .values_list('pk', 'created_at', 'status_id')
+        )
+        if not rows:
+            return 0
+        updated = Order.objects.filter(
+            pk__in=[pk for pk, _, _ in rows], status_id__in=source_ids,
+        ).update(status_id=to_id, **_stamp(to_code, now), **values)
+        _after_update([(pk, created_at, from_id, to_id) for pk, created_at, from_id in rows], now, values)
+    return updated
+
+
+def record_created(orders):
+    """История и временные метки для только что созданных заказов.
+
+    Заказы, созданные сразу в статусе «confirmed» и дальше, получают
+    метку этого статуса; поля уже заполненных меток не меняются.
+    """
+    now = timezone.now()
+    OrderStatusHistory.objects.bulk_create([
+        OrderStatusHistory(order_id=order.pk, from_status=None, to_status_id=order.status_id, changed_at=now)
+        for order in orders
+    ])
+
+    by_status = defaultdict(list)
+    for order in orders:
+        field = TIMESTAMP_FIELDS.get(_code(order.status_id))
+        if field and getattr(order, field) is None:
+            by_status[order.status_id].append(order.pk)
+            setattr(order, field, now)
+    for status_id, pks in by_status.items():
+        field = TIMESTAMP_FIELDS[_code(status_id)]
+        Order.objects.filter(pk__in=pks, **{f'{field}__isnull': True}).update(**{field: now})
+
+
+def record_saved_change(order, from_id):
+    """История и метка для смены статуса обычным save() (админка, сторонний код)"""
+    now = timezone.now()
+    OrderStatusHistory.objects.create(
+        order_id=order.pk, from_status_id=from_id, to_status_id=order.status_id, changed_at=now,
+    )
+    field = TIMESTAMP_FIELDS.get(_code(order.status_id))
+    if field and getattr(order, field) is None:
+        Order.objects.filter(pk=order.pk, **{f'{field}__isnull': True}).update(**{field: now})
+        setattr(order, field, now)
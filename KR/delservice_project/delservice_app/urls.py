@@ -1,17 +1,35 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# Нагруженные страницы под ASGI обслуживаются асинхронными версиями (см. async_views.py)
+hot_views = async_views if settings.ASYNC_VIEWS else views
 
 app_name = 'delservice_app'
 
 urlpatterns = [
     # Основные страницы
-    path('', views.dashboard, name='dashboard'),
-    path('reports/', views.reports, name='reports'),
+    path('', hot_views.dashboard, name='dashboard'),
+    path('reports/', hot_views.reports, name='reports'),
     path('reports/pdf/', views.generate_pdf_report, name='generate_pdf_report'),
+    path('reports/jobs/<uuid:job_id>/', views.report_job_status, name='report_job_status'),
+    path('reports/jobs/<uuid:job_id>/download/', views.report_job_download, name='report_job_download'),
+
+    # Живые обновления панели и списка заказов (SSE, см. live.py)
+    path('live/events/', async_views.live_events, name='live_events'),
+
+    # JSON API (см. api.py)
+    path('api/events/', api.event_feed, name='api_event_feed'),
+    path('api/<str:resource>/', api.collection, name='api_collection'),
+    path('api/<str:resource>/<int:pk>/', api.detail, name='api_detail'),
 
     # Управление заказами
-    path('orders/', views.order_list, name='order_list'),
-    path('orders/<int:order_id>/', views.order_detail, name='order_detail'),
+    path('orders/', hot_views.order_list, name='order_list'),
+    path('orders/export/', views.order_export, name='order_export'),
+    path('orders/import/', views.order_import, name='order_import'),
+    path('orders/auto-assign/', views.order_auto_assign, name='order_auto_assign'),
+    path('orders/bulk/', views.order_bulk_action, name='order_bulk_action'),
+    path('orders/<int:order_id>/', hot_views.order_detail, name='order_detail'),
     path('orders/create/', views.order_create, name='order_create'),
     path('orders/<int:order_id>/edit/', views.order_update, name='order_update'),
     path('orders/<int:order_id>/delete/', views.order_delete, name='order_delete'),
@@ -27,6 +45,7 @@ urlpatterns = [
     path('users/create/', views.user_create, name='user_create'),
     path('users/<int:user_id>/edit/', views.user_update, name='user_update'),
     path('users/<int:user_id>/delete/', views.user_delete, name='user_delete'),
+    path('users/<int:user_id>/route/', views.courier_route, name='courier_route'),
 
     # Управление ролями
     path('roles/', views.role_list, name='role_list'),
@@ -59,8 +78,8 @@ urlpatterns = [
     path('payment-methods/<int:method_id>/delete/', views.payment_method_delete, name='payment_method_delete'),
 
     # Управление заказами
-    path('orders/', views.order_list, name='order_list'),
-    path('orders/<int:order_id>/', views.order_detail, name='order_detail'),
+    path('orders/', hot_views.order_list, name='order_list'),
+    path('orders/<int:order_id>/', hot_views.order_detail, name='order_detail'),
     path('orders/create/', views.order_create, name='order_create'),
     path('orders/<int:order_id>/edit/', views.order_update, name='order_update'),
     path('orders/<int:order_id>/delete/', views.order_delete, name='order_delete'),
@@ -0,0 +1,63 @@
+"""
+Версии данных в общем кэше Django.
+
+Каждая метка (например, название таблицы) имеет целочисленную версию,
+которая увеличивается при изменении данных. Кэши в памяти процесса и
+кэши ответов сравнивают свою версию с текущей и перестраиваются при
+расхождении. Хранилище — кэш DATA_VERSION_CACHE (по умолчанию 'default');
+при нескольких процессах это должен быть общий бэкенд (файловый, Redis),
+иначе изменения не будут видны соседним процессам.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+def _cache():
+    return caches[getattr(settings, 'DATA_VERSION_CACHE', 'default')]
+
+
+def _key(label):
+    return f'data_version:{label}'
+
+
+def _initial():
+    # Начальная версия от времени: если ключ вытеснен из кэша, новая версия
+    # не совпадёт ни с одной из выданных ранее
+    return time.time_ns() // 1000
+
+
+def get_many(labels):
+    """Текущие версии: {метка: версия}"""
+    cache = _cache()
+    keys = {_key(label): label for label in labels}
+    found = cache.get_many(list(keys))
+    for key, label in keys.items():
+        if key not in found:
+            cache.add(key, _initial(), timeout=None)
+            found[key] = cache.get(key)
+    return {label: found[key] for key, label in keys.items()}
+
+
+def get(label):
+    return get_many([label])[label]
+
+
+def bump(label):
+    """Новая версия сразу (вне транзакции)"""
+    cache = _cache()
+    try:
+        cache.incr(_key(label))
+    except ValueError:
+        cache.add(_key(label), _initial(), timeout=None)
+
+
+def bump_on_commit(label):
+    """Новая версия после фиксации текущей транзакции.
+
+    Если увеличить версию раньше, соседний процесс успеет прочитать ещё
+    не зафиксированные (старые) данные и сохранить их под новой версией.
+    """
+    transaction.on_commit(lambda: bump(label))
@@ -1,13 +1,30 @@
+import json
+import os
+import tempfile
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Sum, Count
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta
 from django.contrib import messages
-from django.http import HttpResponse
-from io import BytesIO
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
 from .models import *
 from .forms import *
+from . import (
+    analytics, archive, assignment, bulk_actions, counters, exports, importer, list_rows, refdata, report_export, rollups,
+    routing, totals, transitions,
+)
+from .page_cache import versioned_page
+from .pagination import KeysetPaginator, render_list
+from .search import search_queryset
+
+# Сколько отклонённых заказов показывать на странице импорта
+IMPORT_REJECTED_SHOWN = 200
+# Сколько отказов массового действия перечислять в сообщении
+BULK_FAILURES_SHOWN = 5
 
 
 # ==================== ОСНОВНЫЕ СТРАНИЦЫ ====================
@@ -15,228 +32,110 @@ from .forms import *
 @login_required
 def dashboard(request):
     """Главная страница панели управления"""
-    total_orders = Order.objects.count()
-    pending_orders = Order.objects.filter(status__code='created').count()
-    active_couriers = User.objects.filter(role__name='courier', status='works').count()
-    today_orders = Order.objects.filter(created_at__date=timezone.now().date()).count()
-
-    recent_orders = Order.objects.select_related('client', 'status', 'courier').order_by('-created_at')[:10]
-
-    context = {
-        'total_orders': total_orders,
-        'pending_orders': pending_orders,
-        'active_couriers': active_couriers,
-        'today_orders': today_orders,
-        'recent_orders': recent_orders,
-    }
+    # Счётчики читаются из dashboard_counters одним запросом (см. counters.py)
+    context = counters.dashboard_counts()
+    recent_orders = list(Order.objects.select_related(
+        'client', 'courier', 'delivery_address'
+    ).order_by('-created_at')[:10])
+    # Статусы — из кэша справочников, без JOIN с order_statuses
+    for order in recent_orders:
+        order.status = refdata.statuses.get(order.status_id)
+    context['recent_orders'] = recent_orders
     return render(request, 'delservice_app/dashboard.html', context)
 
 
 @login_required
 def reports(request):
     """Формирование отчётов"""
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    courier_stats = User.objects.filter(
-        role__name='courier',
-        delivered_orders__created_at__gte=thirty_days_ago
-    ).annotate(
-        total_deliveries=Count('delivered_orders'),
-        total_earnings=Sum('delivered_orders__delivery_cost')
-    ).order_by('-total_deliveries')
-
-    status_stats = OrderStatus.objects.annotate(
-        order_count=Count('order')
-    ).order_by('sort_order')
-
-    payment_stats = PaymentMethod.objects.annotate(
-        total_amount=Sum('payment__amount'),
-        payment_count=Count('payment')
-    )
+    # Отчёт строится по дневным агрегатам; пересчитываются только изменённые дни
+    rollups.refresh_dirty()
+    analytics.refresh(days=30)
 
     context = {
-        'courier_stats': courier_stats,
-        'status_stats': status_stats,
-        'payment_stats': payment_stats,
+        'courier_stats': rollups.courier_stats(days=30),
+        'status_stats': rollups.status_stats(),
+        'payment_stats': rollups.payment_stats(),
+        'stage_titles': analytics.stage_titles(),
+        'latency': analytics.window_stats(days=30),
+        'latency_by_day': analytics.daily_stats(days=30),
+        'include_archive': request.GET.get('archive') == '1',
     }
+    # Архив — по запросу: его суммы считаются по архивным таблицам
+    if context['include_archive']:
+        context['courier_stats'] = archive.with_courier_stats(context['courier_stats'], days=30)
+        context['status_stats'] = archive.with_status_stats(context['status_stats'])
+        context['payment_stats'] = archive.with_payment_stats(context['payment_stats'])
     return render(request, 'delservice_app/reports.html', context)
 
 
 @login_required
 def generate_pdf_report(request):
-    """Генерация отчёта в формате PDF"""
-    try:
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.ttfonts import TTFont
-        from reportlab.lib.units import inch
-    except ImportError:
+    """PDF-отчёт: POST ставит задание (готовый отчёт берётся из кэша), GET ?job= — его статус"""
+    if request.method != 'POST':
+        return _report_job_page(request, request.GET.get('job'))
+
+    if not report_export.reportlab_available():
+        if _wants_json(request):
+            return JsonResponse({'error': 'Библиотека reportlab не установлена'}, status=503)
         messages.error(request, 'Библиотека reportlab не установлена. Установите: pip install reportlab')
         return redirect('delservice_app:reports')
 
-    # Регистрация шрифта с поддержкой кириллицы
-    pdfmetrics.registerFont(TTFont('DejaVuSans', 'DejaVuSans.ttf'))
-    pdfmetrics.registerFont(TTFont('DejaVuSans-Bold', 'DejaVuSans-Bold.ttf'))
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-
-    styles = getSampleStyleSheet()
-
-    # Создание стилей с кириллическим шрифтом
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontName='DejaVuSans-Bold',
-        fontSize=16,
-        spaceAfter=30,
-        alignment=1,
-        textColor=colors.black
-    )
+    job = report_export.request_report(days=30)
+    if _wants_json(request):
+        return JsonResponse(_report_job_payload(job), status=200 if job.status == ReportJob.DONE else 202)
+    # Форма без JavaScript: дальше — страница статуса задания
+    return redirect(f'{reverse("delservice_app:generate_pdf_report")}?job={job.id}')
 
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontName='DejaVuSans-Bold',
-        fontSize=14,
-        spaceAfter=12,
-        spaceBefore=20,
-        textColor=colors.black
-    )
 
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontName='DejaVuSans',
-        fontSize=10,
-        textColor=colors.black
+def _report_job_page(request, job_id):
+    """Статус задания без JavaScript: готовый файл, ошибка или повтор запроса через несколько секунд"""
+    try:
+        job = ReportJob.objects.filter(id=job_id).first() if job_id else None
+    except ValidationError:
+        job = None
+    if job is None:
+        return redirect('delservice_app:reports')
+    if job.status == ReportJob.DONE:
+        return report_job_download(request, job.id)
+    if job.status == ReportJob.FAILED:
+        messages.error(request, f'Не удалось сформировать отчёт: {job.error}')
+        return redirect('delservice_app:reports')
+    url = f'{reverse("delservice_app:generate_pdf_report")}?job={job.id}'
+    return HttpResponse(
+        'Отчёт формируется, скачивание начнётся автоматически.', status=202,
+        content_type='text/plain; charset=utf-8', headers={'Refresh': f'3; url={url}'},
     )
 
-    # Заголовок отчёта
-    elements.append(Paragraph('Отчёт о деятельности службы доставки', title_style))
-    elements.append(Paragraph(f'Дата формирования: {timezone.now().strftime("%d.%m.%Y %H:%M")}', normal_style))
-    elements.append(Spacer(1, 20))
-
-    # Статистика по курьерам
-    elements.append(Paragraph('Эффективность курьеров (за последние 30 дней)', heading_style))
-
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    courier_stats = User.objects.filter(
-        role__name='courier',
-        delivered_orders__created_at__gte=thirty_days_ago
-    ).annotate(
-        total_deliveries=Count('delivered_orders'),
-        total_earnings=Sum('delivered_orders__delivery_cost')
-    ).order_by('-total_deliveries')
-
-    if courier_stats.exists():
-        courier_data = [['Курьер', 'Количество доставок', 'Общий доход (₽)']]
-        for courier in courier_stats:
-            courier_data.append([
-                courier.full_name,
-                str(courier.total_deliveries),
-                f"{courier.total_earnings or 0} ₽"
-            ])
-
-        courier_table = Table(courier_data, colWidths=[2.5 * inch, 1.7 * inch, 1.3 * inch])
-        courier_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.lightgrey, colors.white]),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        elements.append(courier_table)
-    else:
-        elements.append(Paragraph('Нет данных за указанный период', normal_style))
-
-    elements.append(Spacer(1, 30))
-
-    # Статистика по статусам заказов
-    elements.append(Paragraph('Статистика заказов по статусам', heading_style))
-
-    status_stats = OrderStatus.objects.annotate(
-        order_count=Count('order')
-    ).order_by('sort_order')
-
-    if status_stats.exists():
-        status_data = [['Статус', 'Количество заказов']]
-        for status in status_stats:
-            status_data.append([status.name, str(status.order_count)])
-
-        status_table = Table(status_data, colWidths=[3 * inch, 2.5 * inch])
-        status_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.lightgrey, colors.white]),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]))
-        elements.append(status_table)
-    else:
-        elements.append(Paragraph('Нет данных', normal_style))
-
-    elements.append(Spacer(1, 30))
 
-    # Статистика по способам оплаты
-    elements.append(Paragraph('Доходы по способам оплаты', heading_style))
+def _report_job_payload(job):
+    return {
+        'id': str(job.id),
+        'status': job.status,
+        'error': job.error,
+        'status_url': reverse('delservice_app:report_job_status', args=[job.id]),
+        'download_url': (
+            reverse('delservice_app:report_job_download', args=[job.id])
+            if job.status == ReportJob.DONE else None
+        ),
+    }
 
-    payment_stats = PaymentMethod.objects.annotate(
-        total_amount=Sum('payment__amount'),
-        payment_count=Count('payment')
-    )
 
-    if payment_stats.exists():
-        # Используем более короткий заголовок для третьей колонки
-        payment_data = [['Способ оплаты', 'Общая сумма (₽)', 'Кол-во платежей']]
-        for payment in payment_stats:
-            payment_data.append([
-                payment.name,
-                f"{payment.total_amount or 0} ₽",
-                str(payment.payment_count)
-            ])
-
-        # Увеличиваем ширину третьей колонки
-        payment_table = Table(payment_data, colWidths=[2.5 * inch, 2 * inch, 1.7 * inch])
-        payment_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'DejaVuSans-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'DejaVuSans'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.lightgrey, colors.white]),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('WORDWRAP', (0, 0), (-1, -1), True),  # Включаем перенос слов
-        ]))
-        elements.append(payment_table)
-    else:
-        elements.append(Paragraph('Нет данных', normal_style))
-
-    # Формирование документа
-    doc.build(elements)
+@login_required
+def report_job_status(request, job_id):
+    """Статус задания на формирование отчёта"""
+    job = get_object_or_404(ReportJob, id=job_id)
+    return JsonResponse(_report_job_payload(job))
 
-    # Подготовка ответа
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="report_{timezone.now().strftime("%Y%m%d_%H%M")}.pdf"'
 
-    return response
+@login_required
+def report_job_download(request, job_id):
+    """Скачивание готового PDF-отчёта"""
+    job = get_object_or_404(ReportJob, id=job_id, status=ReportJob.DONE)
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise Http404('Файл отчёта не найден')
+    filename = f'report_{timezone.localtime(job.finished_at).strftime("%Y%m%d_%H%M")}.pdf'
+    return FileResponse(open(job.file_path, 'rb'), as_attachment=True, filename=filename,
+                        content_type='application/pdf')
 
 
 # ==================== УПРАВЛЕНИЕ ЗАКАЗАМИ ====================
@@ -245,40 +144,180 @@ def generate_pdf_report(request):
 def order_list(request):
     """Список заказов с поиском и фильтрацией"""
     form = OrderSearchForm(request.GET or None)
-    orders = Order.objects.select_related(
-        'client', 'status', 'courier', 'payment_method', 'delivery_address'
-    ).prefetch_related('items__product').order_by('-created_at')
+    # Строки списка из order_list_view — без соединений с другими таблицами
+    orders = form.filter_queryset(OrderListRow.objects.all())
+    if form.include_archive:
+        orders = [orders, form.filter_queryset(ArchivedOrder.objects.all())]
+
+    # Курсорная пагинация: без COUNT(*) и OFFSET, глубина страницы не влияет на скорость
+    paginator = KeysetPaginator(orders, 20)
+    page_obj = paginator.get_page(
+        request.GET.get('cursor'),
+        with_total=request.GET.get('total') == '1',
+    )
+    list_rows.with_statuses(page_obj)
 
-    if form.is_valid():
-        if form.cleaned_data.get('client_name'):
-            orders = orders.filter(
-                Q(client__full_name__icontains=form.cleaned_data['client_name']) |
-                Q(client__phone__icontains=form.cleaned_data['client_name'])
-            )
+    context = {
+        'orders': page_obj,
+        'form': form,
+        'page_obj': page_obj,
+        'bulk_form': OrderBulkActionForm(),
+    }
+    return render(request, 'delservice_app/order_list.html', context)
 
-        if form.cleaned_data.get('status'):
-            orders = orders.filter(status__code=form.cleaned_data['status'])
 
-        if form.cleaned_data.get('date_from'):
-            orders = orders.filter(created_at__date__gte=form.cleaned_data['date_from'])
+@login_required
+def order_export(request):
+    """Потоковая выгрузка заказов с фильтрами списка в CSV или XLSX"""
+    form = OrderSearchForm(request.GET or None)
+    rows = exports.order_rows(form.filter_queryset(Order.objects.all()))
+    filename = f'orders_{timezone.localtime().strftime("%Y%m%d_%H%M")}'
+
+    if request.GET.get('format') == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            messages.error(request, 'Библиотека openpyxl не установлена. Установите: pip install openpyxl')
+            return redirect('delservice_app:order_list')
+
+        # Книга пишется во временный файл на диске и отдаётся оттуда по частям
+        output = tempfile.TemporaryFile()
+        exports.write_xlsx(rows, output)
+        output.seek(0)
+        return FileResponse(
+            output, as_attachment=True, filename=f'{filename}.xlsx',
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
 
-        if form.cleaned_data.get('date_to'):
-            orders = orders.filter(created_at__date__lte=form.cleaned_data['date_to'])
+    response = StreamingHttpResponse(exports.stream_csv(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
 
-        if form.cleaned_data.get('courier'):
-            orders = orders.filter(courier_id=form.cleaned_data['courier'])
 
-    from django.core.paginator import Paginator
-    paginator = Paginator(orders, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+@login_required
+def order_import(request):
+    """Пакетная загрузка заказов из CSV/JSON-файла"""
+    result = None
+    if request.method == 'POST':
+        form = OrderImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                records = importer.load_records(upload.file, form.cleaned_data['format'], upload.name)
+            except importer.READ_ERRORS as e:
+                messages.error(request, f'Не удалось прочитать файл: {e}')
+            else:
+                result = importer.OrderImporter().run(records)
+                if result.orders_created:
+                    messages.success(request, f'Импортировано заказов: {result.orders_created}')
+                if result.rejected:
+                    messages.warning(request, f'Отклонено заказов: {len(result.rejected)}')
+    else:
+        form = OrderImportForm()
 
     context = {
-        'orders': page_obj,
         'form': form,
-        'page_obj': page_obj,
+        'result': result,
+        'rejected': result.rejected[:IMPORT_REJECTED_SHOWN] if result else [],
     }
-    return render(request, 'delservice_app/order_list.html', context)
+    return render(request, 'delservice_app/order_import.html', context)
+
+
+@login_required
+def order_auto_assign(request):
+    """Автоматическое назначение ближайших свободных курьеров подтверждённым заказам"""
+    if request.method != 'POST':
+        return redirect('delservice_app:order_list')
+
+    result = assignment.assign_pending()
+    if result.assigned:
+        messages.success(request, f'Назначено заказов: {result.assigned}')
+    else:
+        messages.info(request, 'Нет заказов, которые можно назначить')
+    if result.no_courier:
+        messages.warning(request, f'Не хватило свободных курьеров для заказов: {len(result.no_courier)}')
+    if result.no_location:
+        messages.warning(request, f'Заказов без координат адреса: {len(result.no_location)}')
+    return redirect('delservice_app:order_list')
+
+
+def _back_to_list(request):
+    """Возврат к списку заказов с теми же фильтрами"""
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect('delservice_app:order_list')
+
+
+FORM_CONTENT_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+
+def _wants_json(request):
+    """Ответ в JSON, кроме запросов HTMX и отправки формы из браузера.
+
+    Accept: */* (fetch, curl) ответа в HTML не просит — такой клиент тоже
+    получает JSON; перенаправление с сообщением нужно только странице.
+    """
+    accept = [media.split(';')[0].strip().lower() for media in request.headers.get('Accept', '').split(',')]
+    if 'application/json' in accept:
+        return True
+    if request.headers.get('HX-Request'):
+        return False
+    return not (request.content_type in FORM_CONTENT_TYPES and 'text/html' in accept)
+
+
+def _bulk_action_data(request):
+    """Данные массового действия: поля формы или JSON-объект из тела запроса"""
+    if request.content_type != 'application/json':
+        return request.POST
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        body = None
+    return body if isinstance(body, dict) else {}
+
+
+@login_required
+def order_bulk_action(request):
+    """Массовое действие над отмеченными заказами (смена статуса, курьер, удаление).
+
+    Отвечает JSON с результатом по каждому id; HTMX и форма из браузера
+    получают перенаправление к списку (см. _wants_json).
+    """
+    if request.method != 'POST':
+        return redirect('delservice_app:order_list')
+    wants_json = _wants_json(request)
+
+    form = OrderBulkActionForm(_bulk_action_data(request))
+    if not form.is_valid():
+        if wants_json:
+            return JsonResponse({'error': 'Ошибка проверки данных', 'errors': form.errors.get_json_data()}, status=400)
+        for errors in form.errors.values():
+            messages.error(request, ' '.join(errors))
+        return _back_to_list(request)
+
+    data = form.cleaned_data
+    status = refdata.statuses.by_key(data['status']) if data.get('status') else None
+    result = bulk_actions.apply(data['action'], data['ids'], status=data.get('status'), courier=data.get('courier'))
+
+    if wants_json:
+        payload = {'action': data['action'], **result.as_dict()}
+        if data['action'] == bulk_actions.CHANGE_STATUS:
+            payload['status'] = {'code': status.code, 'name': status.name}
+        elif data['action'] == bulk_actions.ASSIGN_COURIER:
+            payload['courier'] = {'id': data['courier'].pk, 'name': data['courier'].full_name}
+            assigned = refdata.statuses.by_key(bulk_actions.ASSIGNED_STATUS_CODE)
+            payload['status'] = {'code': assigned.code, 'name': assigned.name}
+        return JsonResponse(payload)
+
+    if result.succeeded:
+        messages.success(request, f'{bulk_actions.DONE_MESSAGES[data["action"]]}: {len(result.succeeded)}')
+    failed = result.failed
+    if failed:
+        shown = '; '.join(f'#{pk}: {reason}' for pk, reason in list(failed.items())[:BULK_FAILURES_SHOWN])
+        more = f' и ещё {len(failed) - BULK_FAILURES_SHOWN}' if len(failed) > BULK_FAILURES_SHOWN else ''
+        messages.warning(request, f'Не выполнено для {len(failed)} заказов: {shown}{more}')
+    return _back_to_list(request)
 
 
 @login_required
@@ -300,6 +339,7 @@ def order_detail(request, order_id):
 
 
 @login_required
+@transaction.atomic
 def order_create(request):
     """Создание нового заказа"""
     if request.method == 'POST':
@@ -318,6 +358,7 @@ def order_create(request):
 
 
 @login_required
+@transaction.atomic
 def order_update(request, order_id):
     """Редактирование заказа"""
     order = get_object_or_404(Order, id=order_id)
@@ -325,8 +366,12 @@ def order_update(request, order_id):
     if request.method == 'POST':
         form = OrderForm(request.POST, instance=order)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Заказ успешно обновлён')
+            try:
+                form.save()
+            except transitions.TransitionError as e:
+                messages.error(request, str(e))
+            else:
+                messages.success(request, 'Заказ успешно обновлён')
             return redirect('delservice_app:order_detail', order_id=order.id)
     else:
         form = OrderForm(instance=order)
@@ -336,6 +381,7 @@ def order_update(request, order_id):
 
 
 @login_required
+@transaction.atomic
 def order_delete(request, order_id):
     """Удаление заказа"""
     order = get_object_or_404(Order, id=order_id)
@@ -355,19 +401,14 @@ def order_delete(request, order_id):
 def client_list(request):
     """Список клиентов"""
     search = request.GET.get('search', '')
-    clients = Client.objects.all()
-
-    if search:
-        clients = clients.filter(
-            Q(full_name__icontains=search) |
-            Q(email__icontains=search) |
-            Q(phone__icontains=search)
-        )
+    clients = Client.objects.order_by('-registration_date')
+    clients = search_queryset(clients, search)
 
-    clients = clients.order_by('-registration_date')
-
-    context = {'clients': clients, 'search': search}
-    return render(request, 'delservice_app/client_list.html', context)
+    return render_list(
+        request, clients, 'delservice_app/client_list.html', 'delservice_app/client_list_rows.html',
+        {'search': search}, 'clients',
+        fields=['full_name', 'email', 'phone', 'registration_date', 'status'],
+    )
 
 
 @login_required
@@ -424,19 +465,29 @@ def client_delete(request, client_id):
 def user_list(request):
     """Список пользователей (сотрудников)"""
     search = request.GET.get('search', '')
-    users = User.objects.select_related('role').all()
-
-    if search:
-        users = users.filter(
-            Q(full_name__icontains=search) |
-            Q(login__icontains=search) |
-            Q(phone__icontains=search)
-        )
+    users = User.objects.order_by('hire_date')
+    users = search_queryset(users, search)
+
+    def attach_roles(page_users):
+        # Роли — из кэша справочников, без JOIN
+        for user in page_users:
+            user.role = refdata.roles.get(user.role_id)
+
+    return render_list(
+        request, users, 'delservice_app/user_list.html', 'delservice_app/user_list_rows.html',
+        {'search': search}, 'users',
+        fields=['role_id', 'login', 'full_name', 'phone', 'status', 'hire_date'], prepare=attach_roles,
+    )
 
-    users = users.order_by('hire_date')
 
-    context = {'users': users, 'search': search}
-    return render(request, 'delservice_app/user_list.html', context)
+@login_required
+def courier_route(request, user_id):
+    """Маршрут курьера по его активным заказам"""
+    courier = get_object_or_404(User, id=user_id, role_id=counters.courier_role_id())
+    route = routing.build_route(
+        courier.id, routing.active_orders([courier.id]), routing.courier_start(courier.id)
+    )
+    return render(request, 'delservice_app/courier_route.html', {'courier': courier, 'route': route})
 
 
 @login_required
@@ -490,6 +541,7 @@ def user_delete(request, user_id):
 # ==================== УПРАВЛЕНИЕ РОЛЯМИ ====================
 
 @login_required
+@versioned_page(Role)
 def role_list(request):
     """Список ролей"""
     roles = Role.objects.all().order_by('id')
@@ -548,21 +600,18 @@ def role_delete(request, role_id):
 # ==================== УПРАВЛЕНИЕ ТОВАРАМИ ====================
 
 @login_required
+@versioned_page(Product)
 def product_list(request):
     """Список товаров"""
     search = request.GET.get('search', '')
-    products = Product.objects.all()
-
-    if search:
-        products = products.filter(
-            Q(name__icontains=search) |
-            Q(description__icontains=search)
-        )
-
-    products = products.order_by('name')
+    products = Product.objects.order_by('name')
+    products = search_queryset(products, search)
 
-    context = {'products': products, 'search': search}
-    return render(request, 'delservice_app/product_list.html', context)
+    return render_list(
+        request, products, 'delservice_app/product_list.html', 'delservice_app/product_list_rows.html',
+        {'search': search}, 'products',
+        fields=['name', 'description', 'price', 'weight_kg', 'dimensions_cm'],
+    )
 
 
 @login_required
@@ -616,21 +665,18 @@ def product_delete(request, product_id):
 # ==================== УПРАВЛЕНИЕ АДРЕСАМИ ====================
 
 @login_required
+@versioned_page(Address)
 def address_list(request):
     """Список адресов"""
     search = request.GET.get('search', '')
-    addresses = Address.objects.all()
-
-    if search:
-        addresses = addresses.filter(
-            Q(street__icontains=search) |
-            Q(house_number__icontains=search)
-        )
+    addresses = Address.objects.order_by('street', 'house_number')
+    addresses = search_queryset(addresses, search)
 
-    addresses = addresses.order_by('street', 'house_number')
-
-    context = {'addresses': addresses, 'search': search}
-    return render(request, 'delservice_app/address_list.html', context)
+    return render_list(
+        request, addresses, 'delservice_app/address_list.html', 'delservice_app/address_list_rows.html',
+        {'search': search}, 'addresses',
+        fields=['street', 'house_number', 'apartment_number', 'entrance', 'floor', 'door_code'],
+    )
 
 
 @login_required
@@ -684,6 +730,7 @@ def address_delete(request, address_id):
 # ==================== УПРАВЛЕНИЕ СТАТУСАМИ ЗАКАЗОВ ====================
 
 @login_required
+@versioned_page(OrderStatus)
 def order_status_list(request):
     """Список статусов заказов"""
     statuses = OrderStatus.objects.all().order_by('sort_order')
@@ -742,6 +789,7 @@ def order_status_delete(request, status_id):
 # ==================== УПРАВЛЕНИЕ СПОСОБАМИ ОПЛАТЫ ====================
 
 @login_required
+@versioned_page(PaymentMethod)
 def payment_method_list(request):
     """Список способов оплаты"""
     methods = PaymentMethod.objects.all().order_by('id')
@@ -800,7 +848,14 @@ def payment_method_delete(request, method_id):
 @login_required
 def order_detail(request, order_id):
     """Детальная информация о заказе"""
-    order = get_object_or_404(Order, id=order_id)
+    # Все связи, которые показывает шаблон, загружаются одним JOIN
+    order = get_object_or_404(
+        Order.objects.select_related(
+            'client', 'delivery_address', 'pickup_address', 'courier', 'status',
+            'payment_method', 'payment', 'review',
+        ),
+        id=order_id,
+    )
     items = order.items.select_related('product')
 
     # Вычисляем сумму для каждого товара
@@ -831,17 +886,8 @@ def order_item_create(request, order_id):
 
         product = get_object_or_404(Product, id=product_id)
 
-        # Создаем запись о товаре в заказе
-        order_item = OrderItem.objects.create(
-            order=order,
-            product=product,
-            quantity=quantity,
-            price_at_order=product.price
-        )
-
-        # Пересчитываем общую стоимость заказа
-        order.order_total += order_item.price_at_order * order_item.quantity
-        order.save()
+        # Позиция и приращение суммы заказа — в одной транзакции
+        totals.add_item(order, product, quantity)
 
         messages.success(request, f'Товар "{product.name}" добавлен в заказ')
         return redirect('delservice_app:order_detail', order_id=order.id)
@@ -858,16 +904,13 @@ def order_item_create(request, order_id):
 def order_item_delete(request, item_id):
     """Удаление товара из заказа"""
     item = get_object_or_404(OrderItem, id=item_id)
-    order = item.order
 
     if request.method == 'POST':
-        # Вычитаем стоимость товара из общей суммы
-        order.order_total -= item.price_at_order * item.quantity
-        order.save()
-
-        item.delete()
-        messages.success(request, 'Товар удалён из заказа')
-        return redirect('delservice_app:order_detail', order_id=order.id)
+        if totals.remove_item(item):
+            messages.success(request, 'Товар удалён из заказа')
+        else:
+            messages.warning(request, 'Товар уже удалён из заказа')
+        return redirect('delservice_app:order_detail', order_id=item.order_id)
 
     context = {'item': item}
     return render(request, 'delservice_app/order_item_confirm_delete.html', context)
@@ -5,6 +5,25 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
+
+Профиль развёртывания под ASGI. Под этим модулем включаются асинхронные
+версии dashboard, списка и карточки заказа и отчётов (ASYNC_VIEWS, см.
+delservice_app/async_views.py) и живые обновления этих страниц через
+Server-Sent Events (delservice_app/live.py).
+
+    pip install "uvicorn[standard]"
+    uvicorn delservice_project.asgi:application --workers 4 --host 0.0.0.0 --port 8000
+
+или
+
+    pip install daphne
+    daphne -b 0.0.0.0 -p 8000 delservice_project.asgi:application
+
+Асинхронные страницы выполняют независимые запросы в отдельных потоках,
+поэтому одному запросу нужно до трёх соединений с БД одновременно. На
+PostgreSQL используйте пул соединений (DATABASES['default']['OPTIONS'] =
+{'pool': True} с psycopg 3 или pgbouncer) и держите CONN_MAX_AGE = 0.
+Сравнить пропускную способность с WSGI: python manage.py benchmark_views.
 """
 
 import os
@@ -12,5 +31,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'delservice_project.settings')
+os.environ.setdefault('DELSERVICE_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
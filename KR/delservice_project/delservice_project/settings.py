@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,10 +49,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'delservice_app.middleware.QueryProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'delservice_project.urls'
 
+import os
 from pathlib import Path
 
 
@@ -124,6 +127,69 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Фоновое формирование PDF-отчётов
+REPORTS_ROOT = BASE_DIR / 'generated_reports'
+REPORT_WORKERS = 2
+# Сколько дней хранятся задания и файлы отчётов (команда cleanup_reports)
+REPORT_JOBS_KEEP_DAYS = 7
+
+# Кэш: версии данных (delservice_app.versions) и страницы-списки
+# (delservice_app.page_cache). При нескольких процессах нужен общий бэкенд:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'cache',
+# или
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://127.0.0.1:6379/1',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+}
+DATA_VERSION_CACHE = 'default'
+PAGE_CACHE = 'default'
+PAGE_CACHE_TIMEOUT = 600
+
+# Строк на странице списков (параметр ?per_page= переопределяет, не больше 200)
+LIST_PAGE_SIZE = 50
+
+# Геокодирование адресов (delservice_app.geocoding): провайдер и его параметры.
+# GazetteerProvider — локальный CSV-справочник (street, house_number, latitude, longitude)
+GEOCODER_BACKEND = 'delservice_app.geocoding.GazetteerProvider'
+GEOCODER_OPTIONS = {'path': BASE_DIR / 'gazetteer.csv'}
+
+# Сколько активных заказов (назначен/в пути) может быть у курьера при автоназначении
+COURIER_MAX_ACTIVE_ORDERS = 3
+
+# Живые обновления панели и списка заказов (delservice_app.live, только под ASGI):
+# период опроса журнала событий (один опрос на процесс) и пинга открытых соединений, с
+LIVE_POLL_INTERVAL = 1.0
+LIVE_HEARTBEAT_SECONDS = 15
+
+# Архив заказов (delservice_app.archive): доставленные заказы, созданные
+# раньше, чем столько месяцев назад, команда archive_orders переносит в архив
+ARCHIVE_AFTER_MONTHS = 6
+
+# Асинхронные версии нагруженных страниц (delservice_app.async_views).
+# Включается в ASGI-профиле: delservice_project/asgi.py выставляет
+# DELSERVICE_ASYNC_VIEWS=1. Под WSGI синхронные версии быстрее.
+ASYNC_VIEWS = os.environ.get('DELSERVICE_ASYNC_VIEWS') == '1'
+
+# Профилирование SQL-запросов (delservice_app.middleware.QueryProfilerMiddleware)
+QUERY_PROFILER_ENABLED = DEBUG
+QUERY_PROFILER_N_PLUS_ONE_THRESHOLD = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'delservice_app.queries': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'